@@ -4,14 +4,22 @@ import asyncio
 import json
 import logging
 import operator
-from typing import Annotated
+import threading
+import time
+from collections.abc import Callable
+from typing import Annotated, Any
 
+from langgraph.config import get_stream_writer
 from langgraph.graph import END, START, StateGraph
+from langgraph.graph.state import CompiledStateGraph
 from openai import AsyncAzureOpenAI, AsyncOpenAI
+from openai.types.chat import ChatCompletionMessageParam
 from typing_extensions import TypedDict
 
+from app.agents.json_stream import ArrayItemParser
 from app.agents.prompts import AGENT_PROMPTS
 from app.config import (
+    ARENA_GRAPH_MODE,
     AZURE_OPENAI_API_KEY,
     AZURE_OPENAI_API_VERSION,
     AZURE_OPENAI_DEPLOYMENT,
@@ -19,11 +27,14 @@ from app.config import (
     MOCK_AGENTS,
     OPENAI_API_KEY,
     OPENAI_MODEL,
+    OPENAI_STREAM,
     OPENAI_TEMPERATURE,
     THINKING_STEP_BASE_DELAY,
     THINKING_STEP_JITTER,
 )
 from app.models.schemas import AgentResult, DataSummary, Recommendation
+from app.services.llm_cache import llm_cache, llm_cache_key
+from app.services.llm_limiter import llm_limiter
 
 logger = logging.getLogger("arena.agents")
 
@@ -42,6 +53,8 @@ class ArenaState(TypedDict):
 
     summary: dict
     preferences: str
+    use_cache: bool
+    session_id: str
     events: Annotated[list[dict], operator.add]
 
 
@@ -240,86 +253,175 @@ MOCK_RESULTS: dict[str, AgentResult] = {
 # ---------------------------------------------------------------------------
 
 
+def _step_delay(agent_type: str, step_text: str) -> float:
+    """Simulated thinking time of one step (varies per step to stagger agents)."""
+    return (
+        THINKING_STEP_BASE_DELAY
+        + (hash(agent_type + step_text) % THINKING_STEP_JITTER) / THINKING_STEP_JITTER
+    )
+
+
+def _step_event(agent_type: str, step_index: int) -> dict:
+    steps = THINKING_STEPS[agent_type]
+    return {
+        "agent": agent_type,
+        "status": "thinking",
+        "step": steps[step_index],
+        "progress": int((step_index + 1) / (len(steps) + 1) * 100),
+    }
+
+
 def _make_step_node(agent_type: str, step_index: int):
     """Return a graph node coroutine for one thinking step."""
-    steps = THINKING_STEPS[agent_type]
-    step_text = steps[step_index]
-    progress = int((step_index + 1) / (len(steps) + 1) * 100)
+    step_text = THINKING_STEPS[agent_type][step_index]
 
     async def node(state: ArenaState) -> dict:
-        # Simulate thinking time (varies per step to stagger agents)
-        delay = (
-            THINKING_STEP_BASE_DELAY
-            + (hash(agent_type + step_text) % THINKING_STEP_JITTER) / THINKING_STEP_JITTER
-        )
-        await asyncio.sleep(delay)
-        return {
-            "events": [
+        await asyncio.sleep(_step_delay(agent_type, step_text))
+        return {"events": [_step_event(agent_type, step_index)]}
+
+    node.__name__ = f"{agent_type}_step_{step_index}"
+    return node
+
+
+async def _run_agent(
+    agent_type: str,
+    state: ArenaState,
+    mock_latency: float = 0.0,
+    emit: Callable[[dict], None] | None = None,
+) -> dict:
+    """Produce one agent's result and return its `complete` event.
+
+    `mock_latency` is how long mock results take to arrive, so a concurrent
+    graph still has something to pace its thinking steps against. `emit`
+    receives `queued` events while the call waits for rate-limit capacity
+    and, with OPENAI_STREAM, a `recommendation` event for each
+    recommendation as soon as it has been generated.
+    """
+
+    def on_queue_position(position: int) -> None:
+        if emit is not None:
+            emit({"agent": agent_type, "status": "queued", "position": position})
+
+    def on_recommendation(rec: Recommendation) -> None:
+        if emit is not None:
+            emit(
                 {
                     "agent": agent_type,
-                    "status": "thinking",
-                    "step": step_text,
-                    "progress": progress,
+                    "status": "recommendation",
+                    "recommendation": rec.model_dump(),
                 }
-            ]
-        }
+            )
 
-    node.__name__ = f"{agent_type}_step_{step_index}"
-    return node
+    summary = DataSummary(**state["summary"])
+    preferences = state.get("preferences", "")
+
+    mock = False
+    mock_reason = ""
+
+    if MOCK_AGENTS:
+        mock = True
+        mock_reason = "MOCK_AGENTS is enabled"
+        logger.info("Agent '%s' using mock results (MOCK_AGENTS=true)", agent_type)
+        result = MOCK_RESULTS[agent_type]
+    elif not OPENAI_API_KEY and not AZURE_OPENAI_ENDPOINT:
+        mock = True
+        mock_reason = "No API key configured"
+        logger.warning(
+            "Agent '%s' falling back to mock results — "
+            "set OPENAI_API_KEY or AZURE_OPENAI_ENDPOINT in .env",
+            agent_type,
+        )
+        result = MOCK_RESULTS[agent_type]
+    else:
+        provider = "Azure OpenAI" if _is_azure() else f"OpenAI ({OPENAI_MODEL})"
+        logger.info(
+            "Agent '%s' calling %s%s",
+            agent_type,
+            provider,
+            " with preferences" if preferences else "",
+        )
+        try:
+            result = await _call_openai(
+                agent_type,
+                summary,
+                preferences,
+                use_cache=state.get("use_cache", True),
+                on_recommendation=on_recommendation,
+                session_id=state.get("session_id", ""),
+                on_queue_position=on_queue_position,
+            )
+        except Exception as e:
+            logger.error("OpenAI call failed for agent '%s': %s", agent_type, e, exc_info=True)
+            raise
+
+    if mock and mock_latency > 0:
+        await asyncio.sleep(mock_latency)
+
+    result_dict = result.model_dump()
+    event: dict = {
+        "agent": agent_type,
+        "status": "complete",
+        "progress": 100,
+        "result": result_dict,
+    }
+    if mock:
+        event["mock"] = True
+        event["mock_reason"] = mock_reason
+
+    return event
 
 
 def _make_analyze_node(agent_type: str):
     """Return a graph node coroutine for the final LLM analysis."""
 
     async def node(state: ArenaState) -> dict:
-        summary = DataSummary(**state["summary"])
-        preferences = state.get("preferences", "")
-
-        mock = False
-        mock_reason = ""
-
-        if MOCK_AGENTS:
-            mock = True
-            mock_reason = "MOCK_AGENTS is enabled"
-            logger.info("Agent '%s' using mock results (MOCK_AGENTS=true)", agent_type)
-            result = MOCK_RESULTS[agent_type]
-        elif not OPENAI_API_KEY and not AZURE_OPENAI_ENDPOINT:
-            mock = True
-            mock_reason = "No API key configured"
-            logger.warning(
-                "Agent '%s' falling back to mock results — "
-                "set OPENAI_API_KEY or AZURE_OPENAI_ENDPOINT in .env",
-                agent_type,
-            )
-            result = MOCK_RESULTS[agent_type]
-        else:
-            provider = "Azure OpenAI" if _is_azure() else f"OpenAI ({OPENAI_MODEL})"
-            logger.info(
-                "Agent '%s' calling %s%s",
-                agent_type,
-                provider,
-                " with preferences" if preferences else "",
-            )
-            try:
-                result = await _call_openai(agent_type, summary, preferences)
-            except Exception as e:
-                logger.error("OpenAI call failed for agent '%s': %s", agent_type, e, exc_info=True)
-                raise
-
-        result_dict = result.model_dump()
-        event: dict = {
-            "agent": agent_type,
-            "status": "complete",
-            "progress": 100,
-            "result": result_dict,
-        }
-        if mock:
-            event["mock"] = True
-            event["mock_reason"] = mock_reason
+        write = get_stream_writer()
+        return {"events": [await _run_agent(agent_type, state, emit=write)]}
+
+    node.__name__ = f"{agent_type}_analyze"
+    return node
 
+
+# Recent LLM call durations per agent (seconds), used to spread thinking steps
+# across the expected length of the next call
+_expected_call_seconds: dict[str, float] = {}
+
+
+def _make_agent_node(agent_type: str):
+    """Return a graph node that starts the agent's LLM call at once.
+
+    Thinking steps are streamed while the call runs, spaced across its
+    expected duration (a moving average of recent calls). When the call
+    returns, the remaining steps are flushed immediately, so pacing never
+    adds latency on top of the call itself.
+    """
+    steps = THINKING_STEPS[agent_type]
+
+    async def node(state: ArenaState) -> dict:
+        write = get_stream_writer()
+        # Mock results take as long as the sequential graph's thinking steps.
+        # Read at run time: the compiled graph outlives config changes.
+        mock_latency = sum(_step_delay(agent_type, text) for text in steps)
+        expected = _expected_call_seconds.get(agent_type, mock_latency)
+        started = time.monotonic()
+        call = asyncio.create_task(_run_agent(agent_type, state, mock_latency, emit=write))
+        try:
+            for i in range(len(steps)):
+                wait = expected * (i + 1) / (len(steps) + 1) - (time.monotonic() - started)
+                if wait > 0 and not call.done():
+                    await asyncio.wait({call}, timeout=wait)
+                write(_step_event(agent_type, i))
+            event = await call
+        finally:
+            call.cancel()
+
+        if not event.get("mock"):
+            elapsed = time.monotonic() - started
+            previous = _expected_call_seconds.get(agent_type, elapsed)
+            _expected_call_seconds[agent_type] = 0.7 * previous + 0.3 * elapsed
         return {"events": [event]}
 
-    node.__name__ = f"{agent_type}_analyze"
+    node.__name__ = f"{agent_type}_agent"
     return node
 
 
@@ -328,18 +430,36 @@ def _make_analyze_node(agent_type: str):
 # ---------------------------------------------------------------------------
 
 
-def build_arena_graph():
+def build_arena_graph(mode: str | None = None):
     """Build and compile the LangGraph that runs all 3 agents in parallel.
 
-    Structure (fan-out / fan-in):
+    ``concurrent`` mode (default) has one node per agent. The LLM call starts
+    at START and thinking steps are streamed as custom events while it runs:
+
+        START ─┬─> conservative_agent ─┬─> END
+               ├─> aggressive_agent   ─┤
+               └─> balanced_agent     ─┘
+
+    ``sequential`` mode sleeps through each thinking step before calling the
+    model (fan-out / fan-in):
 
         START ─┬─> conservative_step_0 -> ... -> conservative_analyze ─┬─> END
                ├─> aggressive_step_0   -> ... -> aggressive_analyze   ─┤
                └─> balanced_step_0     -> ... -> balanced_analyze     ─┘
+
+    Stream with ``stream_mode=["updates", "custom"]`` to receive both kinds of event.
     """
+    mode = mode or ARENA_GRAPH_MODE
     builder = StateGraph(ArenaState)
 
     for agent_type in ("conservative", "aggressive", "balanced"):
+        if mode != "sequential":
+            name = f"{agent_type}_agent"
+            builder.add_node(name, _make_agent_node(agent_type))
+            builder.add_edge(START, name)
+            builder.add_edge(name, END)
+            continue
+
         steps = THINKING_STEPS[agent_type]
 
         # Add a node for each thinking step
@@ -365,6 +485,33 @@ def build_arena_graph():
     return builder.compile()
 
 
+# Compiled graphs by mode. Nodes keep no per-request state, so one compiled
+# graph serves every concurrent stream.
+_graphs: dict[str, CompiledStateGraph] = {}
+_graph_build_ms: dict[str, float] = {}
+_graphs_lock = threading.Lock()
+
+
+def get_arena_graph(mode: str | None = None) -> CompiledStateGraph:
+    """Return the compiled arena graph for `mode`, building it on first use."""
+    mode = "sequential" if (mode or ARENA_GRAPH_MODE) == "sequential" else "concurrent"
+    graph = _graphs.get(mode)
+    if graph is not None:
+        return graph
+    with _graphs_lock:
+        if mode not in _graphs:
+            started = time.perf_counter()
+            _graphs[mode] = build_arena_graph(mode)
+            _graph_build_ms[mode] = round((time.perf_counter() - started) * 1000, 2)
+            logger.info("Compiled %s arena graph in %.1f ms", mode, _graph_build_ms[mode])
+        return _graphs[mode]
+
+
+def arena_graph_stats() -> dict:
+    """Build time of each compiled graph, for /api/metrics."""
+    return {"build_ms": dict(_graph_build_ms)}
+
+
 # ---------------------------------------------------------------------------
 # OpenAI helper (used when MOCK_AGENTS=false)
 # ---------------------------------------------------------------------------
@@ -391,9 +538,29 @@ def _get_openai_client() -> AsyncOpenAI:
     return _openai_client
 
 
-async def _call_openai(agent_type: str, summary: DataSummary, preferences: str = "") -> AgentResult:
-    """Call OpenAI to get agent recommendations."""
-    client = _get_openai_client()
+# Completion tokens charged to the rate limiter per call (prompt tokens ≈ chars / 4)
+_COMPLETION_TOKEN_ESTIMATE = 1500
+
+
+async def _call_openai(
+    agent_type: str,
+    summary: DataSummary,
+    preferences: str = "",
+    use_cache: bool = True,
+    on_recommendation: Callable[[Recommendation], None] | None = None,
+    session_id: str = "",
+    on_queue_position: Callable[[int], None] | None = None,
+) -> AgentResult:
+    """Call OpenAI to get agent recommendations.
+
+    Responses are cached by request content; `use_cache=False` skips the
+    lookup and refreshes the cached entry. With OPENAI_STREAM the completion
+    is streamed and `on_recommendation` is called for each recommendation
+    as soon as its object closes.
+
+    Calls that miss the cache wait for the process-wide rate limiter, queued
+    fairly by `session_id`. `on_queue_position` hears their place in line.
+    """
 
     data_text = f"""Procurement Spend Data Summary:
 - Total Spend: ${summary.total_spend:,.2f}
@@ -420,38 +587,122 @@ Potential Duplicate Vendors Detected:
         data_text += f"\n\n--- USER PREFERENCES ---\n{preferences}\n"
 
     model = AZURE_OPENAI_DEPLOYMENT if _is_azure() else OPENAI_MODEL
-    response = await client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": AGENT_PROMPTS[agent_type]},
+    system_prompt = AGENT_PROMPTS[agent_type]
+    key = llm_cache_key(agent_type, system_prompt, data_text, model, OPENAI_TEMPERATURE)
+    cached = await llm_cache.get_async(key) if use_cache else None
+    if cached is not None:
+        logger.info("Agent '%s' served from response cache", agent_type)
+        content = cached
+    else:
+        messages: list[ChatCompletionMessageParam] = [
+            {"role": "system", "content": system_prompt},
             {"role": "user", "content": data_text},
-        ],
-        response_format={"type": "json_object"},
-        temperature=OPENAI_TEMPERATURE,
-    )
+        ]
+        tokens = (len(system_prompt) + len(data_text)) // 4 + _COMPLETION_TOKEN_ESTIMATE
+        await llm_limiter.acquire(session_id, tokens, on_queue_position)
+        if OPENAI_STREAM:
+            content, used = await _stream_completion(agent_type, model, messages, on_recommendation)
+        else:
+            response = await _get_openai_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                temperature=OPENAI_TEMPERATURE,
+            )
+            content = response.choices[0].message.content or "{}"
+            used = _total_tokens(response)
+        if used is not None:
+            llm_limiter.settle(tokens, used)
 
-    content = response.choices[0].message.content or "{}"
     data = json.loads(content)
 
-    # Sanitize risk_level — LLMs sometimes return values like "medium-high"
-    valid_risk_levels = {"low", "medium", "high"}
     for rec in data.get("recommendations", []):
-        risk = rec.get("risk_level", "medium").lower()
-        if risk not in valid_risk_levels:
-            # Map common variants to valid values
-            if "high" in risk:
-                rec["risk_level"] = "high"
-            elif "low" in risk:
-                rec["risk_level"] = "low"
-            else:
-                rec["risk_level"] = "medium"
-
-    return AgentResult(
+        _sanitize_risk_level(rec)
+
+    result = AgentResult(
         agent_type=agent_type,
         recommendations=data["recommendations"],
         total_savings=data["total_savings"],
         summary=data["summary"],
     )
+    # Only responses that parsed into a valid result are worth replaying
+    if cached is None:
+        await llm_cache.put_async(key, content)
+    return result
+
+
+def _sanitize_risk_level(rec: dict) -> None:
+    """Coerce risk_level to low/medium/high — LLMs sometimes return values like "medium-high"."""
+    risk = rec.get("risk_level", "medium").lower()
+    if risk not in {"low", "medium", "high"}:
+        # Map common variants to valid values
+        if "high" in risk:
+            rec["risk_level"] = "high"
+        elif "low" in risk:
+            rec["risk_level"] = "low"
+        else:
+            rec["risk_level"] = "medium"
+
+
+async def _stream_completion(
+    agent_type: str,
+    model: str,
+    messages: list[ChatCompletionMessageParam],
+    on_recommendation: Callable[[Recommendation], None] | None,
+) -> tuple[str, int | None]:
+    """Stream a completion, reporting each recommendation once it parses.
+
+    Returns the full text and the total tokens used, when the stream reports it.
+    """
+    started = time.monotonic()
+    stream = await _get_openai_client().chat.completions.create(
+        model=model,
+        messages=messages,
+        response_format={"type": "json_object"},
+        temperature=OPENAI_TEMPERATURE,
+        stream=True,
+        # Usage arrives in a final chunk with no choices
+        stream_options={"include_usage": True},
+    )
+    parser = ArrayItemParser("recommendations")
+    parts: list[str] = []
+    first_at: float | None = None
+    used: int | None = None
+    async for chunk in stream:
+        total = _total_tokens(chunk)
+        if total is not None:
+            used = total
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        parts.append(delta)
+        for item in parser.feed(delta):
+            _sanitize_risk_level(item)
+            try:
+                rec = Recommendation(**item)
+            except (TypeError, ValueError):
+                # The final parse validates the whole response
+                continue
+            if first_at is None:
+                first_at = time.monotonic() - started
+            if on_recommendation is not None:
+                on_recommendation(rec)
+    if first_at is not None:
+        logger.info(
+            "Agent '%s' streamed first recommendation after %.1fs of %.1fs",
+            agent_type,
+            first_at,
+            time.monotonic() - started,
+        )
+    return "".join(parts) or "{}", used
+
+
+def _total_tokens(response: Any) -> int | None:
+    """Tokens a completion or final stream chunk reports using, if any."""
+    total = getattr(getattr(response, "usage", None), "total_tokens", None)
+    return total if isinstance(total, int) else None
 
 
 def _format_list(items: list, name_key: str, value_key: str) -> str:
@@ -0,0 +1,80 @@
+"""Incremental parsing of a streamed JSON object.
+
+The agent response is one object with a top-level array of recommendation
+objects. `ArrayItemParser` is fed the completion text as it arrives and
+returns each element of that array as soon as its closing brace is seen.
+The rest of the document is then parsed whole.
+"""
+
+import json
+import logging
+
+logger = logging.getLogger("arena.agents")
+
+
+class ArrayItemParser:
+    """Yield the objects of one top-level array from a JSON text fed in chunks.
+
+    Only tracks string, escape and nesting state, so each character is
+    looked at once however the text is split.
+    """
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string: list[str] = []  # current top-level string, i.e. a key
+        self._last_string = ""
+        self._in_array = False
+        self._in_item = False
+        self._item: list[str] = []
+
+    def feed(self, chunk: str) -> list[dict]:
+        """Consume `chunk` and return the array items completed by it."""
+        items: list[dict] = []
+        for char in chunk:
+            if self._in_item:
+                self._item.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = "".join(self._string)
+                elif self._depth == 1:
+                    self._string.append(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string = []
+            elif char in "{[":
+                if char == "[" and self._depth == 1 and self._last_string == self.key:
+                    self._in_array = True
+                elif char == "{" and self._in_array and self._depth == 2:
+                    self._in_item = True
+                    self._item = [char]
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if char == "}" and self._in_item and self._depth == 2:
+                    item = self._decode("".join(self._item))
+                    if item is not None:
+                        items.append(item)
+                    self._in_item = False
+                elif char == "]" and self._in_array and self._depth == 1:
+                    self._in_array = False
+        return items
+
+    @staticmethod
+    def _decode(text: str) -> dict | None:
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError:
+            logger.debug("Skipping unparseable streamed item: %.80s", text)
+            return None
+        return item if isinstance(item, dict) else None
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -8,6 +9,11 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 MOCK_AGENTS = os.getenv("MOCK_AGENTS", "true").lower() == "true"
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 OPENAI_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
+# Stream completions and emit each recommendation as soon as it is parsed
+OPENAI_STREAM = os.getenv("OPENAI_STREAM", "false").lower() == "true"
+# Process-wide model rate limits (0 = unlimited); calls beyond them queue fairly by session
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
 
 # Azure OpenAI (optional — takes priority over standard OpenAI when set)
 AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT", "")
@@ -19,6 +25,14 @@ CORS_ORIGIN_REGEX = os.getenv("CORS_ORIGIN_REGEX", r"^http://localhost:\d+$")
 
 # Data processing
 DUPLICATE_VENDOR_THRESHOLD = 0.88
+# Processes scoring duplicate-vendor candidate pairs (1 = in-process); only used for
+# shortlists of at least DUPLICATE_VENDOR_PARALLEL_MIN_PAIRS pairs
+DUPLICATE_VENDOR_SCORING_WORKERS = int(os.getenv("DUPLICATE_VENDOR_SCORING_WORKERS", "1"))
+DUPLICATE_VENDOR_PARALLEL_MIN_PAIRS = 20_000
+# Total spelling variants of one vendor together (via the vendor_canonical column)
+GROUP_BY_CANONICAL_VENDOR = os.getenv("GROUP_BY_CANONICAL_VENDOR", "false").lower() == "true"
+# SQLite file remembering vendor names and similarity scores across uploads ("" = off)
+VENDOR_REGISTRY_PATH = os.getenv("VENDOR_REGISTRY_PATH", "")
 TOP_VENDORS_LIMIT = 10
 VENDOR_BUCKET_SIZE = 8
 
@@ -28,8 +42,64 @@ MAX_UPLOAD_SIZE_BYTES = MAX_UPLOAD_SIZE_MB * 1024 * 1024
 MAX_ROWS = int(os.getenv("MAX_ROWS", "500000"))
 MAX_COLUMNS = int(os.getenv("MAX_COLUMNS", "200"))
 MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "100"))
-DUPLICATE_VENDOR_CAP = 500  # Max vendors to compare for dedup (O(n^2) guard)
+# Sessions per page of GET /api/sessions (default and upper bound of ?limit=)
+SESSION_PAGE_SIZE = 50
+SESSION_PAGE_MAX = 200
+# Memory held by sessions (DataFrames, date cubes, CSV text); least recently used are evicted
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Idle or over-budget sessions spill their DataFrames to Arrow files here ("" disables spilling)
+SESSION_SPILL_DIR = os.getenv(
+    "SESSION_SPILL_DIR", os.path.join(tempfile.gettempdir(), "arena-sessions")
+)
+# Sessions untouched this long spill their DataFrames (0 = spill only under memory pressure)
+SESSION_SPILL_IDLE_SECONDS = int(os.getenv("SESSION_SPILL_IDLE_SECONDS", "900"))
+# Sessions expire this long after their last access, or after creation (0 = never)
+SESSION_IDLE_TTL_SECONDS = int(os.getenv("SESSION_IDLE_TTL_SECONDS", str(2 * 60 * 60)))
+SESSION_MAX_AGE_SECONDS = int(os.getenv("SESSION_MAX_AGE_SECONDS", str(24 * 60 * 60)))
+# How often the background sweeper expires sessions and spills idle frames (0 = no sweeper)
+SESSION_SWEEP_INTERVAL_SECONDS = int(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "60"))
+# Session storage: "memory" (per process) or "sqlite" (shared by every worker on the host)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory").lower()
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+# Threads for session reads and writes, kept apart from upload and data hand-off threads
+SESSION_IO_WORKERS = int(os.getenv("SESSION_IO_WORKERS", "4"))
+
+# Column profiling — threads used to profile columns concurrently (1 = serial)
+PROFILE_WORKERS = int(os.getenv("PROFILE_WORKERS", "1"))
+# Above this many rows, distinct counts are HyperLogLog estimates (~0.8% error at precision 14)
+APPROX_DISTINCT_MIN_ROWS = int(os.getenv("APPROX_DISTINCT_MIN_ROWS", "100000"))
+HLL_PRECISION = 14
+
+# Streaming ingest — uploads are fed to the parser in chunks so limits trip early
+UPLOAD_CHUNK_SIZE_BYTES = 1024 * 1024
+CSV_CHUNK_ROWS = 50_000
+# Threads that read and parse upload bodies; each holds one for its whole transfer,
+# so slow clients queue here instead of starving session and cache I/O
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "8"))
+# "c" (pandas default, NumPy/object dtypes) or "pyarrow" (multithreaded, Arrow-backed dtypes)
+PARSE_ENGINE = os.getenv("PARSE_ENGINE", "c").lower()
+
+# Worker pool for parsing/profiling/summarizing ("thread" or "process")
+DATA_EXECUTOR = os.getenv("DATA_EXECUTOR", "thread").lower()
+DATA_EXECUTOR_WORKERS = int(os.getenv("DATA_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Where process workers exchange Arrow frames — tmpfs keeps the hand-off in RAM
+_SHM_DIR = "/dev/shm"  # noqa: S108
+SHARED_FRAME_DIR = os.getenv("SHARED_FRAME_DIR", _SHM_DIR if os.path.isdir(_SHM_DIR) else "")
+
+# Date-filtered summaries cached per (session, window), bounded by serialized size
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# Agent responses cached by request content: in memory, plus on disk when a directory is set
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "")
+# Disk tier cap; least recently used files are deleted beyond it (0 = unlimited)
+LLM_CACHE_DISK_MAX_BYTES = int(os.getenv("LLM_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+# Threads reading and writing the disk tier
+LLM_CACHE_IO_WORKERS = 2
 
 # Agent thinking step delays
 THINKING_STEP_BASE_DELAY = 0.8
 THINKING_STEP_JITTER = 10
+# "concurrent": the LLM call starts at once and thinking steps are paced against it;
+# "sequential": every thinking step sleeps before the call starts
+ARENA_GRAPH_MODE = os.getenv("ARENA_GRAPH_MODE", "concurrent").lower()
@@ -1,13 +1,26 @@
 """FastAPI application entry point."""
 
 import logging
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+from app.agents.base import arena_graph_stats, get_arena_graph
 from app.config import CORS_ORIGIN_REGEX, CORS_ORIGINS
 from app.routers import analyze, demo, report, upload, vote
+from app.services.llm_cache import llm_cache
+from app.services.llm_limiter import llm_limiter
+from app.services.session_store import (
+    clear_stale_spill_files,
+    remove_spill_dir,
+    store_stats,
+)
+from app.services.session_sweeper import start_session_sweeper, stop_session_sweeper
+from app.services.summary_cache import summary_cache
+from app.services.vendor_registry import close_vendor_registry
+from app.services.worker_pool import shutdown_worker_pool, start_worker_pool
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,7 +29,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger("arena")
 
-app = FastAPI(title="Agent Arena Battle", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    clear_stale_spill_files()
+    start_worker_pool()
+    start_session_sweeper()
+    get_arena_graph()
+    yield
+    await stop_session_sweeper()
+    shutdown_worker_pool()
+    close_vendor_registry()
+    remove_spill_dir()
+
+
+app = FastAPI(title="Agent Arena Battle", version="1.0.0", lifespan=lifespan)
 
 
 @app.exception_handler(Exception)
@@ -47,3 +74,14 @@ app.include_router(demo.router)
 @app.get("/api/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/api/metrics")
+async def metrics():
+    return {
+        "summary_cache": summary_cache.stats(),
+        "sessions": store_stats(),
+        "arena_graph": arena_graph_stats(),
+        "llm_cache": llm_cache.stats(),
+        "llm_limiter": llm_limiter.stats(),
+    }
@@ -67,9 +67,13 @@ class ColumnStats(BaseModel):
     missing_count: int
     missing_pct: float  # 0.0–100.0
     unique_count: int
+    unique_count_approximate: bool = False  # True when estimated with HyperLogLog
+    unique_count_error_pct: float | None = None  # relative standard error when approximate
     sample_values: list[str]
     min_value: str | None = None
     max_value: str | None = None
+    date_format: str | None = None  # strptime format inferred for date columns
+    date_fallback_pct: float | None = None  # % of distinct dates the format could not read
 
 
 class SuggestedMapping(BaseModel):
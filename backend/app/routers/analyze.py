@@ -6,17 +6,18 @@ import logging
 from fastapi import APIRouter
 from fastapi.responses import StreamingResponse
 
-from app.agents.base import build_arena_graph
+from app.agents.base import get_arena_graph
 from app.routers.dependencies import get_session_or_404
-from app.services.session_store import build_preference_context
+from app.services.session_store import build_preference_context, update_session
+from app.services.worker_pool import run_session_io
 
 logger = logging.getLogger("arena.analyze")
 router = APIRouter()
 
 
 @router.get("/api/analyze/{session_id}")
-async def analyze(session_id: str):
-    session = get_session_or_404(session_id)
+async def analyze(session_id: str, no_cache: bool = False):
+    session = await get_session_or_404(session_id)
 
     summary = session.get("active_summary") or session["summary"]
     preferences = build_preference_context(session_id)
@@ -24,30 +25,45 @@ async def analyze(session_id: str):
         logger.info("Session %s has preference context (%d chars)", session_id, len(preferences))
     logger.info("Starting arena analysis for session %s", session_id)
 
-    # Ensure agent_results dict exists (preserve previous results during re-runs)
-    if "agent_results" not in session:
-        session["agent_results"] = {}
+    # Preserve previous results during re-runs
+    agent_results: dict = dict(session.get("agent_results") or {})
 
     async def event_stream():
-        graph = build_arena_graph()
+        graph = get_arena_graph()
 
         initial_state = {
             "summary": summary.model_dump(),
             "preferences": preferences,
+            "use_cache": not no_cache,
+            "session_id": session_id,
             "events": [],
         }
 
         try:
-            async for chunk in graph.astream(initial_state, stream_mode="updates"):
-                for _node_name, node_output in chunk.items():
-                    for event in node_output.get("events", []):
-                        if event.get("status") == "complete":
-                            agent = event.get("agent", "?")
-                            result = event.get("result", {})
-                            savings = result.get("total_savings", 0)
-                            logger.info("Agent '%s' complete — $%.2f total savings", agent, savings)
-                            session["agent_results"][agent] = result
-                        yield f"data: {json.dumps(event)}\n\n"
+            # "custom" carries thinking steps streamed while a concurrent agent's call runs
+            async for mode, chunk in graph.astream(
+                initial_state, stream_mode=["updates", "custom"]
+            ):
+                if mode == "custom":
+                    events = [chunk]
+                else:
+                    events = [e for output in chunk.values() for e in output.get("events", [])]
+                completed = False
+                for event in events:
+                    if event.get("status") == "complete":
+                        agent = event.get("agent", "?")
+                        result = event.get("result", {})
+                        savings = result.get("total_savings", 0)
+                        logger.info("Agent '%s' complete — $%.2f total savings", agent, savings)
+                        agent_results[agent] = result
+                        completed = True
+                # One session write per graph step, off the event loop
+                if completed:
+                    await run_session_io(
+                        update_session, session_id, {"agent_results": dict(agent_results)}
+                    )
+                for event in events:
+                    yield f"data: {json.dumps(event)}\n\n"
         except Exception as e:
             logger.error("Graph execution error for session %s: %s", session_id, e, exc_info=True)
             yield f"data: {json.dumps({'type': 'error', 'detail': str(e)})}\n\n"
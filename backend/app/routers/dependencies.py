@@ -3,11 +3,16 @@
 from fastapi import HTTPException
 
 from app.services.session_store import get_session
+from app.services.worker_pool import run_session_io
 
 
-def get_session_or_404(session_id: str) -> dict:
-    """Fetch a session by ID or raise 404."""
-    session = get_session(session_id)
+async def get_session_or_404(session_id: str) -> dict:
+    """Fetch a session by ID or raise 404.
+
+    A durable backend reads and decodes the session, so the lookup runs on
+    the session threads rather than the event loop.
+    """
+    session: dict | None = await run_session_io(get_session, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     return session
@@ -1,14 +1,16 @@
-"""PDF report export endpoint."""
+"""PDF report and mapped-data CSV export endpoints."""
 
 import logging
 
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 
 from app.models.schemas import AgentResult, DataSummary
 from app.routers.dependencies import get_session_or_404
+from app.services.data_processor import mapped_csv_chunks
 from app.services.report_generator import generate_report
-from app.services.session_store import get_voted_recommendation_ids
+from app.services.session_store import get_session_frame, get_voted_recommendation_ids
+from app.services.worker_pool import run_session_io
 
 logger = logging.getLogger("arena.report")
 router = APIRouter()
@@ -16,7 +18,7 @@ router = APIRouter()
 
 @router.get("/api/report/{session_id}")
 async def export_report(session_id: str):
-    session = get_session_or_404(session_id)
+    session = await get_session_or_404(session_id)
 
     summary_data = session.get("active_summary") or session.get("summary")
     if not summary_data:
@@ -58,3 +60,31 @@ async def export_report(session_id: str):
             "Content-Disposition": f'attachment; filename="{safe_name}_report.pdf"',
         },
     )
+
+
+@router.get("/api/export/{session_id}")
+async def export_csv(session_id: str):
+    session = await get_session_or_404(session_id)
+
+    column_mappings: dict[str, str] = session.get("column_mappings", {})
+    mapped_df = await run_session_io(get_session_frame, session_id, "mapped_df")
+    if mapped_df is None or not column_mappings:
+        raise HTTPException(status_code=400, detail="No mapped data — confirm mappings first")
+
+    filename: str = session.get("filename", "unknown.csv")
+    safe_name = filename.rsplit(".", 1)[0] if "." in filename else filename
+
+    logger.info("Exporting mapped CSV for session %s", session_id)
+
+    # Mappings whose source column was missing were skipped when the frame was
+    # built; a missing column would fail the stream after its 200 is sent
+    columns = [col for col in column_mappings if col in mapped_df.columns]
+
+    # Rendered chunk by chunk on the threadpool; the full text never exists in memory
+    return StreamingResponse(
+        mapped_csv_chunks(mapped_df, columns),
+        media_type="text/csv",
+        headers={
+            "Content-Disposition": f'attachment; filename="{safe_name}_mapped.csv"',
+        },
+    )
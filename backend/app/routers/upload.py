@@ -1,30 +1,52 @@
 """CSV/XLSX upload endpoint."""
 
+import asyncio
 import logging
 import re
 import uuid
 from datetime import UTC, datetime
 
 import pandas as pd
-from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from fastapi import APIRouter, HTTPException, Query, Request
 
-from app.config import MAX_UPLOAD_SIZE_BYTES, MAX_UPLOAD_SIZE_MB
+from app.config import (
+    MAX_UPLOAD_SIZE_BYTES,
+    MAX_UPLOAD_SIZE_MB,
+    SESSION_PAGE_MAX,
+    SESSION_PAGE_SIZE,
+)
 from app.models.schemas import ConfirmMappingsRequest, DataSummary, UploadResponse
 from app.routers.dependencies import get_session_or_404
 from app.services.data_processor import (
-    apply_mappings_and_summarize,
+    FileTooLargeError,
+    SummaryCube,
+    apply_mappings_and_aggregate,
     compute_column_stats,
-    parse_file,
+    parse_stream,
     suggest_column_mappings,
-    summarize_dataframe,
+    summarize_cube_range,
+    summarize_date_range,
+)
+from app.services.session_store import (
+    delete_session,
+    get_session_frame,
+    list_sessions,
+    release_session_frame,
+    save_session,
+    update_session,
 )
-from app.services.session_store import delete_session, list_sessions, save_session
+from app.services.summary_cache import summary_cache
+from app.services.upload_stream import MultipartError, MultipartFileReader
+from app.services.worker_pool import run_in_worker, run_session_io, run_upload
 
 logger = logging.getLogger("arena.upload")
 router = APIRouter()
 
 ALLOWED_EXTENSIONS = (".csv", ".xlsx")
 
+# Allowance for multipart boundaries and part headers on top of the file itself
+_MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
 # Strip anything except alphanumerics, hyphens, underscores, dots, and spaces
 _SAFE_FILENAME_RE = re.compile(r"[^\w\s\-.]", re.ASCII)
 
@@ -37,24 +59,60 @@ def _sanitize_filename(name: str) -> str:
     return clean[:255] or "upload"
 
 
-@router.post("/api/upload", response_model=UploadResponse)
-async def upload_file(file: UploadFile = File(...)):  # noqa: B008
-    if not file.filename or not file.filename.lower().endswith(ALLOWED_EXTENSIONS):
-        logger.warning("Rejected upload: %s", file.filename)
-        raise HTTPException(status_code=400, detail="Please upload a CSV or XLSX file")
-
-    # Enforce file size limit
-    content = await file.read()
-    if len(content) > MAX_UPLOAD_SIZE_BYTES:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large. Maximum size is {MAX_UPLOAD_SIZE_MB} MB.",
+@router.post(
+    "/api/upload",
+    response_model=UploadResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"],
+                    }
+                }
+            },
+        }
+    },
+)
+async def upload_file(request: Request):
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"File too large. Maximum size is {MAX_UPLOAD_SIZE_MB} MB.",
+    )
+    # Reject before reading any of the body when its declared size is already too big
+    content_length = request.headers.get("content-length", "")
+    if (
+        content_length.isdigit()
+        and int(content_length) > MAX_UPLOAD_SIZE_BYTES + _MULTIPART_OVERHEAD_BYTES
+    ):
+        raise too_large
+
+    # The body is parsed as it arrives, so the byte and row limits trip on the
+    # chunk that crosses them rather than after the whole transfer. Reads pull
+    # from the event loop and block for the whole transfer, so they run on the
+    # upload threads, apart from the pool that serves session and cache I/O.
+    try:
+        reader = MultipartFileReader(
+            request.stream(), request.headers.get("content-type", ""), asyncio.get_running_loop()
         )
+        filename = await run_upload(reader.read_headers)
+    except MultipartError as e:
+        logger.warning("Rejected upload: %s", e)
+        raise HTTPException(status_code=400, detail="Please upload a CSV or XLSX file") from e
+
+    if not filename or not filename.lower().endswith(ALLOWED_EXTENSIONS):
+        logger.warning("Rejected upload: %s", filename)
+        raise HTTPException(status_code=400, detail="Please upload a CSV or XLSX file")
 
-    safe_filename = _sanitize_filename(file.filename)
+    safe_filename = _sanitize_filename(filename)
 
     try:
-        df = parse_file(content, file.filename)
+        df = await run_upload(parse_stream, reader, filename, max_bytes=MAX_UPLOAD_SIZE_BYTES)
+    except FileTooLargeError as e:
+        raise too_large from e
     except ValueError as e:
         logger.warning("Validation error: %s", e)
         raise HTTPException(status_code=400, detail=str(e)) from e
@@ -64,14 +122,19 @@ async def upload_file(file: UploadFile = File(...)):  # noqa: B008
 
     columns = list(df.columns)
     suggested_mappings = suggest_column_mappings(columns)
-    column_stats = compute_column_stats(df)
+    column_stats = await run_in_worker(compute_column_stats, df)
+    # Formats inferred while profiling are reused for every later parse of the column
+    date_formats = {s.name: s.date_format for s in column_stats if s.date_format}
 
     session_id = str(uuid.uuid4())
-    save_session(
+    # A durable backend encodes the frame on write — keep that off the event loop
+    await run_session_io(
+        save_session,
         session_id,
         {
             "raw_df": df,
             "raw_columns": columns,
+            "date_formats": date_formats,
             "filename": safe_filename,
             "created_at": datetime.now(UTC).isoformat(),
         },
@@ -95,7 +158,7 @@ async def upload_file(file: UploadFile = File(...)):  # noqa: B008
 
 @router.post("/api/confirm-mappings", response_model=DataSummary)
 async def confirm_mappings(req: ConfirmMappingsRequest):
-    session = get_session_or_404(req.session_id)
+    session = await get_session_or_404(req.session_id)
 
     required_fields = {"date", "vendor", "category", "amount", "department"}
     provided = set(req.mappings.keys())
@@ -106,23 +169,34 @@ async def confirm_mappings(req: ConfirmMappingsRequest):
             detail=f"Missing required field mappings: {missing}",
         )
 
-    raw_df = session.get("raw_df")
+    raw_df = await run_session_io(get_session_frame, req.session_id, "raw_df")
     if raw_df is None:
         raise HTTPException(status_code=400, detail="No raw data in session")
 
-    df = raw_df.copy()
-
+    # rename() inside the mapping step copies, so raw_df is never mutated.
+    # Date-filtered summaries are answered from the cube instead of rescanning rows.
     try:
-        df, summary = apply_mappings_and_summarize(df, req.mappings)
+        df, summary, summary_cube = await run_in_worker(
+            apply_mappings_and_aggregate, raw_df, req.mappings, session.get("date_formats")
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
 
-    # Update session with confirmed data
-    csv_text = df.to_csv(index=False)
-    session["csv_text"] = csv_text
-    session["mapped_df"] = df
-    session["summary"] = summary
-    session["column_mappings"] = req.mappings
+    await run_session_io(
+        update_session,
+        req.session_id,
+        {
+            "mapped_df": df,
+            "summary_cube": summary_cube,
+            # Cached filtered summaries are keyed on this, in every worker
+            "summary_version": uuid.uuid4().hex,
+            "summary": summary,
+            "column_mappings": req.mappings,
+        },
+    )
+    # The raw frame is only read again if the user re-maps columns
+    await run_session_io(release_session_frame, req.session_id, "raw_df")
+    summary_cache.invalidate_session(req.session_id)
 
     logger.info(
         "Mappings confirmed for session %s — $%.2f total spend",
@@ -139,50 +213,73 @@ async def get_summary(
     start_date: str | None = Query(None),  # noqa: B008
     end_date: str | None = Query(None),  # noqa: B008
 ):
-    session = get_session_or_404(session_id)
+    session = await get_session_or_404(session_id)
 
     # When no date filters, clear any active filter and return the stored full summary
     if not start_date and not end_date:
-        session.pop("active_summary", None)
+        await run_session_io(update_session, session_id, {"active_summary": None})
         summary = session.get("summary")
         if not summary:
             raise HTTPException(status_code=404, detail="Summary not available")
         return summary
 
-    # Date-filtered summary: use stored mapped DataFrame
-    mapped_df: pd.DataFrame | None = session.get("mapped_df")
-    if mapped_df is None:
+    # Date-filtered summary: answered from the pre-aggregated cube when present
+    cube: SummaryCube | None = session.get("summary_cube")
+    mapped_df: pd.DataFrame | None = None
+    if cube is None:
+        mapped_df = await run_session_io(get_session_frame, session_id, "mapped_df")
+    if cube is None and mapped_df is None:
         raise HTTPException(status_code=400, detail="No mapped data in session")
 
-    df = mapped_df.copy()
-
+    start_dt = end_dt = None
     if start_date:
         start_dt = pd.to_datetime(start_date, errors="coerce")
         if pd.isna(start_dt):
             raise HTTPException(status_code=400, detail="Invalid start_date format")
-        df = df[df["date"] >= start_dt]
 
     if end_date:
         end_dt = pd.to_datetime(end_date, errors="coerce")
         if pd.isna(end_dt):
             raise HTTPException(status_code=400, detail="Invalid end_date format")
-        df = df[df["date"] <= end_dt]
 
-    if len(df) == 0:
-        raise HTTPException(status_code=400, detail="No data in selected date range")
+    cache_key = (session_id, session.get("summary_version"), start_dt, end_dt)
+    cached = summary_cache.get(cache_key)
+    if cached is not None:
+        await run_session_io(update_session, session_id, {"active_summary": cached})
+        return cached
+
+    # A re-confirm while this computes must not leave its result cached
+    generation = summary_cache.generation()
+    try:
+        if cube is not None:
+            filtered_summary = await run_in_worker(summarize_cube_range, cube, start_dt, end_dt)
+        else:
+            filtered_summary = await run_in_worker(
+                summarize_date_range, mapped_df, start_dt, end_dt
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
 
-    filtered_summary = summarize_dataframe(df)
-    session["active_summary"] = filtered_summary
+    summary_cache.put(cache_key, filtered_summary, generation)
+    await run_session_io(update_session, session_id, {"active_summary": filtered_summary})
     return filtered_summary
 
 
 @router.delete("/api/sessions/{session_id}")
 async def remove_session(session_id: str):
-    if not delete_session(session_id):
+    if not await run_session_io(delete_session, session_id):
         raise HTTPException(status_code=404, detail="Session not found")
+    summary_cache.invalidate_session(session_id)
     return {"status": "deleted"}
 
 
 @router.get("/api/sessions")
-async def get_sessions():
-    return {"sessions": list_sessions()}
+async def get_sessions(
+    limit: int = Query(SESSION_PAGE_SIZE, ge=1, le=SESSION_PAGE_MAX),  # noqa: B008
+    cursor: str | None = Query(None),  # noqa: B008
+):
+    try:
+        sessions, next_cursor = await run_session_io(list_sessions, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+    return {"sessions": sessions, "next_cursor": next_cursor}
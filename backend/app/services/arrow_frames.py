@@ -0,0 +1,66 @@
+"""Arrow IPC encoding of DataFrames — shared by the worker pool and session storage.
+
+Categoricals travel as Arrow dictionary arrays, so label columns stay
+integer-coded on disk and in blobs. Byte blobs are zstd-compressed stream
+format. Files use the uncompressed file format so they can be memory-mapped
+and read without copying.
+"""
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+_BLOB_OPTIONS = ipc.IpcWriteOptions(compression="zstd")
+
+# Raised by the encoders for frames Arrow cannot represent, above all object
+# columns mixing types (ints and strs). Callers fall back to keeping or pickling.
+ARROW_ENCODE_ERRORS = (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError)
+
+
+def frame_to_bytes(df: pd.DataFrame) -> bytes:
+    """Encode a DataFrame as a compressed Arrow IPC stream."""
+    table = pa.Table.from_pandas(df)
+    sink = pa.BufferOutputStream()
+    with ipc.new_stream(sink, table.schema, options=_BLOB_OPTIONS) as writer:
+        writer.write_table(table)
+    return bytes(sink.getvalue())
+
+
+def frame_from_bytes(data: bytes) -> pd.DataFrame:
+    return ipc.open_stream(pa.py_buffer(data)).read_all().to_pandas()
+
+
+def write_frame_file(df: pd.DataFrame, path: str) -> None:
+    """Write a DataFrame as an Arrow IPC file that `read_frame_file` can memory-map."""
+    table = pa.Table.from_pandas(df)
+    with pa.OSFile(path, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def read_frame_file(path: str) -> pd.DataFrame:
+    """Memory-map an Arrow IPC file and convert it to a DataFrame.
+
+    Mapping skips an intermediate read buffer, but `to_pandas` still
+    materializes every column: the result costs as much memory as the
+    original frame.
+    """
+    with pa.memory_map(path, "r") as source:
+        table = ipc.open_file(source).read_all()
+    return table.to_pandas()
+
+
+def _arrow_backed(arrow_type: pa.DataType) -> pd.ArrowDtype | None:
+    # Dictionary columns become pandas categoricals (the mapper cannot keep `.cat`)
+    return None if pa.types.is_dictionary(arrow_type) else pd.ArrowDtype(arrow_type)
+
+
+def map_frame_file(path: str) -> pd.DataFrame:
+    """Memory-map an Arrow IPC file as an Arrow-backed DataFrame, without copying.
+
+    Columns keep pointing into the mapping, so the frame costs no heap memory
+    beyond categorical codes and a non-range index. The mapping outlives an
+    unlink of the file and is released with the last column that uses it.
+    """
+    with pa.memory_map(path, "r") as source:
+        table = ipc.open_file(source).read_all()
+    return table.to_pandas(types_mapper=_arrow_backed)
@@ -1,23 +1,60 @@
 """Process uploaded CSV/XLSX data with Pandas to produce summaries for agents."""
 
-import re
-from difflib import SequenceMatcher
-from io import BytesIO, StringIO
+import io
+import logging
+import shutil
+import tempfile
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import IO
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 
 from app.config import (
-    DUPLICATE_VENDOR_CAP,
-    DUPLICATE_VENDOR_THRESHOLD,
+    APPROX_DISTINCT_MIN_ROWS,
+    CSV_CHUNK_ROWS,
+    GROUP_BY_CANONICAL_VENDOR,
+    HLL_PRECISION,
     MAX_COLUMNS,
     MAX_ROWS,
+    PARSE_ENGINE,
+    PROFILE_WORKERS,
     TOP_VENDORS_LIMIT,
+    UPLOAD_CHUNK_SIZE_BYTES,
 )
-from app.models.schemas import ColumnStats, DataSummary, SuggestedMapping
+from app.models.schemas import (
+    CategorySummary,
+    ColumnStats,
+    DataSummary,
+    DepartmentSummary,
+    MonthlyTrend,
+    SuggestedMapping,
+    VendorSummary,
+)
+from app.services.date_formats import infer_date_format, parse_dates
+from app.services.hyperloglog import approximate_distinct
+from app.services.vendor_dedup import (
+    VendorPair,
+    duplicate_vendor_pairs,
+    find_duplicate_vendors,
+    normalize_vendor_names,
+)
+
+logger = logging.getLogger("arena.data")
+
+# What the parsers read: files, spools and the raw readers uploads arrive through
+ByteStream = IO[bytes] | io.RawIOBase
 
 # Characters that trigger formula execution in spreadsheet applications
 _FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r", "\n")
 
+# Rows rendered per chunk of a streamed CSV export
+_CSV_EXPORT_CHUNK_ROWS = 50_000
+
 # Keyword hints per target field (lowercase)
 _FIELD_KEYWORDS: dict[str, list[str]] = {
     "date": [
@@ -82,60 +119,253 @@ _FIELD_KEYWORDS: dict[str, list[str]] = {
 }
 
 
-# Common business suffixes to strip before comparing vendor names
-_BUSINESS_SUFFIXES = re.compile(
-    r"\b(pty|ltd|limited|p/l|p-l|inc|incorporated|corp|corporation|"
-    r"llc|llp|plc|gmbh|australia|aust|nsw|vic|qld|act|sa|wa|nt|tas)\b",
-    re.IGNORECASE,
-)
+class FileTooLargeError(ValueError):
+    """Raised when an upload stream grows past the configured byte limit."""
 
 
-def _normalize_vendor(name: str) -> str:
-    """Strip common suffixes and punctuation so comparison focuses on the real name."""
-    name = name.lower().strip()
-    name = _BUSINESS_SUFFIXES.sub("", name)
-    name = re.sub(r"[^a-z0-9\s]", "", name)  # remove punctuation
-    return " ".join(name.split())  # collapse whitespace
-
-
-def find_duplicate_vendors(
-    vendors: list[str], threshold: float = DUPLICATE_VENDOR_THRESHOLD
-) -> list[str]:
-    """Find vendor names that look like duplicates."""
-    normalized = {v: _normalize_vendor(v) for v in vendors}
-    duplicates = []
-    seen = set()
-    for i, v1 in enumerate(vendors):
-        for v2 in vendors[i + 1 :]:
-            pair = tuple(sorted([v1, v2]))
-            if pair in seen:
-                continue
-            seen.add(pair)
-            n1, n2 = normalized[v1], normalized[v2]
-            if not n1 or not n2:
-                continue
-            ratio = SequenceMatcher(None, n1, n2).ratio()
-            if ratio >= threshold and n1 != n2:
-                duplicates.append(f"{v1} / {v2} (similarity: {ratio:.0%})")
-    return duplicates
+class _LimitedReader(io.RawIOBase):
+    """Raw binary reader that stops the parse as soon as `max_bytes` is exceeded.
 
+    Over an upload read off the request body, this stops the transfer too.
+    Closing it leaves the wrapped stream open — the caller owns the upload.
+    """
+
+    def __init__(self, raw: ByteStream, max_bytes: int | None) -> None:
+        self._raw = raw
+        self._max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._raw.read(len(buffer))
+        n = len(data)
+        buffer[:n] = data
+        self.bytes_read += n
+        if self._max_bytes is not None and self.bytes_read > self._max_bytes:
+            raise FileTooLargeError(f"File exceeds maximum of {self._max_bytes:,} bytes")
+        return n
 
-def parse_file(content: bytes, filename: str) -> pd.DataFrame:
-    """Parse CSV or XLSX file into a DataFrame with normalized column names."""
-    if filename.lower().endswith(".xlsx"):
-        df = pd.read_excel(BytesIO(content), engine="openpyxl")
-    else:
-        df = pd.read_csv(StringIO(content.decode("utf-8")))
 
+class _RecordingReader(io.RawIOBase):
+    """Raw binary reader that keeps a spooled copy of what it has read.
+
+    Lets a parse of a non-seekable stream be retried from the start:
+    `replay` returns the recorded bytes followed by the rest of the stream.
+    """
+
+    def __init__(self, raw: ByteStream) -> None:
+        self._raw = raw
+        self._copy = tempfile.SpooledTemporaryFile(max_size=UPLOAD_CHUNK_SIZE_BYTES)  # noqa: SIM115
+        self._replaying = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._replaying:
+            data = self._copy.read(len(buffer)) or self._raw.read(len(buffer))
+        else:
+            data = self._raw.read(len(buffer))
+            self._copy.write(data)
+        n = len(data)
+        buffer[:n] = data
+        return n
+
+    def replay(self) -> "_RecordingReader":
+        self._copy.seek(0)
+        self._replaying = True
+        return self
+
+    def close(self) -> None:
+        self._copy.close()
+        super().close()
+
+
+def _spool(stream: ByteStream, max_bytes: int | None) -> IO[bytes]:
+    """Copy a non-seekable stream to a temporary file, within `max_bytes`."""
+    spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_CHUNK_SIZE_BYTES)  # noqa: SIM115
+    try:
+        shutil.copyfileobj(_LimitedReader(stream, max_bytes), spool, UPLOAD_CHUNK_SIZE_BYTES)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def _check_limits(df: pd.DataFrame) -> None:
     if len(df) > MAX_ROWS:
         raise ValueError(f"File exceeds maximum of {MAX_ROWS:,} rows ({len(df):,} found)")
     if len(df.columns) > MAX_COLUMNS:
         raise ValueError(f"File exceeds maximum of {MAX_COLUMNS} columns ({len(df.columns)} found)")
 
+
+def _dtype_kind(dtype) -> str:
+    # Ints and floats combine losslessly in concat (as a single read would upcast them)
+    if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+        return "number"
+    return str(dtype)
+
+
+def _conflicting_columns(chunks: list[pd.DataFrame]) -> list[str]:
+    """Columns whose inferred type differs between chunks (e.g. ints, then "A12")."""
+    return [
+        col
+        for col in chunks[0].columns
+        if len({_dtype_kind(chunk[col].dtype) for chunk in chunks}) > 1
+    ]
+
+
+def _read_csv_chunked(stream: ByteStream, max_bytes: int | None) -> pd.DataFrame:
+    """Decode and parse a CSV stream chunk by chunk, enforcing limits as rows arrive.
+
+    Each chunk infers its own dtypes. A column that is numeric in one chunk and
+    text in another is parsed again as text, so it comes back uniform — as
+    one `read_csv` over the whole file would return it — rather than as an
+    object column mixing ints and strs.
+    """
+    start = stream.tell() if stream.seekable() else None
+    chunks = _parse_csv_chunks(stream, max_bytes)
+    if len(chunks) == 1:
+        return chunks[0]
+
+    conflicts = _conflicting_columns(chunks)
+    if conflicts:
+        logger.info("Columns %s change type between chunks — reading them as text", conflicts)
+        if start is not None:
+            stream.seek(start)
+            chunks = _parse_csv_chunks(stream, max_bytes, dtype=dict.fromkeys(conflicts, str))
+        else:
+            for chunk in chunks:
+                for col in conflicts:
+                    chunk[col] = chunk[col].map(str, na_action="ignore").astype(str)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _parse_csv_chunks(
+    stream: ByteStream, max_bytes: int | None, dtype: dict[str, type] | None = None
+) -> list[pd.DataFrame]:
+    raw = _LimitedReader(stream, max_bytes)
+    text = io.TextIOWrapper(
+        io.BufferedReader(raw, buffer_size=UPLOAD_CHUNK_SIZE_BYTES), encoding="utf-8", newline=""
+    )
+
+    chunks: list[pd.DataFrame] = []
+    row_count = 0
+    with pd.read_csv(text, chunksize=CSV_CHUNK_ROWS, dtype=dtype) as reader:
+        for chunk in reader:
+            row_count += len(chunk)
+            if row_count > MAX_ROWS:
+                raise ValueError(
+                    f"File exceeds maximum of {MAX_ROWS:,} rows (over {MAX_ROWS:,} found)"
+                )
+            if len(chunk.columns) > MAX_COLUMNS:
+                raise ValueError(
+                    f"File exceeds maximum of {MAX_COLUMNS} columns ({len(chunk.columns)} found)"
+                )
+            chunks.append(chunk)
+    return chunks
+
+
+def _read_csv_arrow(stream: ByteStream, max_bytes: int | None) -> pd.DataFrame:
+    """Parse a CSV stream with Arrow's multithreaded reader into Arrow-backed dtypes.
+
+    Blocks are decoded in parallel and arrive as record batches, so the byte and
+    row limits trip as early as they do on the chunked C-engine path.
+    """
+    raw = _LimitedReader(stream, max_bytes)
+    reader = pa_csv.open_csv(
+        io.BufferedReader(raw, buffer_size=UPLOAD_CHUNK_SIZE_BYTES),
+        read_options=pa_csv.ReadOptions(use_threads=True, block_size=UPLOAD_CHUNK_SIZE_BYTES),
+        convert_options=pa_csv.ConvertOptions(strings_can_be_null=True),
+    )
+    if len(reader.schema) > MAX_COLUMNS:
+        raise ValueError(
+            f"File exceeds maximum of {MAX_COLUMNS} columns ({len(reader.schema)} found)"
+        )
+
+    batches: list[pa.RecordBatch] = []
+    row_count = 0
+    for batch in reader:
+        row_count += batch.num_rows
+        if row_count > MAX_ROWS:
+            raise ValueError(f"File exceeds maximum of {MAX_ROWS:,} rows (over {MAX_ROWS:,} found)")
+        batches.append(batch)
+
+    table = pa.Table.from_batches(batches, schema=reader.schema)
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def _to_arrow_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    return df.convert_dtypes(dtype_backend="pyarrow")
+
+
+_ARROW_STRING = pd.ArrowDtype(pa.string())
+_ARROW_TIMESTAMP = pd.ArrowDtype(pa.timestamp("ns"))
+
+
+def _is_arrow(series: pd.Series) -> bool:
+    return isinstance(series.dtype, pd.ArrowDtype)
+
+
+def parse_stream(stream: ByteStream, filename: str, max_bytes: int | None = None) -> pd.DataFrame:
+    """Parse a CSV or XLSX binary stream into a DataFrame with normalized column names.
+
+    CSV bodies are decoded and parsed incrementally, so `max_bytes` and MAX_ROWS
+    trip as soon as the offending chunk is parsed rather than after a full
+    read; over an upload read off the request body, the rest is never sent.
+    XLSX is a zip container and needs random access, so a non-seekable stream
+    is first copied to a temporary file, within `max_bytes`.
+
+    With PARSE_ENGINE="pyarrow" every column comes back Arrow-backed. Arrow infers
+    CSV types from the first block, so a file whose later rows contradict that
+    guess is re-read with the C engine and then converted; a non-seekable
+    stream is re-read from a copy of what Arrow consumed.
+    """
+    if filename.lower().endswith(".xlsx"):
+        if not stream.seekable():
+            with _spool(stream, max_bytes) as spool:
+                return parse_stream(spool, filename, max_bytes)
+        if max_bytes is not None:
+            size = stream.seek(0, io.SEEK_END)
+            stream.seek(0)
+            if size > max_bytes:
+                raise FileTooLargeError(f"File exceeds maximum of {max_bytes:,} bytes")
+        df = pd.read_excel(stream, engine="openpyxl")
+        if PARSE_ENGINE == "pyarrow":
+            df = _to_arrow_dtypes(df)
+    elif PARSE_ENGINE == "pyarrow" and not stream.seekable():
+        with _RecordingReader(stream) as recorded:
+            try:
+                df = _read_csv_arrow(recorded, max_bytes)
+            except pa.ArrowInvalid:
+                logger.warning(
+                    "Arrow CSV parse failed for %s — retrying with the C engine", filename
+                )
+                df = _to_arrow_dtypes(_read_csv_chunked(recorded.replay(), max_bytes))
+    elif PARSE_ENGINE == "pyarrow":
+        start = stream.tell()
+        try:
+            df = _read_csv_arrow(stream, max_bytes)
+        except pa.ArrowInvalid:
+            logger.warning("Arrow CSV parse failed for %s — retrying with the C engine", filename)
+            stream.seek(start)
+            df = _to_arrow_dtypes(_read_csv_chunked(stream, max_bytes))
+    else:
+        df = _read_csv_chunked(stream, max_bytes)
+
+    _check_limits(df)
     df.columns = [c.strip().lower() for c in df.columns]
     return df
 
 
+def parse_file(content: bytes, filename: str) -> pd.DataFrame:
+    """Parse in-memory CSV or XLSX bytes into a DataFrame with normalized column names."""
+    return parse_stream(io.BytesIO(content), filename)
+
+
 def suggest_column_mappings(columns: list[str]) -> list[SuggestedMapping]:
     """Auto-suggest mappings from source columns to required target fields."""
     suggestions: list[SuggestedMapping] = []
@@ -175,130 +405,275 @@ def suggest_column_mappings(columns: list[str]) -> list[SuggestedMapping]:
 _DTYPE_SAMPLE_SIZE = 1000
 
 
-def _infer_dtype(series: pd.Series) -> str:
-    """Infer a human-readable dtype for a column using a sample for speed."""
+@dataclass
+class _DateParse:
+    """Parsed date values plus how they were parsed, carried from inference to min/max."""
+
+    parsed: pd.Series
+    fmt: str | None
+    fallback_count: int
+
+
+def _infer_dtype(series: pd.Series, candidates: pd.Series) -> tuple[str, _DateParse | None]:
+    """Infer a human-readable dtype for a column using a sample for speed.
+
+    `candidates` are the column's distinct non-null values; only the first
+    _DTYPE_SAMPLE_SIZE are test-parsed. For date columns the parsed sample and
+    its inferred format are returned, so the caller can extend the parse on the
+    fixed-format path instead of parsing those values again.
+    """
     if pd.api.types.is_bool_dtype(series):
-        return "boolean"
+        return "boolean", None
     if pd.api.types.is_numeric_dtype(series):
-        return "numeric"
-    # Sample non-null values to avoid parsing huge columns
-    non_null = series.dropna()
-    if len(non_null) > 0:
-        sample = non_null.head(_DTYPE_SAMPLE_SIZE)
+        return "numeric", None
+    if len(candidates) > 0:
+        sample = candidates.iloc[:_DTYPE_SAMPLE_SIZE]
         try:
-            parsed = pd.to_datetime(sample, errors="coerce")
+            fmt = infer_date_format(sample)
+            parsed, fallback_count = parse_dates(sample, fmt)
             if parsed.notna().sum() / len(sample) > 0.5:
-                return "date"
+                return "date", _DateParse(parsed, fmt, fallback_count)
         except Exception:  # noqa: S110
             pass
-    return "string"
-
-
-def compute_column_stats(df: pd.DataFrame) -> list[ColumnStats]:
-    """Compute per-column data quality statistics."""
-    stats: list[ColumnStats] = []
-
-    for col in df.columns:
-        series = df[col]
-        total = len(series)
-        missing = int(series.isna().sum())
-        missing_pct = round((missing / total) * 100, 1) if total > 0 else 0.0
-        non_null = series.dropna()
-        unique = int(non_null.nunique())
-
-        # Grab first 5 distinct values, sanitize formula-injection prefixes
-        raw_samples = [str(v) for v in non_null.drop_duplicates().head(5)]
-        sample_values = [f"'{v}" if v and v[0] in _FORMULA_PREFIXES else v for v in raw_samples]
-
-        dtype = _infer_dtype(series)
-
-        min_val: str | None = None
-        max_val: str | None = None
-
-        if dtype == "numeric" and len(non_null) > 0:
-            min_val = str(series.min())
-            max_val = str(series.max())
-        elif dtype == "date" and len(non_null) > 0:
-            parsed = pd.to_datetime(non_null, errors="coerce").dropna()
-            if len(parsed) > 0:
-                min_val = parsed.min().strftime("%Y-%m-%d")
-                max_val = parsed.max().strftime("%Y-%m-%d")
-
-        stats.append(
-            ColumnStats(
-                name=col,
-                dtype=dtype,
-                total_count=total,
-                missing_count=missing,
-                missing_pct=missing_pct,
-                unique_count=unique,
-                sample_values=sample_values,
-                min_value=min_val,
-                max_value=max_val,
-            )
-        )
-
-    return stats
+    return "string", None
 
 
-def summarize_dataframe(df: pd.DataFrame) -> DataSummary:
-    """Compute DataSummary from an already-mapped DataFrame.
+def _profile_column(name: str, series: pd.Series) -> ColumnStats:
+    """Profile one column from a single null-drop and a single hashing pass.
 
-    Expects columns: date (datetime), vendor, category, amount (numeric),
-    department, month (period string).
+    Above APPROX_DISTINCT_MIN_ROWS the distinct count of non-date columns comes
+    from a HyperLogLog sketch instead of an exact hash table of every value.
     """
-    total_spend = float(df["amount"].sum())
-    row_count = len(df)
+    total = len(series)
+    non_null = series.dropna()
+    missing = total - len(non_null)
+    missing_pct = round((missing / total) * 100, 1) if total > 0 else 0.0
 
-    date_min = df["date"].min()
-    date_max = df["date"].max()
-    date_min_str = date_min.strftime("%Y-%m-%d") if pd.notna(date_min) else None
-    date_max_str = date_max.strftime("%Y-%m-%d") if pd.notna(date_max) else None
-    date_range = f"{date_min_str} to {date_max_str}" if date_min_str and date_max_str else "N/A"
+    # Distinct values in order of first appearance: count, samples and date
+    # candidates all come from this one pass. On large columns only the head is
+    # deduplicated — its distinct values are a prefix of the full column's.
+    approximate = total > APPROX_DISTINCT_MIN_ROWS
+    if approximate:
+        distinct = pd.Series(non_null.iloc[: _DTYPE_SAMPLE_SIZE * 10].unique())
+    else:
+        distinct = pd.Series(non_null.unique())
 
-    top_vendors = (
-        df.groupby("vendor")["amount"]
-        .agg(["sum", "count"])
-        .sort_values("sum", ascending=False)
-        .head(TOP_VENDORS_LIMIT)
-        .reset_index()
-        .rename(columns={"sum": "total_spend", "count": "transaction_count"})
-        .to_dict("records")
-    )
+    # Grab first 5 distinct values, sanitize formula-injection prefixes
+    raw_samples = [str(v) for v in distinct.iloc[:5]]
+    sample_values = [_defuse_formula(v) for v in raw_samples]
 
-    category_breakdown = (
-        df.groupby("category")["amount"]
-        .agg(["sum", "count"])
-        .sort_values("sum", ascending=False)
-        .reset_index()
-        .rename(columns={"sum": "total_spend", "count": "transaction_count"})
-        .to_dict("records")
-    )
+    dtype, date_parse = _infer_dtype(series, distinct)
 
-    department_breakdown = (
-        df.groupby("department")["amount"]
-        .agg(["sum", "count"])
-        .sort_values("sum", ascending=False)
-        .reset_index()
-        .rename(columns={"sum": "total_spend", "count": "transaction_count"})
-        .to_dict("records")
-    )
+    if approximate and dtype == "date":
+        # Dates are low-cardinality and min/max needs every distinct day anyway
+        distinct = pd.Series(non_null.unique())
+        approximate = False
 
-    monthly_trends = (
-        df.groupby("month")["amount"]
-        .sum()
-        .sort_index()
-        .reset_index()
-        .rename(columns={"amount": "total_spend"})
-        .to_dict("records")
+    min_val: str | None = None
+    max_val: str | None = None
+
+    if dtype == "numeric" and len(non_null) > 0:
+        min_val = str(non_null.min())
+        max_val = str(non_null.max())
+    elif dtype == "date" and date_parse is not None:
+        # Only distinct values beyond the already-parsed sample need parsing
+        rest = distinct.iloc[len(date_parse.parsed) :]
+        if len(rest) > 0:
+            parsed_rest, fallback_count = parse_dates(rest, date_parse.fmt)
+            date_parse.parsed = pd.concat([date_parse.parsed, parsed_rest])
+            date_parse.fallback_count += fallback_count
+        parsed = date_parse.parsed.dropna()
+        if len(parsed) > 0:
+            min_val = parsed.min().strftime("%Y-%m-%d")
+            max_val = parsed.max().strftime("%Y-%m-%d")
+
+    date_format: str | None = None
+    date_fallback_pct: float | None = None
+    if date_parse is not None:
+        # Measured over distinct values — the unit the profiler actually parses
+        date_format = date_parse.fmt
+        date_fallback_pct = round(date_parse.fallback_count / len(date_parse.parsed) * 100, 1)
+
+    unique_error_pct: float | None = None
+    if approximate:
+        unique, relative_error = approximate_distinct(non_null, HLL_PRECISION)
+        unique_error_pct = round(relative_error * 100, 2)
+    else:
+        unique = len(distinct)
+
+    return ColumnStats(
+        name=name,
+        dtype=dtype,
+        total_count=total,
+        missing_count=missing,
+        missing_pct=missing_pct,
+        unique_count=unique,
+        unique_count_approximate=approximate,
+        unique_count_error_pct=unique_error_pct,
+        sample_values=sample_values,
+        min_value=min_val,
+        max_value=max_val,
+        date_format=date_format,
+        date_fallback_pct=date_fallback_pct,
     )
 
-    unique_vendors = df["vendor"].unique().tolist()
-    # Cap to prevent O(n^2) explosion with many vendors
-    duplicate_vendors = find_duplicate_vendors(unique_vendors[:DUPLICATE_VENDOR_CAP])
 
+def compute_column_stats(df: pd.DataFrame, workers: int | None = None) -> list[ColumnStats]:
+    """Compute per-column data quality statistics.
+
+    Columns are independent, so with `workers` > 1 (default PROFILE_WORKERS)
+    they are profiled concurrently on a thread pool; output order is unchanged.
+    """
+    workers = PROFILE_WORKERS if workers is None else workers
+    columns = list(df.columns)
+    if workers <= 1 or len(columns) <= 1:
+        return [_profile_column(col, df[col]) for col in columns]
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="profile") as pool:
+        return list(pool.map(_profile_column, columns, (df[col] for col in columns)))
+
+
+def _label_codes(series: pd.Series) -> tuple[np.ndarray, pd.Index]:
+    """Integer codes (-1 = missing) and their labels for a label column."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(dtype=np.intp), series.cat.categories
+    codes, uniques = pd.factorize(series)
+    return codes.astype(np.intp), pd.Index(uniques)
+
+
+def _observed_labels(codes: np.ndarray, labels: pd.Index) -> list[str]:
+    """Labels with at least one code, in label order."""
+    return [str(v) for v in labels[np.unique(codes[codes >= 0])]]
+
+
+def _month_codes(month: pd.Series) -> tuple[np.ndarray, pd.Index]:
+    """Dense, chronologically ordered codes for the month column.
+
+    Integer YYYYMM keys map arithmetically to months since the earliest one,
+    so no hashing or sorting is needed; legacy "YYYY-MM" strings are factorized.
+    """
+    if not pd.api.types.is_integer_dtype(month.dtype):
+        codes, uniques = pd.factorize(month, sort=True)
+        return codes.astype(np.intp), pd.Index(uniques)
+
+    keys = month.to_numpy(dtype=np.int64, na_value=-1)
+    valid = keys >= 0
+    if not valid.any():
+        return np.full(len(keys), -1, dtype=np.intp), pd.Index([])
+    ordinals = (keys // 100) * 12 + keys % 100 - 1
+    first, last = int(ordinals[valid].min()), int(ordinals[valid].max())
+    codes = np.where(valid, ordinals - first, -1).astype(np.intp)
+    labels = pd.Index([f"{o // 12:04d}-{o % 12 + 1:02d}" for o in range(first, last + 1)])
+    return codes, labels
+
+
+@dataclass
+class _CodedSpend:
+    """Spend rows (or pre-aggregated cells) reduced to integer codes per dimension.
+
+    `counts` is the number of transactions behind each entry; None means one
+    transaction per entry, i.e. raw rows.
+    """
+
+    amounts: np.ndarray
+    counts: np.ndarray | None
+    dimensions: dict[str, tuple[np.ndarray, pd.Index]]
+
+
+def _bincount_totals(
+    codes: np.ndarray, n: int, amounts: np.ndarray, counts: np.ndarray | None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Spend (rounded to cents, like the overall total) and transaction count per code.
+
+    Missing (-1) codes are ignored.
+    """
+    valid = codes >= 0
+    if not valid.all():
+        codes, amounts = codes[valid], amounts[valid]
+        counts = counts[valid] if counts is not None else None
+    totals = np.bincount(codes, weights=amounts, minlength=n).round(2)
+    tallies = np.bincount(codes, weights=counts, minlength=n)
+    return totals, tallies.astype(np.int64)
+
+
+def _ranked(totals: np.ndarray, tallies: np.ndarray) -> np.ndarray:
+    """Indices of observed codes, largest spend first (ties keep code order)."""
+    observed = np.flatnonzero(tallies > 0)
+    return observed[np.argsort(-totals[observed], kind="stable")]
+
+
+def _summarize_coded(
+    coded: _CodedSpend,
+    date_min: pd.Timestamp | None,
+    date_max: pd.Timestamp | None,
+    duplicates: list[VendorPair] | None = None,
+) -> DataSummary:
+    """Aggregation kernel shared by row-level and pre-aggregated summaries.
+
+    Each breakdown is one bincount over integer codes; results go straight
+    into the Pydantic models without intermediate DataFrames. `duplicates`,
+    when given, are the duplicate pairs of a superset of the vendors here
+    and are filtered instead of scoring the vendors again.
+    """
+    breakdowns = {
+        name: (labels, *_bincount_totals(codes, len(labels), coded.amounts, coded.counts))
+        for name, (codes, labels) in coded.dimensions.items()
+    }
+
+    vendor_labels, vendor_totals, vendor_tallies = breakdowns["vendor"]
+    top_vendors = [
+        VendorSummary(
+            vendor=str(vendor_labels[i]),
+            total_spend=float(vendor_totals[i]),
+            transaction_count=int(vendor_tallies[i]),
+        )
+        for i in _ranked(vendor_totals, vendor_tallies)[:TOP_VENDORS_LIMIT]
+    ]
+
+    category_labels, category_totals, category_tallies = breakdowns["category"]
+    category_breakdown = [
+        CategorySummary(
+            category=str(category_labels[i]),
+            total_spend=float(category_totals[i]),
+            transaction_count=int(category_tallies[i]),
+        )
+        for i in _ranked(category_totals, category_tallies)
+    ]
+
+    department_labels, department_totals, department_tallies = breakdowns["department"]
+    department_breakdown = [
+        DepartmentSummary(
+            department=str(department_labels[i]),
+            total_spend=float(department_totals[i]),
+            transaction_count=int(department_tallies[i]),
+        )
+        for i in _ranked(department_totals, department_tallies)
+    ]
+
+    month_labels, month_totals, month_tallies = breakdowns["month"]
+    monthly_trends = [
+        MonthlyTrend(month=str(month_labels[i]), total_spend=float(month_totals[i]))
+        for i in np.flatnonzero(month_tallies > 0)
+    ]
+
+    unique_vendors = [str(v) for v in vendor_labels[np.flatnonzero(vendor_tallies > 0)]]
+    if duplicates is None:
+        duplicate_vendors = find_duplicate_vendors(unique_vendors)
+    else:
+        present = set(unique_vendors)
+        duplicate_vendors = [m for a, b, m in duplicates if a in present and b in present]
+
+    date_min_str = (
+        date_min.strftime("%Y-%m-%d") if date_min is not None and pd.notna(date_min) else None
+    )
+    date_max_str = (
+        date_max.strftime("%Y-%m-%d") if date_max is not None and pd.notna(date_max) else None
+    )
+    date_range = f"{date_min_str} to {date_max_str}" if date_min_str and date_max_str else "N/A"
+
+    row_count = len(coded.amounts) if coded.counts is None else int(coded.counts.sum())
     return DataSummary(
-        total_spend=round(total_spend, 2),
+        total_spend=round(float(coded.amounts.sum()), 2),
         row_count=row_count,
         unique_vendor_count=len(unique_vendors),
         date_range=date_range,
@@ -312,29 +687,302 @@ def summarize_dataframe(df: pd.DataFrame) -> DataSummary:
     )
 
 
+def _vendor_column(df: pd.DataFrame, canonical_vendors: bool | None) -> str:
+    """Column the vendor breakdown groups on (None = GROUP_BY_CANONICAL_VENDOR)."""
+    if canonical_vendors is None:
+        canonical_vendors = GROUP_BY_CANONICAL_VENDOR
+    return "vendor_canonical" if canonical_vendors and "vendor_canonical" in df else "vendor"
+
+
+def summarize_dataframe(
+    df: pd.DataFrame,
+    canonical_vendors: bool | None = None,
+    duplicates: list[VendorPair] | None = None,
+) -> DataSummary:
+    """Compute DataSummary from an already-mapped DataFrame.
+
+    Expects columns: date (datetime), vendor, category, amount (numeric),
+    department, month (integer YYYYMM key or "YYYY-MM" string). Label columns
+    are reduced to integer codes once (free for categoricals) and every
+    breakdown is a bincount over those codes; only labels observed in `df`
+    are reported, so date-filtered slices have no empty groups.
+
+    With `canonical_vendors`, vendors are grouped on the `vendor_canonical`
+    column, so spelling variants of one supplier are totalled together.
+    `duplicates` skips duplicate detection, as in `_summarize_coded`.
+    """
+    coded = _CodedSpend(
+        amounts=df["amount"].to_numpy(dtype=np.float64, na_value=0.0),
+        counts=None,
+        dimensions={
+            "vendor": _label_codes(df[_vendor_column(df, canonical_vendors)]),
+            "category": _label_codes(df["category"]),
+            "department": _label_codes(df["department"]),
+            "month": _month_codes(df["month"]),
+        },
+    )
+    return _summarize_coded(coded, df["date"].min(), df["date"].max(), duplicates)
+
+
+def _to_label_category(series: pd.Series) -> pd.Series:
+    """Dictionary-encode a label column, mapping missing values to "Unknown".
+
+    Only the distinct values are stringified; rows keep integer codes. Arrow
+    input keeps Arrow-backed string categories.
+    """
+    codes, uniques = pd.factorize(series)
+    labels = pd.Series(uniques).astype(_ARROW_STRING if _is_arrow(series) else str)
+    labels = labels.replace("nan", "Unknown")
+    if (codes == -1).any():
+        codes = codes.copy()
+        codes[codes == -1] = len(labels)
+        labels = pd.concat([labels, pd.Series(["Unknown"], dtype=labels.dtype)], ignore_index=True)
+    # Distinct raw values can stringify to the same label (e.g. 1 and "1"); merge them
+    label_codes, categories = pd.factorize(labels)
+    return pd.Series(
+        pd.Categorical.from_codes(label_codes[codes], categories=categories),
+        index=series.index,
+        name=series.name,
+    )
+
+
+def _canonical_vendor_category(vendor: pd.Series, amounts: np.ndarray) -> pd.Series:
+    """Map each vendor label to one canonical spelling per normalized name.
+
+    Normalization runs once over the distinct labels, not per row. Within a
+    normalized name, the spelling carrying the most spend becomes the
+    canonical label; rows are remapped through their integer codes.
+    """
+    codes = vendor.cat.codes.to_numpy(dtype=np.intp)
+    labels = vendor.cat.categories
+    normalized = normalize_vendor_names(pd.Series(labels))
+    # Labels that normalize to nothing (e.g. just "Pty Ltd") stay as they are
+    keys = normalized.where(normalized != "", pd.Series(labels, dtype=object).radd("\x00"))
+    key_codes, _ = pd.factorize(keys)
+
+    present = codes >= 0
+    label_spend = np.bincount(codes[present], weights=amounts[present], minlength=len(labels))
+    representative = pd.Series(label_spend).groupby(key_codes, sort=True).idxmax().to_numpy()
+
+    row_codes = np.where(present, key_codes[np.where(present, codes, 0)], -1)
+    return pd.Series(
+        pd.Categorical.from_codes(row_codes, categories=labels[representative]),
+        index=vendor.index,
+        name="vendor_canonical",
+    )
+
+
+def summarize_date_range(
+    df: pd.DataFrame,
+    start: pd.Timestamp | None = None,
+    end: pd.Timestamp | None = None,
+) -> DataSummary:
+    """Filter a mapped DataFrame to [start, end] and summarize the remaining rows."""
+    mask = pd.Series(True, index=df.index)
+    # Arrow comparisons yield <NA> for missing dates; treat those as outside the range
+    if start is not None:
+        mask &= (df["date"] >= start).fillna(False)
+    if end is not None:
+        mask &= (df["date"] <= end).fillna(False)
+    if not mask.any():
+        raise ValueError("No data in selected date range")
+    return summarize_dataframe(df[mask])
+
+
+_NAT = np.iinfo(np.int64).min
+
+
+def _timestamps_ns(dates: pd.Series) -> np.ndarray:
+    """Datetime column as int64 nanoseconds since epoch (NaT → int64 min)."""
+    if _is_arrow(dates):
+        values = dates.to_numpy(dtype="datetime64[ns]", na_value=np.datetime64("NaT"))
+    else:
+        values = dates.to_numpy(dtype="datetime64[ns]")
+    return np.asarray(values).view(np.int64)
+
+
+@dataclass
+class SummaryCube:
+    """Spend pre-aggregated by date × vendor × category × department.
+
+    Cells are sorted by timestamp, so a date window is a contiguous slice
+    found by binary search. Dates are kept at the resolution the data has —
+    plain dates give one cell per day — so window bounds behave exactly as
+    the row-level filter. Rows without a date are left out; no window can
+    select them.
+
+    Duplicate vendors are found once for every vendor in the cube; a window
+    keeps the pairs whose two vendors both appear in it.
+    """
+
+    timestamps: np.ndarray  # int64 ns, ascending
+    amounts: np.ndarray  # float64 spend per cell
+    counts: np.ndarray  # int64 transactions per cell
+    dimensions: dict[str, tuple[np.ndarray, pd.Index]]  # name -> (codes per cell, labels)
+    # None on cubes stored before pairs were kept; windows then score their vendors
+    duplicate_vendors: list[VendorPair] | None = None
+
+    @property
+    def cell_count(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def nbytes(self) -> int:
+        size = self.timestamps.nbytes + self.amounts.nbytes + self.counts.nbytes
+        for codes, labels in self.dimensions.values():
+            size += codes.nbytes + labels.memory_usage(deep=True)
+        for pair in self.duplicate_vendors or ():
+            size += sum(len(text) for text in pair)
+        return int(size)
+
+
+def build_summary_cube(
+    df: pd.DataFrame,
+    canonical_vendors: bool | None = None,
+    duplicates: list[VendorPair] | None = None,
+) -> SummaryCube:
+    """Aggregate a mapped DataFrame into a SummaryCube (once, at confirm time).
+
+    `duplicates` may pass in the duplicate pairs of every vendor in `df`,
+    already found for its summary; otherwise the cube's vendors are scored.
+    """
+    timestamps = _timestamps_ns(df["date"])
+    has_date = timestamps != _NAT
+    labelled = {
+        "vendor": _label_codes(df[_vendor_column(df, canonical_vendors)]),
+        "category": _label_codes(df["category"]),
+        "department": _label_codes(df["department"]),
+    }
+
+    columns: dict[str, np.ndarray] = {"timestamp": timestamps[has_date]}
+    for name, (codes, _) in labelled.items():
+        columns[name] = codes[has_date]
+    columns["amount"] = df["amount"].to_numpy(dtype=np.float64, na_value=0.0)[has_date]
+    cells = (
+        pd.DataFrame(columns)
+        .groupby(["timestamp", *labelled], sort=True)["amount"]
+        .agg(["sum", "count"])
+        .reset_index()
+    )
+
+    cell_times = cells["timestamp"].to_numpy(dtype=np.int64)
+    cell_dates = pd.Series(cell_times.view("datetime64[ns]"))
+    month_keys = (cell_dates.dt.year * 100 + cell_dates.dt.month).astype("Int32")
+
+    dimensions = {
+        name: (cells[name].to_numpy(dtype=np.intp), labels)
+        for name, (_, labels) in labelled.items()
+    }
+    dimensions["month"] = _month_codes(month_keys)
+    if duplicates is None:
+        duplicates = duplicate_vendor_pairs(_observed_labels(*dimensions["vendor"]))
+    return SummaryCube(
+        timestamps=cell_times,
+        amounts=cells["sum"].to_numpy(dtype=np.float64),
+        counts=cells["count"].to_numpy(dtype=np.int64),
+        dimensions=dimensions,
+        duplicate_vendors=duplicates,
+    )
+
+
+def summarize_cube_range(
+    cube: SummaryCube,
+    start: pd.Timestamp | None = None,
+    end: pd.Timestamp | None = None,
+) -> DataSummary:
+    """Summarize the cells inside [start, end] — cost scales with cells, not rows."""
+    lo = 0 if start is None else int(np.searchsorted(cube.timestamps, start.value, "left"))
+    hi = (
+        cube.cell_count
+        if end is None
+        else int(np.searchsorted(cube.timestamps, end.value, "right"))
+    )
+    if lo >= hi:
+        raise ValueError("No data in selected date range")
+
+    window = slice(lo, hi)
+    coded = _CodedSpend(
+        amounts=cube.amounts[window],
+        counts=cube.counts[window],
+        dimensions={
+            name: (codes[window], labels) for name, (codes, labels) in cube.dimensions.items()
+        },
+    )
+    return _summarize_coded(
+        coded,
+        pd.Timestamp(cube.timestamps[lo]),
+        pd.Timestamp(cube.timestamps[hi - 1]),
+        cube.duplicate_vendors,
+    )
+
+
 def apply_mappings_and_summarize(
-    df: pd.DataFrame, mappings: dict[str, str]
+    df: pd.DataFrame,
+    mappings: dict[str, str],
+    date_formats: dict[str, str] | None = None,
 ) -> tuple[pd.DataFrame, DataSummary]:
-    """Rename columns per mappings, then compute DataSummary.
+    """Select and rename the mapped columns, then compute DataSummary.
 
     mappings: { target_field: source_column }, e.g. {"date": "publish date", ...}
+    date_formats: { source_column: strptime format } as inferred at upload; when
+    the date column has none, one is inferred from a sample here.
     """
-    rename_map = {source: target for target, source in mappings.items()}
-    df = df.rename(columns=rename_map)
+    df = _apply_mappings(df, mappings, date_formats)
+    return df, summarize_dataframe(df)
+
+
+def apply_mappings_and_aggregate(
+    df: pd.DataFrame,
+    mappings: dict[str, str],
+    date_formats: dict[str, str] | None = None,
+) -> tuple[pd.DataFrame, DataSummary, SummaryCube]:
+    """`apply_mappings_and_summarize`, plus the SummaryCube for date windows.
+
+    Duplicate vendors are found once, over every vendor, and shared by the
+    summary and the cube.
+    """
+    df = _apply_mappings(df, mappings, date_formats)
+    duplicates = duplicate_vendor_pairs(
+        _observed_labels(*_label_codes(df[_vendor_column(df, None)]))
+    )
+    return (
+        df,
+        summarize_dataframe(df, duplicates=duplicates),
+        build_summary_cube(df, None, duplicates),
+    )
+
+
+def _apply_mappings(
+    df: pd.DataFrame, mappings: dict[str, str], date_formats: dict[str, str] | None
+) -> pd.DataFrame:
+    # Only the mapped columns are materialized; the other raw columns are left behind
+    rename_map = {source: target for target, source in mappings.items() if source in df.columns}
+    df = df[list(rename_map)].rename(columns=rename_map)
 
     required = {"date", "vendor", "category", "amount", "department"}
     if not required.issubset(set(df.columns)):
         missing = required - set(df.columns)
         raise ValueError(f"After mapping, still missing columns: {missing}")
 
-    df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0)
+    if _is_arrow(df["amount"]):
+        df["amount"] = pd.to_numeric(df["amount"], errors="coerce", dtype_backend="pyarrow")
+    else:
+        df["amount"] = pd.to_numeric(df["amount"], errors="coerce")
+    df["amount"] = df["amount"].fillna(0)
     for col in ("vendor", "category", "department"):
-        df[col] = df[col].astype(str).replace("nan", "Unknown")
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df["month"] = df["date"].dt.to_period("M").astype(str)
+        df[col] = _to_label_category(df[col])
+    df["vendor_canonical"] = _canonical_vendor_category(
+        df["vendor"], df["amount"].to_numpy(dtype=np.float64, na_value=0.0)
+    )
 
-    summary = summarize_dataframe(df)
-    return df, summary
+    date_format = (date_formats or {}).get(mappings["date"]) or infer_date_format(
+        df["date"].dropna().iloc[:_DTYPE_SAMPLE_SIZE]
+    )
+    parsed_dates, _ = parse_dates(df["date"], date_format)
+    df["date"] = parsed_dates.astype(_ARROW_TIMESTAMP) if _is_arrow(df["date"]) else parsed_dates
+    # Integer YYYYMM key (<NA> for unparseable dates) instead of a string per row
+    df["month"] = (df["date"].dt.year * 100 + df["date"].dt.month).astype("Int32")
+    return df
 
 
 def process_file(content: bytes, filename: str) -> tuple[pd.DataFrame, DataSummary]:
@@ -349,3 +997,32 @@ def process_file(content: bytes, filename: str) -> tuple[pd.DataFrame, DataSumma
 
     mappings = {col: col for col in required}
     return apply_mappings_and_summarize(df, mappings)
+
+
+def _defuse_formula(value: str) -> str:
+    return f"'{value}" if value and value[0] in _FORMULA_PREFIXES else value
+
+
+def mapped_csv_chunks(df: pd.DataFrame, columns: list[str]) -> Iterator[str]:
+    """Render columns of a mapped DataFrame as CSV text, one chunk of rows at a time.
+
+    Label values that a spreadsheet would run as a formula are prefixed with a
+    quote, as in the column samples. Labels are sanitized once per category,
+    not per row. Dates are written as YYYY-MM-DD whatever backs the column:
+    pandas drops a midnight time on its own, but an Arrow timestamp does not.
+    """
+    frame = df[columns]
+    labels = {
+        col: np.array([_defuse_formula(str(v)) for v in frame[col].cat.categories] + [None])
+        for col in columns
+        if isinstance(frame[col].dtype, pd.CategoricalDtype)
+    }
+    for start in range(0, max(len(frame), 1), _CSV_EXPORT_CHUNK_ROWS):
+        chunk = frame.iloc[start : start + _CSV_EXPORT_CHUNK_ROWS]
+        # Code -1 (missing) indexes the trailing None
+        chunk = chunk.assign(
+            **{col: safe[chunk[col].cat.codes.to_numpy()] for col, safe in labels.items()}
+        )
+        if "date" in columns:
+            chunk = chunk.assign(date=chunk["date"].dt.strftime("%Y-%m-%d"))
+        yield chunk.to_csv(index=False, header=start == 0)
@@ -0,0 +1,100 @@
+"""Explicit date-format inference so every full-column parse takes the fixed-format path.
+
+Format-less `pd.to_datetime` falls back to per-element dateutil parsing on
+mixed or ambiguous data. Instead, a format is inferred once per column from the
+upload sample and reused for every later parse of that column. Values the
+format cannot read are re-parsed individually and counted, so the fallback rate
+is measured rather than hidden.
+"""
+
+import warnings
+
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+# Tried in order after pandas' own guess; ties keep the earlier (more common) format
+_CANDIDATE_FORMATS = (
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y/%m/%d",
+    "%d/%m/%Y",
+    "%m/%d/%Y",
+    "%d/%m/%y",
+    "%m/%d/%y",
+    "%d-%m-%Y",
+    "%d.%m.%Y",
+    "%d %b %Y",
+    "%d %B %Y",
+    "%b %d, %Y",
+    "%B %d, %Y",
+    "%d-%b-%Y",
+    "%d-%b-%y",
+    "%Y%m%d",
+)
+
+# A format must read at least this share of the sample to be adopted
+_MIN_FORMAT_HIT_RATE = 0.5
+
+# Every candidate format needs at least this many digits (e.g. "1/1/24" for %d/%m/%y)
+_CANDIDATE_MIN_DIGITS = 4
+
+
+def _is_text(series: pd.Series) -> bool:
+    return bool(pd.api.types.is_string_dtype(series) or pd.api.types.is_object_dtype(series))
+
+
+def infer_date_format(sample: pd.Series) -> str | None:
+    """Return the explicit format that parses the most sample values, or None."""
+    values = sample.dropna()
+    if len(values) == 0 or not _is_text(values):
+        return None
+    values = values.astype(str)
+
+    # Each candidate is a full parse of the sample. When too few values have
+    # the digits any candidate needs (names, categories), none could be adopted.
+    digit_rate = (values.str.count(r"\d") >= _CANDIDATE_MIN_DIGITS).mean()
+    candidates = list(_CANDIDATE_FORMATS) if digit_rate >= _MIN_FORMAT_HIT_RATE else []
+    # The guess is only a hint for candidate order; its dayfirst warnings are noise here
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        guess = guess_datetime_format(values.iloc[0])
+    if guess:
+        if guess in candidates:
+            candidates.remove(guess)
+        candidates.insert(0, guess)
+
+    best_format: str | None = None
+    best_hits = 0
+    for fmt in candidates:
+        hits = int(pd.to_datetime(values, format=fmt, errors="coerce").notna().sum())
+        if hits > best_hits:
+            best_format, best_hits = fmt, hits
+            if hits == len(values):
+                break
+
+    if best_hits / len(values) < _MIN_FORMAT_HIT_RATE:
+        return None
+    return best_format
+
+
+def parse_dates(series: pd.Series, fmt: str | None) -> tuple[pd.Series, int]:
+    """Parse a column with its inferred format; return (parsed, fallback count).
+
+    Non-null values the fixed format cannot read are re-parsed one by one
+    (`format="mixed"`); the returned count says how many needed that slow path.
+    Columns that are already datetime-typed are converted without parsing.
+    """
+    if not _is_text(series):
+        return pd.to_datetime(series, errors="coerce"), 0
+    if fmt is None:
+        parsed = pd.to_datetime(series, format="mixed", errors="coerce")
+        return parsed, int(series.notna().sum())
+
+    parsed = pd.to_datetime(series, format=fmt, errors="coerce")
+    failed = parsed.isna() & series.notna()
+    fallback_count = int(failed.sum())
+    if fallback_count:
+        parsed = parsed.copy()
+        parsed[failed] = pd.to_datetime(series[failed], format="mixed", errors="coerce")
+    return parsed, fallback_count
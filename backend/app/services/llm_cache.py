@@ -0,0 +1,229 @@
+"""Content-addressed cache of LLM agent responses.
+
+An analysis is fully determined by the agent, its system prompt, the rendered
+data text, the model and the temperature. The SHA-256 of those inputs keys
+the raw JSON the model returned. Re-running an analysis, or two users
+uploading the same extract, then costs no tokens.
+
+Two tiers: a byte-budgeted in-memory LRU per process, and an optional
+directory of one file per key (LLM_CACHE_DIR) shared by every worker and
+kept across restarts. Disk hits are promoted into memory. From the event
+loop, memory hits are answered inline; only disk reads and writes go to the
+cache's own threads.
+
+The directory is capped at LLM_CACHE_DISK_MAX_BYTES. File mtimes order it
+by recency: a disk hit touches its file, and once a worker's running total
+passes the cap, the oldest files are deleted down to 90% of it.
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from app.config import LLM_CACHE_DIR, LLM_CACHE_DISK_MAX_BYTES, LLM_CACHE_MAX_BYTES
+from app.services.worker_pool import run_cache_io
+
+logger = logging.getLogger("arena.llm_cache")
+
+# Pruning deletes down to this share of the disk cap, so it does not run on every write
+_DISK_PRUNE_TARGET = 0.9
+
+
+def llm_cache_key(
+    agent_type: str, system_prompt: str, data_text: str, model: str, temperature: float
+) -> str:
+    """Hex digest identifying one model request."""
+    payload = json.dumps([agent_type, system_prompt, data_text, model, temperature])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMCache:
+    """LRU mapping of request key → response text, backed by an optional directory."""
+
+    def __init__(self, max_bytes: int, directory: str = "", disk_max_bytes: int = 0) -> None:
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Bytes in the directory as of this worker's last scan plus its own writes
+        self._disk_bytes: int | None = None
+        self._prune_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> str | None:
+        """Return the cached response for `key`, checking memory then disk."""
+        content = self.get_memory(key)
+        return content if content is not None else self.get_disk(key)
+
+    def get_memory(self, key: str) -> str | None:
+        """Memory-tier lookup; never blocks on I/O. A miss here is not yet counted."""
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return content
+
+    def get_disk(self, key: str) -> str | None:
+        """Disk-tier lookup, promoting a hit into memory. Counts the miss if there is none."""
+        if self.directory:
+            path = self._path(key)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    content = f.read()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning("Could not read cached response %s: %s", key, e)
+            else:
+                # Mark it recently used so pruning keeps it
+                with contextlib.suppress(OSError):
+                    os.utime(path)
+                self._remember(key, content)
+                with self._lock:
+                    self.disk_hits += 1
+                return content
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, content: str) -> None:
+        self._remember(key, content)
+        self.put_disk(key, content)
+
+    def put_disk(self, key: str, content: str) -> None:
+        """Write `content` to the disk tier only (no-op without a directory)."""
+        if not self.directory:
+            return
+        path = self._path(key)
+        data = content.encode()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write-then-rename so concurrent readers never see a partial file
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("Could not write cached response %s: %s", key, e)
+            return
+        if self.disk_max_bytes > 0:
+            with self._lock:
+                if self._disk_bytes is not None:
+                    self._disk_bytes += len(data)
+                over = self._disk_bytes is None or self._disk_bytes > self.disk_max_bytes
+            if over:
+                self._prune_disk()
+
+    async def get_async(self, key: str) -> str | None:
+        """`get` for the event loop: memory hits return inline, disk reads run on a cache thread."""
+        content = self.get_memory(key)
+        if content is not None:
+            return content
+        if not self.directory:
+            return self.get_disk(key)
+        result: str | None = await run_cache_io(self.get_disk, key)
+        return result
+
+    async def put_async(self, key: str, content: str) -> None:
+        """`put` for the event loop: the memory tier is written inline, the file on a cache thread."""
+        self._remember(key, content)
+        if self.directory:
+            await run_cache_io(self.put_disk, key, content)
+
+    def _prune_disk(self) -> None:
+        """Delete the least recently used files until the directory fits the cap.
+
+        Every worker writes to the directory, so its size is measured here
+        rather than trusted from this worker's count.
+        """
+        if not self._prune_lock.acquire(blocking=False):
+            return  # another thread of this worker is already pruning
+        try:
+            files = []
+            for shard in os.scandir(self.directory):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith(".json"):
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in files)
+            evicted = 0
+            if total > self.disk_max_bytes:
+                target = self.disk_max_bytes * _DISK_PRUNE_TARGET
+                for _, size, path in sorted(files):
+                    if total <= target:
+                        break
+                    # Already gone if another worker pruned it
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(path)
+                    total -= size
+                    evicted += 1
+                logger.info("Pruned %d cached responses from %s", evicted, self.directory)
+            with self._lock:
+                self._disk_bytes = total
+                self.disk_evictions += evicted
+        except OSError as e:
+            logger.warning("Could not prune response cache %s: %s", self.directory, e)
+        finally:
+            self._prune_lock.release()
+
+    def _remember(self, key: str, content: str) -> None:
+        size = len(content)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = content
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Empty the memory tier and reset counters. Files on disk are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.disk_hits = self.misses = self.evictions = 0
+            self.disk_evictions = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk": bool(self.directory),
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes,
+                "disk_evictions": self.disk_evictions,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+llm_cache = LLMCache(LLM_CACHE_MAX_BYTES, LLM_CACHE_DIR, LLM_CACHE_DISK_MAX_BYTES)
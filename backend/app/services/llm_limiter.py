@@ -0,0 +1,219 @@
+"""Process-wide rate limiting of LLM calls with fair queuing across sessions.
+
+Every analysis fires three model calls at once, so a burst of users can
+exceed the provider's rate limits and fail together. Calls instead ask the
+limiter for capacity first. Two token buckets, refilled continuously, cap
+requests per minute and estimated tokens per minute. When either is empty,
+callers wait in one FIFO queue per session. Sessions take turns
+round-robin, so one user's re-runs cannot starve everyone else.
+
+Waiting callers are told their position in the combined queue whenever it
+changes, and 0 once they are let through. Token costs are estimated up front;
+`settle` corrects the bucket with the usage the provider reports.
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.config import LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE
+
+logger = logging.getLogger("arena.llm_limiter")
+
+
+class TokenBucket:
+    """Holds up to `per_minute` units and refills at `per_minute / 60` per second."""
+
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def cost(self, amount: float) -> float:
+        # A request bigger than the whole bucket would never fit; let it drain the bucket
+        return min(amount, self.capacity)
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until `amount` units are available."""
+        missing = self.cost(amount) - self.level
+        return max(missing, 0.0) / self.rate
+
+
+@dataclass(eq=False)
+class _Waiter:
+    tokens: int
+    future: asyncio.Future
+    on_position: Callable[[int], None] | None
+    # The caller's context: callbacks may read context variables (LangGraph's
+    # stream writer does), but are fired from whichever task dispatches
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+    position: int = field(default=-1)
+
+
+class LLMLimiter:
+    """RPM/TPM token buckets shared by every call, granted round-robin by session.
+
+    A limit of 0 disables that bucket. Must be used from a single event loop.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int) -> None:
+        self.buckets: dict[str, TokenBucket] = {}
+        if requests_per_minute > 0:
+            self.buckets["requests"] = TokenBucket(requests_per_minute)
+        if tokens_per_minute > 0:
+            self.buckets["tokens"] = TokenBucket(tokens_per_minute)
+        # session_id → its waiting calls; order is the round-robin turn order
+        self._queues: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+        self._timer: asyncio.TimerHandle | None = None
+        self.granted = 0
+        self.queued = 0
+        self.total_wait = 0.0
+        self.settled_tokens = 0  # estimate minus actual usage, summed over settled calls
+
+    async def acquire(
+        self,
+        session_id: str,
+        tokens: int,
+        on_position: Callable[[int], None] | None = None,
+    ) -> None:
+        """Wait until one request of about `tokens` tokens may be sent."""
+        loop = asyncio.get_running_loop()
+        if not self._queues and self._try_take(tokens, time.monotonic()):
+            self.granted += 1
+            return
+
+        waiter = _Waiter(tokens, loop.create_future(), on_position)
+        self._queues.setdefault(session_id, deque()).append(waiter)
+        self.queued += 1
+        started = time.monotonic()
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            self._remove(session_id, waiter)
+            raise
+        waited = time.monotonic() - started
+        self.total_wait += waited
+        if waited > 1:
+            logger.info("LLM call for session %s waited %.1fs for capacity", session_id, waited)
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Correct the token bucket once a call's real usage is known.
+
+        What the estimate over-reserved is returned to the bucket, and what it
+        under-reserved is taken, so later calls wait for real usage only.
+        """
+        bucket = self.buckets.get("tokens")
+        if bucket is None:
+            return
+        bucket.refill(time.monotonic())
+        difference = bucket.cost(estimated) - actual
+        bucket.level = min(bucket.capacity, bucket.level + difference)
+        self.settled_tokens += estimated - actual
+        if difference > 0 and self._queues:
+            self._dispatch()
+
+    @staticmethod
+    def _amounts(tokens: int) -> dict[str, float]:
+        return {"requests": 1, "tokens": tokens}
+
+    def _try_take(self, tokens: int, now: float) -> bool:
+        amounts = self._amounts(tokens)
+        for name, bucket in self.buckets.items():
+            bucket.refill(now)
+            if bucket.level < bucket.cost(amounts[name]):
+                return False
+        for name, bucket in self.buckets.items():
+            bucket.level -= bucket.cost(amounts[name])
+        return True
+
+    def _dispatch(self) -> None:
+        """Grant queued calls in round-robin order while the buckets allow."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        while self._queues:
+            session_id, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+            if waiter.future.done():
+                # Cancelled, but its task has not run to leave the queue yet
+                queue.popleft()
+                if not queue:
+                    del self._queues[session_id]
+                continue
+            if not self._try_take(waiter.tokens, now):
+                amounts = self._amounts(waiter.tokens)
+                delay = max(bucket.wait_for(amounts[name]) for name, bucket in self.buckets.items())
+                loop = asyncio.get_running_loop()
+                self._timer = loop.call_later(max(delay, 0.01), self._dispatch)
+                break
+            queue.popleft()
+            # This session's turn is over: move it to the back of the rotation
+            del self._queues[session_id]
+            if queue:
+                self._queues[session_id] = queue
+            self.granted += 1
+            self._notify(waiter, 0)
+            waiter.future.set_result(None)
+        self._announce_positions()
+
+    def _remove(self, session_id: str, waiter: _Waiter) -> None:
+        queue = self._queues.get(session_id)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        if not queue:
+            del self._queues[session_id]
+        self._dispatch()
+
+    def _announce_positions(self) -> None:
+        """Tell each waiter its 1-based place in the interleaved round-robin order."""
+        queues = list(self._queues.values())
+        position = 0
+        for depth in range(max((len(q) for q in queues), default=0)):
+            for queue in queues:
+                if depth < len(queue):
+                    position += 1
+                    self._notify(queue[depth], position)
+
+    @staticmethod
+    def _notify(waiter: _Waiter, position: int) -> None:
+        if position == waiter.position:
+            return
+        waiter.position = position
+        if waiter.on_position is not None:
+            try:
+                waiter.context.run(waiter.on_position, position)
+            except Exception:
+                logger.exception("Queue position callback failed")
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        for bucket in self.buckets.values():
+            bucket.refill(now)
+        return {
+            "waiting": sum(len(q) for q in self._queues.values()),
+            "waiting_sessions": len(self._queues),
+            "granted": self.granted,
+            "queued": self.queued,
+            "total_wait_seconds": round(self.total_wait, 3),
+            "settled_tokens": self.settled_tokens,
+            "buckets": {
+                name: {"level": round(b.level, 1), "capacity": b.capacity}
+                for name, b in self.buckets.items()
+            },
+        }
+
+
+llm_limiter = LLMLimiter(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
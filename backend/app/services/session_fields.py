@@ -0,0 +1,39 @@
+"""Session field helpers shared by every session backend."""
+
+from typing import Any
+
+import pandas as pd
+
+from app.models.schemas import DataSummary
+from app.services.data_processor import SummaryCube
+
+
+def field_nbytes(value: Any) -> int:
+    """Memory held by one session field.
+
+    DataFrames, date cubes and strings (above all the raw CSV text) dominate
+    a session, so only those are measured. Summaries, mappings and agent
+    results count as zero.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, SummaryCube):
+        return value.nbytes
+    if isinstance(value, str):
+        return len(value)
+    return 0
+
+
+def listing_fields(changes: dict[str, Any]) -> dict[str, Any]:
+    """Listing metadata (the per-session record behind `list_sessions`) touched by field changes."""
+    fields: dict[str, Any] = {}
+    if "filename" in changes:
+        fields["filename"] = changes["filename"] or "unknown.csv"
+    if "summary" in changes:
+        summary = changes["summary"]
+        is_summary = isinstance(summary, DataSummary)
+        fields["row_count"] = summary.row_count if is_summary else 0
+        fields["total_spend"] = summary.total_spend if is_summary else 0
+    if "agent_results" in changes:
+        fields["has_report"] = bool(changes["agent_results"])
+    return fields
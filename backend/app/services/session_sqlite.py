@@ -0,0 +1,429 @@
+"""SQLite session backend, shared by every uvicorn worker on one host.
+
+Each session field is its own row. DataFrames are stored as zstd-compressed
+Arrow IPC blobs, keeping categoricals dictionary-encoded. Other values
+(summaries, mappings, agent results) are pickled. Every write stamps the field
+with a fresh version from a global counter. Each worker keeps decoded fields
+in a local cache and re-reads a blob only when its version has changed, so
+a hot session costs one small metadata query per request. The cache is
+bounded by SESSION_MAX_BYTES: least recently read sessions are dropped from
+it, and their next read decodes the blobs again.
+
+`get` decodes everything but DataFrames; frames are decoded on demand by
+`get_frame`, so reading a session for its summary never touches the Arrow
+blobs. The frames live on disk already, so this backend never spills.
+
+The listing metadata (filename, row_count, total_spend, vote_count,
+has_report) lives on the `sessions` row and is updated with the fields and
+votes it derives from. A listing page is a primary-key range scan that never
+decodes a blob.
+"""
+
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import pandas as pd
+
+from app.config import MAX_SESSIONS, SESSION_MAX_BYTES
+from app.services.arrow_frames import ARROW_ENCODE_ERRORS, frame_from_bytes, frame_to_bytes
+from app.services.session_fields import field_nbytes, listing_fields
+
+logger = logging.getLogger("arena.store")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO counters (name, value) VALUES ('field_version', 0);
+CREATE TABLE IF NOT EXISTS sessions (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL UNIQUE,
+    filename TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    total_spend REAL NOT NULL DEFAULT 0,
+    vote_count INTEGER NOT NULL DEFAULT 0,
+    has_report INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS session_fields (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL REFERENCES sessions (session_id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    value BLOB NOT NULL,
+    UNIQUE (session_id, key)
+);
+CREATE TABLE IF NOT EXISTS votes (
+    session_id TEXT NOT NULL,
+    agent_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (session_id, agent_type)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS voted_recommendations (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    recommendation_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    UNIQUE (session_id, recommendation_id)
+);
+"""
+
+_NO_VOTES = {"conservative": 0, "aggressive": 0, "balanced": 0}
+
+_ARROW = "arrow"
+_PICKLE = "pickle"
+# A DataFrame Arrow cannot encode, pickled; still a frame field for get/get_frame
+_PICKLED_FRAME = "pickled-frame"
+_FRAME_CODECS = (_ARROW, _PICKLED_FRAME)
+
+# Larger than any `sessions.seq`: the cursor of the first listing page
+_NO_CURSOR = 2**63 - 1
+
+# Reads refresh a session's stored last-access time at most this often (seconds),
+# so most reads stay read-only
+_TOUCH_RESOLUTION = 30.0
+
+
+def _encode(value: Any) -> tuple[str, bytes]:
+    if isinstance(value, pd.DataFrame):
+        try:
+            return _ARROW, frame_to_bytes(value)
+        except ARROW_ENCODE_ERRORS as e:
+            # e.g. an object column mixing ints and strs; pickle keeps it exactly
+            logger.warning("Storing a frame pickled: Arrow cannot encode it (%s)", e)
+            return _PICKLED_FRAME, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    return _PICKLE, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _decode(codec: str, data: bytes) -> Any:
+    if codec == _ARROW:
+        return frame_from_bytes(data)
+    # Only this application writes the database; it is not an input boundary
+    return pickle.loads(data)  # noqa: S301
+
+
+class SqliteSessionBackend:
+    """Sessions, votes and preferences in one WAL-mode SQLite file."""
+
+    def __init__(self, path: str) -> None:
+        # Autocommit mode: multi-statement writes open explicit transactions
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.RLock()
+        # session_id -> { key: (version, decoded value, bytes) }, least recently read first
+        self._cache: OrderedDict[str, dict[str, tuple[int, Any, int]]] = OrderedDict()
+        self._cache_bytes = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _next_version(self) -> int:
+        row = self._conn.execute(
+            "UPDATE counters SET value = value + 1 WHERE name = 'field_version' RETURNING value"
+        ).fetchone()
+        return int(row[0])
+
+    def _cached_fields(self, session_id: str) -> dict[str, tuple[int, Any, int]]:
+        cached = self._cache.setdefault(session_id, {})
+        self._cache.move_to_end(session_id)
+        return cached
+
+    def _cache_put(self, session_id: str, key: str, version: int, value: Any) -> None:
+        cached = self._cached_fields(session_id)
+        self._cache_drop(session_id, key)
+        size = field_nbytes(value)
+        cached[key] = (version, value, size)
+        self._cache_bytes += size
+
+    def _cache_drop(self, session_id: str, key: str) -> None:
+        entry = self._cache.get(session_id, {}).pop(key, None)
+        if entry is not None:
+            self._cache_bytes -= entry[2]
+
+    def _cache_forget(self, session_id: str) -> None:
+        self._cache_bytes -= sum(entry[2] for entry in self._cache.pop(session_id, {}).values())
+
+    def _trim_cache(self) -> None:
+        """Drop least recently read sessions' decoded fields beyond the byte budget."""
+        while len(self._cache) > 1 and self._cache_bytes > SESSION_MAX_BYTES:
+            self._cache_forget(next(iter(self._cache)))
+
+    def _write_fields(self, session_id: str, changes: dict[str, Any]) -> None:
+        for key, value in changes.items():
+            if value is None:
+                self._conn.execute(
+                    "DELETE FROM session_fields WHERE session_id = ? AND key = ?",
+                    (session_id, key),
+                )
+                self._cache_drop(session_id, key)
+                continue
+            codec, blob = _encode(value)
+            version = self._next_version()
+            self._conn.execute(
+                "INSERT INTO session_fields (session_id, key, codec, version, value) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (session_id, key) DO UPDATE SET "
+                "codec = excluded.codec, version = excluded.version, value = excluded.value",
+                (session_id, key, codec, version, blob),
+            )
+            self._cache_put(session_id, key, version, value)
+        self._trim_cache()
+
+        columns = listing_fields(changes)
+        if columns:
+            assignments = ", ".join(f"{name} = ?" for name in columns)
+            self._conn.execute(
+                f"UPDATE sessions SET {assignments} WHERE session_id = ?",  # noqa: S608
+                (*columns.values(), session_id),
+            )
+
+    def _touch(self, session_id: str) -> bool:
+        """Record an access to a session. Returns False if it does not exist."""
+        row = self._conn.execute(
+            "SELECT last_access FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return False
+        now = time.time()
+        if now - row[0] > _TOUCH_RESOLUTION:
+            self._conn.execute(
+                "UPDATE sessions SET last_access = ? WHERE session_id = ?", (now, session_id)
+            )
+        return True
+
+    def _delete_rows(self, session_ids: list[str]) -> None:
+        for session_id in session_ids:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM votes WHERE session_id = ?", (session_id,))
+            self._conn.execute(
+                "DELETE FROM voted_recommendations WHERE session_id = ?", (session_id,)
+            )
+            self._cache_forget(session_id)
+
+    def save(self, session_id: str, data: dict[str, Any]) -> None:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO sessions (session_id, filename, created_at, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    session_id,
+                    data.get("filename", "unknown.csv"),
+                    data.get("created_at", ""),
+                    now,
+                    now,
+                ),
+            )
+            self._write_fields(session_id, data)
+
+            # Oldest sessions beyond MAX_SESSIONS are evicted
+            stale = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT session_id FROM sessions ORDER BY seq DESC LIMIT -1 OFFSET ?",
+                    (MAX_SESSIONS,),
+                )
+            ]
+            self._delete_rows(stale)
+        for old_id in stale:
+            logger.info("Evicted old session %s (store capped at %d)", old_id, MAX_SESSIONS)
+
+    def _read_fields(self, session_id: str, versions: dict[str, int]) -> dict[str, Any]:
+        """Decoded values of the given fields, re-reading blobs whose version changed."""
+        cached = self._cached_fields(session_id)
+        for key, version in versions.items():
+            if cached.get(key, (0,))[0] == version:
+                continue
+            row = self._conn.execute(
+                "SELECT codec, version, value FROM session_fields WHERE session_id = ? AND key = ?",
+                (session_id, key),
+            ).fetchone()
+            if row is not None:
+                self._cache_put(session_id, key, row[1], _decode(row[0], row[2]))
+        values = {key: cached[key][1] for key in versions if key in cached}
+        self._trim_cache()
+        return values
+
+    def get(self, session_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            if not self._touch(session_id):
+                self._cache_forget(session_id)
+                return None
+
+            rows = self._conn.execute(
+                "SELECT key, version, codec FROM session_fields WHERE session_id = ?",
+                (session_id,),
+            ).fetchall()
+            for key in set(self._cached_fields(session_id)) - {key for key, _, _ in rows}:
+                self._cache_drop(session_id, key)
+            # Frames are decoded only when asked for, through get_frame
+            return self._read_fields(
+                session_id,
+                {key: version for key, version, codec in rows if codec not in _FRAME_CODECS},
+            )
+
+    def get_frame(self, session_id: str, key: str) -> pd.DataFrame | None:
+        with self._lock:
+            if not self._touch(session_id):
+                return None
+            row = self._conn.execute(
+                "SELECT version FROM session_fields "
+                "WHERE session_id = ? AND key = ? AND codec IN (?, ?)",
+                (session_id, key, *_FRAME_CODECS),
+            ).fetchone()
+            if row is None:
+                return None
+            frame: pd.DataFrame | None = self._read_fields(session_id, {key: row[0]}).get(key)
+            return frame
+
+    def update(self, session_id: str, changes: dict[str, Any]) -> None:
+        with self._transaction():
+            if self._touch(session_id):
+                self._write_fields(session_id, changes)
+
+    def release_frame(self, session_id: str, key: str) -> None:
+        # The blob is on disk already; dropping the decoded copy is enough
+        with self._lock:
+            self._cache_drop(session_id, key)
+
+    def spill_idle(self) -> None:
+        # Frames are stored on disk already; the decoded cache is trimmed on access
+        return
+
+    def expire(self, idle_ttl: float, max_age: float) -> tuple[list[str], int]:
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT s.session_id, COALESCE(SUM(LENGTH(f.value)), 0) "
+                "FROM sessions s LEFT JOIN session_fields f ON f.session_id = s.session_id "
+                "WHERE (? > 0 AND s.last_access < ?) OR (? > 0 AND s.created < ?) "
+                "GROUP BY s.seq",
+                (idle_ttl, now - idle_ttl, max_age, now - max_age),
+            ).fetchall()
+            self._delete_rows([session_id for session_id, _ in rows])
+        return [session_id for session_id, _ in rows], sum(size for _, size in rows)
+
+    def delete(self, session_id: str) -> bool:
+        with self._transaction() as conn:
+            exists = conn.execute(
+                "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if exists:
+                self._delete_rows([session_id])
+        return bool(exists)
+
+    def add_vote(
+        self, session_id: str, agent_type: str, recommendation: dict[str, str]
+    ) -> tuple[dict[str, int], bool]:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO votes (session_id, agent_type, count) VALUES (?, ?, 1) "
+                "ON CONFLICT (session_id, agent_type) DO UPDATE SET count = count + 1",
+                (session_id, agent_type),
+            )
+            conn.execute(
+                "UPDATE sessions SET vote_count = vote_count + 1 WHERE session_id = ?",
+                (session_id,),
+            )
+            recorded = conn.execute(
+                "INSERT OR IGNORE INTO voted_recommendations "
+                "(session_id, recommendation_id, title, description) VALUES (?, ?, ?, ?)",
+                (
+                    session_id,
+                    recommendation["recommendation_id"],
+                    recommendation["title"],
+                    recommendation["description"],
+                ),
+            ).rowcount
+            tallies = self.get_votes(session_id) or dict(_NO_VOTES)
+        return tallies, bool(recorded)
+
+    def get_votes(self, session_id: str) -> dict[str, int] | None:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT agent_type, count FROM votes WHERE session_id = ?", (session_id,)
+            ).fetchall()
+        if not rows:
+            return None
+        return {**_NO_VOTES, **dict(rows)}
+
+    def voted_recommendations(self, session_id: str) -> list[dict[str, str]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT recommendation_id, title, description FROM voted_recommendations "
+                "WHERE session_id = ? ORDER BY seq",
+                (session_id,),
+            ).fetchall()
+        return [
+            {"recommendation_id": rid, "title": title, "description": description}
+            for rid, title, description in rows
+        ]
+
+    def list_sessions(
+        self, limit: int, before: int | None = None
+    ) -> tuple[list[dict[str, Any]], int | None]:
+        # A primary-key range scan: one extra row tells whether a next page exists
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, session_id, filename, created_at, row_count, total_spend, "
+                "vote_count, has_report FROM sessions WHERE seq < ? ORDER BY seq DESC LIMIT ?",
+                (before if before is not None else _NO_CURSOR, limit + 1),
+            ).fetchall()
+        next_seq = rows[limit - 1][0] if len(rows) > limit else None
+        return [
+            {
+                "session_id": sid,
+                "filename": filename,
+                "created_at": created_at,
+                "row_count": row_count,
+                "total_spend": total_spend,
+                "vote_count": vote_count,
+                "has_report": bool(has_report),
+            }
+            for _, sid, filename, created_at, row_count, total_spend, vote_count, has_report in rows[
+                :limit
+            ]
+        ], next_seq
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            return {
+                "backend": "sqlite",
+                "sessions": count,
+                "bytes": self._cache_bytes,
+                "max_bytes": SESSION_MAX_BYTES,
+            }
+
+    def clear(self) -> None:
+        with self._transaction() as conn:
+            for table in ("session_fields", "sessions", "votes", "voted_recommendations"):
+                conn.execute(f"DELETE FROM {table}")  # noqa: S608
+            self._cache.clear()
+            self._cache_bytes = 0
@@ -1,56 +1,602 @@
-"""In-memory session and vote storage with preference learning."""
+"""Session and vote storage with preference learning.
 
-import logging
-from typing import Any
+Storage is pluggable. SESSION_BACKEND selects the backend:
+
+- ``memory`` (default): in-process dicts.
+- ``sqlite``: a WAL-mode SQLite file (`app/services/session_sqlite.py`) that
+  every uvicorn worker on the host shares.
 
-from app.config import MAX_SESSIONS
+Routers only use the module-level functions. `get_session` returns a
+snapshot of every field except DataFrames, so changes must be written back
+with `update_session`. DataFrames (`raw_df`, `mapped_df`) are loaded on
+demand with `get_session_frame`, since they may have been spilled to disk.
+"""
+
+import bisect
+import contextlib
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Protocol
+
+import pandas as pd
+
+from app.config import (
+    MAX_SESSIONS,
+    SESSION_BACKEND,
+    SESSION_DB_PATH,
+    SESSION_MAX_BYTES,
+    SESSION_PAGE_SIZE,
+    SESSION_SPILL_DIR,
+    SESSION_SPILL_IDLE_SECONDS,
+)
+from app.services.arrow_frames import ARROW_ENCODE_ERRORS, read_frame_file, write_frame_file
+from app.services.session_fields import field_nbytes, listing_fields
 
 logger = logging.getLogger("arena.store")
 
-# session_id -> { "csv_text": str, "summary": DataSummary, "filename": str, "created_at": str }
-_sessions: dict[str, dict[str, Any]] = {}
+_NO_VOTES = {"conservative": 0, "aggressive": 0, "balanced": 0}
+
+
+class SessionBackend(Protocol):
+    def save(self, session_id: str, data: dict[str, Any]) -> None: ...
+
+    def get(self, session_id: str) -> dict[str, Any] | None: ...
+
+    def get_frame(self, session_id: str, key: str) -> pd.DataFrame | None: ...
+
+    def update(self, session_id: str, changes: dict[str, Any]) -> None: ...
+
+    def release_frame(self, session_id: str, key: str) -> None: ...
 
-# Ordered list of session IDs (most recent first)
-_session_order: list[str] = []
+    def spill_idle(self) -> None: ...
 
-# session_id -> { agent_type: vote_count }
-_votes: dict[str, dict[str, int]] = {}
+    def expire(self, idle_ttl: float, max_age: float) -> tuple[list[str], int]: ...
 
-# session_id -> list of voted recommendation details
-_voted_recommendations: dict[str, list[dict[str, str]]] = {}
+    def delete(self, session_id: str) -> bool: ...
 
+    def add_vote(
+        self, session_id: str, agent_type: str, recommendation: dict[str, str]
+    ) -> tuple[dict[str, int], bool]: ...
 
-def _evict_oldest() -> None:
-    """Remove the oldest session when the store exceeds MAX_SESSIONS."""
-    while len(_session_order) > MAX_SESSIONS:
-        old_id = _session_order.pop()
-        _sessions.pop(old_id, None)
-        _votes.pop(old_id, None)
-        _voted_recommendations.pop(old_id, None)
-        logger.info("Evicted old session %s (store capped at %d)", old_id, MAX_SESSIONS)
+    def get_votes(self, session_id: str) -> dict[str, int] | None: ...
+
+    def voted_recommendations(self, session_id: str) -> list[dict[str, str]]: ...
+
+    def list_sessions(
+        self, limit: int, before: int | None = None
+    ) -> tuple[list[dict[str, Any]], int | None]: ...
+
+    def stats(self) -> dict[str, Any]: ...
+
+    def clear(self) -> None: ...
+
+
+class MemorySessionBackend:
+    """Sessions in module memory — lost on restart, private to one worker.
+
+    DataFrame fields are held apart from the rest of the session and fetched
+    with `get_frame`. A session untouched for SESSION_SPILL_IDLE_SECONDS, or
+    the least recently used one while memory exceeds SESSION_MAX_BYTES,
+    spills its frames to Arrow files in this process's `spill_dir()`. Reading a spilled
+    frame decodes it and re-admits it as resident, counted against the budget
+    like any other; its file is kept as a clean copy, so spilling it again
+    costs no write. Frames Arrow cannot encode stay resident. Sessions are
+    evicted outright, least recently used first, when spilling cannot bring
+    memory under the budget or their count exceeds MAX_SESSIONS; only
+    sessions holding resident bytes are evicted for the budget, and none when
+    that would not bring memory under it. The session being written is never
+    spilled or evicted, so one upload larger than the whole budget still
+    works without pushing out the rest. Touch and spill are O(1) per session.
+    `expire` drops sessions past their idle or absolute TTL.
+
+    Each session has a listing record that is updated as its summary, agent
+    results and votes change. Listing pages walk a creation-ordered list from
+    a cursor, so a page costs O(page size) however many sessions exist.
+    """
+
+    def __init__(self) -> None:
+        # session_id -> { "summary": DataSummary, "filename": str, ... },
+        # least recently accessed first
+        self.sessions: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        # session_id -> { "raw_df" / "mapped_df": DataFrame, or the path of its spill file }
+        self.frames: dict[str, dict[str, pd.DataFrame | str]] = {}
+        # session_id -> { key: spill file still identical to the resident frame }
+        self.clean: dict[str, dict[str, str]] = {}
+        # Sessions holding frames in RAM, least recently accessed first
+        self.resident: OrderedDict[str, None] = OrderedDict()
+        # session_id -> creation time (monotonic), oldest first
+        self.created: dict[str, float] = {}
+        # session_id -> listing record (filename, row_count, total_spend, vote_count, ...)
+        self.meta: dict[str, dict[str, Any]] = {}
+        # (seq, session_id) in creation order; entries of dropped sessions are skipped
+        # until compaction
+        self.listing: list[tuple[int, str]] = []
+        # session_id -> its current seq in `listing`
+        self.seq: dict[str, int] = {}
+        self._next_seq = 1
+        # session_id -> last access (monotonic)
+        self.accessed: dict[str, float] = {}
+        # session_id -> { field: bytes }, for resident fields that field_nbytes measures
+        self.field_bytes: dict[str, dict[str, int]] = {}
+        self.total_bytes = 0
+        self.evictions = 0
+        self.spills = 0
+        # session_id -> { agent_type: vote_count }
+        self.votes: dict[str, dict[str, int]] = {}
+        # session_id -> list of voted recommendation details
+        self.voted: dict[str, list[dict[str, str]]] = {}
+        # Writes arrive from session threads (run_session_io) as well as the event loop
+        self._lock = threading.RLock()
+
+    def _touch(self, session_id: str) -> None:
+        self.accessed[session_id] = time.monotonic()
+        self.sessions.move_to_end(session_id)
+        if session_id in self.resident:
+            self.resident.move_to_end(session_id)
+
+    def _set_fields(self, session_id: str, changes: dict[str, Any]) -> None:
+        session = self.sessions[session_id]
+        frames = self.frames.setdefault(session_id, {})
+        sizes = self.field_bytes.setdefault(session_id, {})
+        for key, value in changes.items():
+            self.total_bytes -= sizes.pop(key, 0)
+            session.pop(key, None)
+            _remove_spill_file(frames.pop(key, None))
+            _remove_spill_file(self.clean.get(session_id, {}).pop(key, None))
+            if value is None:
+                continue
+            if isinstance(value, pd.DataFrame):
+                frames[key] = value
+            else:
+                session[key] = value
+            size = field_nbytes(value)
+            if size:
+                sizes[key] = size
+                self.total_bytes += size
+        self.meta[session_id].update(listing_fields(changes))
+
+        if any(isinstance(frame, pd.DataFrame) for frame in frames.values()):
+            self.resident[session_id] = None
+            self.resident.move_to_end(session_id)
+        else:
+            self.resident.pop(session_id, None)
+
+    def _spill(self, session_id: str, keys: set[str] | None = None) -> bool:
+        """Write a session's resident frames (or just `keys`) to Arrow files and release them.
+
+        A frame with a clean copy on disk is released without writing. One
+        Arrow cannot encode stays resident. Returns False on an I/O error.
+        """
+        frames = self.frames[session_id]
+        sizes = self.field_bytes[session_id]
+        clean = self.clean.get(session_id, {})
+        freed = 0
+        try:
+            for key, frame in frames.items():
+                if not isinstance(frame, pd.DataFrame) or (keys is not None and key not in keys):
+                    continue
+                path = clean.pop(key, None)
+                if path is None:
+                    directory = spill_dir()
+                    os.makedirs(directory, exist_ok=True)
+                    path = os.path.join(directory, f"{uuid.uuid4().hex}.arrow")
+                    try:
+                        write_frame_file(frame, path)
+                    except ARROW_ENCODE_ERRORS as e:
+                        _remove_spill_file(path)
+                        logger.warning(
+                            "Session %s frame %s cannot be spilled (%s) — keeping it in memory",
+                            session_id,
+                            key,
+                            e,
+                        )
+                        continue
+                frames[key] = path
+                freed += sizes.pop(key, 0)
+        except OSError:
+            logger.warning("Could not spill session %s frames", session_id, exc_info=True)
+            return False
+        finally:
+            self.total_bytes -= freed
+        if not any(isinstance(frame, pd.DataFrame) for frame in frames.values()):
+            self.resident.pop(session_id, None)
+        if freed:
+            self.spills += 1
+            logger.info("Spilled session %s frames to disk (%d bytes released)", session_id, freed)
+        return True
+
+    def _spill_idle(self, keep: str | None = None) -> None:
+        if not SESSION_SPILL_DIR or SESSION_SPILL_IDLE_SECONDS <= 0:
+            return
+        idle_before = time.monotonic() - SESSION_SPILL_IDLE_SECONDS
+        # A snapshot: sessions whose frames cannot be spilled stay in `resident`
+        for session_id in list(self.resident):
+            if self.accessed[session_id] > idle_before:
+                break
+            if session_id != keep and not self._spill(session_id):
+                break
+
+    def _reclaim(self, keep: str) -> None:
+        """Spill idle sessions, then spill or evict the least recently used over budget."""
+        self._spill_idle(keep)
+        if SESSION_SPILL_DIR:
+            for session_id in list(self.resident):
+                if self.total_bytes <= SESSION_MAX_BYTES:
+                    break
+                if session_id != keep and not self._spill(session_id):
+                    break
+        self._evict(keep)
+
+    def _drop(self, session_id: str) -> None:
+        self.sessions.pop(session_id, None)
+        self.created.pop(session_id, None)
+        self.accessed.pop(session_id, None)
+        self.resident.pop(session_id, None)
+        self.meta.pop(session_id, None)
+        self.seq.pop(session_id, None)
+        if len(self.listing) > 2 * len(self.seq) + 64:
+            self.listing = [(seq, sid) for seq, sid in self.listing if self.seq.get(sid) == seq]
+        for frame in self.frames.pop(session_id, {}).values():
+            _remove_spill_file(frame)
+        for path in self.clean.pop(session_id, {}).values():
+            _remove_spill_file(path)
+        self.total_bytes -= sum(self.field_bytes.pop(session_id, {}).values())
+        self.votes.pop(session_id, None)
+        self.voted.pop(session_id, None)
+
+    def _evict(self, keep: str | None = None) -> None:
+        """Drop least recently used sessions until the store fits its budgets.
+
+        Over the byte budget, only sessions still holding resident bytes are
+        dropped, and only if that brings the store under budget; a session
+        whose bytes turn out not to be needed is spared. `keep` is never
+        dropped, so one upload larger than the budget evicts nothing.
+        """
+        while len(self.sessions) > max(MAX_SESSIONS, 1):
+            self._evict_one(next(sid for sid in self.sessions if sid != keep))
+        if self.total_bytes <= SESSION_MAX_BYTES:
+            return
+        excess = self.total_bytes - SESSION_MAX_BYTES
+        candidates: list[tuple[str, int]] = []
+        for session_id in self.sessions:
+            size = sum(self.field_bytes.get(session_id, {}).values())
+            if session_id != keep and size:
+                candidates.append((session_id, size))
+        if sum(size for _, size in candidates) < excess:
+            logger.info(
+                "Store at %d of %d bytes; evicting every other session would not fit it",
+                self.total_bytes,
+                SESSION_MAX_BYTES,
+            )
+            return
+        # The least recently used prefix that covers the excess, less any
+        # session the rest of the prefix covers without
+        victims: list[tuple[str, int]] = []
+        covered = 0
+        for session_id, size in candidates:
+            if covered >= excess:
+                break
+            victims.append((session_id, size))
+            covered += size
+        for session_id, size in victims:
+            if covered - size >= excess:
+                covered -= size
+            else:
+                self._evict_one(session_id)
+
+    def _evict_one(self, session_id: str) -> None:
+        freed = sum(self.field_bytes.get(session_id, {}).values())
+        self._drop(session_id)
+        self.evictions += 1
+        logger.info(
+            "Evicted least recently used session %s (%d bytes; store at %d of %d bytes)",
+            session_id,
+            freed,
+            self.total_bytes,
+            SESSION_MAX_BYTES,
+        )
+
+    def save(self, session_id: str, data: dict[str, Any]) -> None:
+        with self._lock:
+            self._drop(session_id)
+            self.sessions[session_id] = {}
+            self.created[session_id] = self.accessed[session_id] = time.monotonic()
+            self.seq[session_id] = self._next_seq
+            self.listing.append((self._next_seq, session_id))
+            self._next_seq += 1
+            self.meta[session_id] = {
+                "session_id": session_id,
+                "filename": "unknown.csv",
+                "created_at": data.get("created_at", ""),
+                "row_count": 0,
+                "total_spend": 0,
+                "vote_count": 0,
+                "has_report": False,
+            }
+            self._set_fields(session_id, data)
+            self._reclaim(keep=session_id)
+
+    def get(self, session_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            self._touch(session_id)
+            return dict(session)
+
+    def get_frame(self, session_id: str, key: str) -> pd.DataFrame | None:
+        with self._lock:
+            if session_id not in self.sessions:
+                return None
+            self._touch(session_id)
+            frame = self.frames[session_id].get(key)
+        if not isinstance(frame, str):
+            return frame
+        try:
+            df = read_frame_file(frame)
+        except FileNotFoundError:
+            # Overwritten or deleted since the lock was released
+            return None
+        with self._lock:
+            # Re-admit the decoded frame unless the field changed meanwhile
+            if self.frames.get(session_id, {}).get(key) == frame:
+                self.frames[session_id][key] = df
+                self.clean.setdefault(session_id, {})[key] = frame
+                size = field_nbytes(df)
+                self.field_bytes[session_id][key] = size
+                self.total_bytes += size
+                self.resident[session_id] = None
+                self.resident.move_to_end(session_id)
+                self._reclaim(keep=session_id)
+        return df
+
+    def update(self, session_id: str, changes: dict[str, Any]) -> None:
+        with self._lock:
+            if session_id not in self.sessions:
+                return
+            self._touch(session_id)
+            self._set_fields(session_id, changes)
+            # Only writes that bring frames run from worker threads and may do spill I/O
+            if any(isinstance(value, pd.DataFrame) for value in changes.values()):
+                self._reclaim(keep=session_id)
+            else:
+                self._evict(keep=session_id)
+
+    def release_frame(self, session_id: str, key: str) -> None:
+        with self._lock:
+            frame = self.frames.get(session_id, {}).get(key)
+            # Without a spill directory the frame stays resident: it is still needed
+            if isinstance(frame, pd.DataFrame) and SESSION_SPILL_DIR:
+                self._spill(session_id, {key})
+
+    def spill_idle(self) -> None:
+        with self._lock:
+            self._spill_idle()
+
+    def expire(self, idle_ttl: float, max_age: float) -> tuple[list[str], int]:
+        """Drop sessions idle longer than `idle_ttl` or older than `max_age` seconds (0 = no limit).
+
+        Both orders are kept by the store, so only expired sessions are visited.
+        """
+        now = time.monotonic()
+        expired: dict[str, None] = {}
+        with self._lock:
+            if idle_ttl > 0:
+                for session_id in self.sessions:
+                    if now - self.accessed[session_id] <= idle_ttl:
+                        break
+                    expired[session_id] = None
+            if max_age > 0:
+                for session_id, created in self.created.items():
+                    if now - created <= max_age:
+                        break
+                    expired[session_id] = None
+            freed = sum(sum(self.field_bytes.get(sid, {}).values()) for sid in expired)
+            for session_id in expired:
+                self._drop(session_id)
+        return list(expired), freed
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id not in self.sessions:
+                return False
+            self._drop(session_id)
+            return True
+
+    def add_vote(
+        self, session_id: str, agent_type: str, recommendation: dict[str, str]
+    ) -> tuple[dict[str, int], bool]:
+        with self._lock:
+            # Tally per-agent votes
+            tallies = self.votes.setdefault(session_id, dict(_NO_VOTES))
+            tallies[agent_type] = tallies.get(agent_type, 0) + 1
+            if session_id in self.meta:
+                self.meta[session_id]["vote_count"] += 1
+
+            # Avoid duplicate votes on the same recommendation
+            voted = self.voted.setdefault(session_id, [])
+            recommendation_id = recommendation["recommendation_id"]
+            if any(r["recommendation_id"] == recommendation_id for r in voted):
+                return dict(tallies), False
+            voted.append(recommendation)
+            return dict(tallies), True
+
+    def get_votes(self, session_id: str) -> dict[str, int] | None:
+        tallies = self.votes.get(session_id)
+        return dict(tallies) if tallies is not None else None
+
+    def voted_recommendations(self, session_id: str) -> list[dict[str, str]]:
+        return list(self.voted.get(session_id, []))
+
+    def list_sessions(
+        self, limit: int, before: int | None = None
+    ) -> tuple[list[dict[str, Any]], int | None]:
+        with self._lock:
+            # Walk back from the cursor; one extra live entry tells whether a next page exists
+            index = (
+                bisect.bisect_left(self.listing, (before,))
+                if before is not None
+                else len(self.listing)
+            )
+            page: list[tuple[int, str]] = []
+            while index > 0 and len(page) <= limit:
+                index -= 1
+                seq, session_id = self.listing[index]
+                if self.seq.get(session_id) == seq:
+                    page.append((seq, session_id))
+            next_seq = page[limit - 1][0] if len(page) > limit else None
+            return [dict(self.meta[session_id]) for _, session_id in page[:limit]], next_seq
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self.sessions),
+                "resident_sessions": len(self.resident),
+                "bytes": self.total_bytes,
+                "max_bytes": SESSION_MAX_BYTES,
+                "spills": self.spills,
+                "evictions": self.evictions,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            for session_id in list(self.sessions):
+                self._drop(session_id)
+            self.total_bytes = 0
+            self.evictions = 0
+            self.spills = 0
+            self.votes.clear()
+            self.voted.clear()
+
+
+def _remove_spill_file(frame: pd.DataFrame | str | None) -> None:
+    if isinstance(frame, str):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(frame)
+
+
+def spill_dir() -> str:
+    """This process's spill directory: a subdirectory of SESSION_SPILL_DIR named by its PID.
+
+    Workers sharing SESSION_SPILL_DIR each spill into their own directory, so
+    one can clear up after another that died without touching live files.
+    """
+    return os.path.join(SESSION_SPILL_DIR, str(os.getpid()))
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def clear_stale_spill_files() -> None:
+    """Remove spill files left by processes that exited without cleaning up.
+
+    Run at startup. A directory named by this process's PID is stale too:
+    the PID was reused by a restart, since nothing has spilled yet.
+    """
+    if not SESSION_SPILL_DIR or not os.path.isdir(SESSION_SPILL_DIR):
+        return
+    removed = 0
+    for entry in os.scandir(SESSION_SPILL_DIR):
+        if entry.is_dir(follow_symlinks=False) and entry.name.isdigit():
+            pid = int(entry.name)
+            if pid == os.getpid() or not _process_alive(pid):
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        elif entry.is_file(follow_symlinks=False) and entry.name.endswith(".arrow"):
+            # Spilled before per-process directories existed
+            _remove_spill_file(entry.path)
+            removed += 1
+    if removed:
+        logger.info("Removed %d stale spill entries from %s", removed, SESSION_SPILL_DIR)
+
+
+def remove_spill_dir() -> None:
+    """Delete this process's spill directory. Run at shutdown; spilled frames are lost."""
+    if SESSION_SPILL_DIR:
+        shutil.rmtree(spill_dir(), ignore_errors=True)
+
+
+def _create_backend() -> SessionBackend:
+    if SESSION_BACKEND == "sqlite":
+        from app.services.session_sqlite import SqliteSessionBackend
+
+        logger.info("Session store: SQLite at %s", SESSION_DB_PATH)
+        return SqliteSessionBackend(SESSION_DB_PATH)
+    if SESSION_BACKEND != "memory":
+        logger.warning("Unknown SESSION_BACKEND '%s' — using memory", SESSION_BACKEND)
+    return MemorySessionBackend()
+
+
+_backend: SessionBackend = _create_backend()
 
 
 def save_session(session_id: str, data: dict[str, Any]) -> None:
-    _sessions[session_id] = data
-    _session_order.insert(0, session_id)
-    _evict_oldest()
+    _backend.save(session_id, data)
 
 
 def get_session(session_id: str) -> dict[str, Any] | None:
-    return _sessions.get(session_id)
+    """Return a snapshot of the session's non-DataFrame fields, or None if it does not exist."""
+    return _backend.get(session_id)
+
+
+def get_session_frame(session_id: str, key: str) -> pd.DataFrame | None:
+    """Return one DataFrame field of a session, reloading it from disk if spilled."""
+    return _backend.get_frame(session_id, key)
+
+
+def update_session(session_id: str, changes: dict[str, Any]) -> None:
+    """Write fields back to a session; a value of None removes the field."""
+    _backend.update(session_id, changes)
+
+
+def release_session_frame(session_id: str, key: str) -> None:
+    """Move a DataFrame that is rarely read out of memory, keeping it retrievable.
+
+    Used for `raw_df` once mappings are confirmed: it is only read again if
+    the user goes back and re-maps the columns.
+    """
+    _backend.release_frame(session_id, key)
 
 
 def delete_session(session_id: str) -> bool:
     """Remove a session and all associated data. Returns True if it existed."""
-    if session_id not in _sessions:
-        return False
-    _sessions.pop(session_id, None)
-    _votes.pop(session_id, None)
-    _voted_recommendations.pop(session_id, None)
-    if session_id in _session_order:
-        _session_order.remove(session_id)
-    logger.info("Deleted session %s", session_id)
-    return True
+    deleted = _backend.delete(session_id)
+    if deleted:
+        logger.info("Deleted session %s", session_id)
+    return deleted
+
+
+def store_stats() -> dict[str, Any]:
+    """Session count and memory held, for the metrics endpoint."""
+    return _backend.stats()
+
+
+def sweep_sessions(idle_ttl: float, max_age: float) -> tuple[list[str], int]:
+    """Expire sessions past either TTL, then spill idle frames.
+
+    Returns the expired session IDs and the bytes their fields held.
+    """
+    expired, freed = _backend.expire(idle_ttl, max_age)
+    _backend.spill_idle()
+    return expired, freed
+
+
+def reset_store() -> None:
+    """Drop every session and vote."""
+    _backend.clear()
 
 
 def add_vote(
@@ -60,67 +606,44 @@ def add_vote(
     recommendation_title: str,
     recommendation_description: str,
 ) -> dict[str, int]:
-    # Tally per-agent votes
-    if session_id not in _votes:
-        _votes[session_id] = {"conservative": 0, "aggressive": 0, "balanced": 0}
-    _votes[session_id][agent_type] = _votes[session_id].get(agent_type, 0) + 1
-
-    # Store recommendation detail for preference learning
-    if session_id not in _voted_recommendations:
-        _voted_recommendations[session_id] = []
-
-    # Avoid duplicate votes on the same recommendation
-    already_voted = any(
-        r["recommendation_id"] == recommendation_id for r in _voted_recommendations[session_id]
+    # Recommendation detail is stored for preference learning
+    tallies, recorded = _backend.add_vote(
+        session_id,
+        agent_type,
+        {
+            "recommendation_id": recommendation_id,
+            "title": recommendation_title,
+            "description": recommendation_description,
+        },
     )
-    if not already_voted:
-        _voted_recommendations[session_id].append(
-            {
-                "recommendation_id": recommendation_id,
-                "title": recommendation_title,
-                "description": recommendation_description,
-            }
-        )
+    if recorded:
         logger.info(
             "Preference recorded for session %s: '%s'",
             session_id,
             recommendation_title,
         )
+    return tallies
 
-    return _votes[session_id]
-
-
-def list_sessions() -> list[dict[str, Any]]:
-    """Return metadata for all sessions, most recent first."""
-    results = []
-    for sid in _session_order:
-        session = _sessions.get(sid)
-        if not session:
-            continue
-        summary = session.get("summary")
-        vote_count = sum(get_votes(sid).values())
-        results.append(
-            {
-                "session_id": sid,
-                "filename": session.get("filename", "unknown.csv"),
-                "created_at": session.get("created_at", ""),
-                "row_count": summary.row_count if summary else 0,
-                "total_spend": summary.total_spend if summary else 0,
-                "vote_count": vote_count,
-                "has_report": bool(session.get("agent_results")),
-            }
-        )
-    return results
+
+def list_sessions(
+    limit: int = SESSION_PAGE_SIZE, cursor: str | None = None
+) -> tuple[list[dict[str, Any]], str | None]:
+    """Return one page of session metadata, most recent first, and the next page's cursor.
+
+    The cursor is None on the last page. Raises ValueError for a malformed cursor.
+    """
+    before = int(cursor) if cursor is not None else None
+    sessions, next_seq = _backend.list_sessions(limit, before)
+    return sessions, str(next_seq) if next_seq is not None else None
 
 
 def get_votes(session_id: str) -> dict[str, int]:
-    return _votes.get(session_id, {"conservative": 0, "aggressive": 0, "balanced": 0})
+    return _backend.get_votes(session_id) or dict(_NO_VOTES)
 
 
 def get_voted_recommendation_ids(session_id: str) -> list[str]:
     """Return just the recommendation IDs that have been voted on."""
-    voted = _voted_recommendations.get(session_id, [])
-    return [v["recommendation_id"] for v in voted]
+    return [v["recommendation_id"] for v in _backend.voted_recommendations(session_id)]
 
 
 def build_preference_context(session_id: str) -> str:
@@ -128,7 +651,7 @@ def build_preference_context(session_id: str) -> str:
 
     Returns an empty string if no votes have been cast yet.
     """
-    voted = _voted_recommendations.get(session_id, [])
+    voted = _backend.voted_recommendations(session_id)
     if not voted:
         return ""
 
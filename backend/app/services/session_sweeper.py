@@ -0,0 +1,69 @@
+"""Background expiry of idle and old sessions.
+
+Started with the app. Every SESSION_SWEEP_INTERVAL_SECONDS the sweeper drops
+sessions that have gone SESSION_IDLE_TTL_SECONDS without access or are more
+than SESSION_MAX_AGE_SECONDS old, freeing their frames and votes. It then
+spills the frames of idle sessions that remain.
+"""
+
+import asyncio
+import contextlib
+import logging
+
+from app.config import (
+    SESSION_IDLE_TTL_SECONDS,
+    SESSION_MAX_AGE_SECONDS,
+    SESSION_SWEEP_INTERVAL_SECONDS,
+)
+from app.services.session_store import sweep_sessions
+from app.services.summary_cache import summary_cache
+from app.services.worker_pool import run_session_io
+
+logger = logging.getLogger("arena.store")
+
+_task: asyncio.Task[None] | None = None
+
+
+async def sweep_once() -> tuple[int, int]:
+    """Run one sweep. Returns the number of sessions expired and the bytes reclaimed."""
+    # Spilling writes files, so the sweep runs off the event loop
+    expired, freed = await run_session_io(
+        sweep_sessions, SESSION_IDLE_TTL_SECONDS, SESSION_MAX_AGE_SECONDS
+    )
+    for session_id in expired:
+        summary_cache.invalidate_session(session_id)
+    if expired:
+        logger.info("Session sweep expired %d sessions, reclaimed %d bytes", len(expired), freed)
+    return len(expired), freed
+
+
+async def _sweep_forever() -> None:
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL_SECONDS)
+        try:
+            await sweep_once()
+        except Exception:
+            logger.exception("Session sweep failed")
+
+
+def start_session_sweeper() -> None:
+    global _task
+    if SESSION_SWEEP_INTERVAL_SECONDS <= 0 or _task is not None:
+        return
+    _task = asyncio.get_running_loop().create_task(_sweep_forever())
+    logger.info(
+        "Session sweeper started (every %ds; idle TTL %ds, max age %ds)",
+        SESSION_SWEEP_INTERVAL_SECONDS,
+        SESSION_IDLE_TTL_SECONDS,
+        SESSION_MAX_AGE_SECONDS,
+    )
+
+
+async def stop_session_sweeper() -> None:
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await _task
+    _task = None
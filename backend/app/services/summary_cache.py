@@ -0,0 +1,120 @@
+"""Byte-budgeted LRU cache of date-filtered summaries.
+
+Users tend to flip between the same few date windows. Each window's
+`DataSummary` is cached under `(session_id, version, start, end)` so
+revisiting a window skips the aggregation entirely. Entries are sized by their
+serialized JSON length and the least recently used ones are dropped once the
+byte budget is exceeded.
+
+`version` is the session's `summary_version`, a fresh token written with the
+summary cube on every confirm-mappings. The cache is per process, so another
+worker never sees this one's invalidation; keying on the version means a
+re-confirm anywhere makes every older entry unreachable everywhere. Locally,
+re-confirming also drops that session's entries to free their bytes early,
+and a window computed before that drop is not stored after it: callers take
+a `generation()` before computing and pass it to `put`.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any
+
+import pandas as pd
+
+from app.config import SUMMARY_CACHE_MAX_BYTES
+from app.models.schemas import DataSummary
+
+logger = logging.getLogger("arena.cache")
+
+CacheKey = tuple[str, str | None, pd.Timestamp | None, pd.Timestamp | None]
+
+# Sessions whose last invalidation is remembered for skipping stale puts
+_INVALIDATIONS_KEPT = 4096
+
+
+class SummaryCache:
+    """LRU mapping of (session_id, version, start, end) → DataSummary within a byte budget."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[CacheKey, tuple[DataSummary, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; session_id → value at its last one
+        self._generation = 0
+        self._invalidated: OrderedDict[str, int] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: CacheKey) -> DataSummary | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def generation(self) -> int:
+        """Token to take before computing a summary and hand back to `put`."""
+        with self._lock:
+            return self._generation
+
+    def put(self, key: CacheKey, summary: DataSummary, generation: int | None = None) -> None:
+        """Store `summary`, unless its session was invalidated after `generation`."""
+        size = len(summary.model_dump_json())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and self._invalidated.get(key[0], 0) > generation:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (summary, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate_session(self, session_id: str) -> int:
+        """Drop every cached window of one session. Returns the number removed."""
+        with self._lock:
+            self._generation += 1
+            self._invalidated.pop(session_id, None)
+            self._invalidated[session_id] = self._generation
+            while len(self._invalidated) > _INVALIDATIONS_KEPT:
+                self._invalidated.popitem(last=False)
+            stale = [key for key in self._entries if key[0] == session_id]
+            for key in stale:
+                self._bytes -= self._entries.pop(key)[1]
+        if stale:
+            logger.info("Invalidated %d cached summaries for session %s", len(stale), session_id)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._invalidated.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+summary_cache = SummaryCache(SUMMARY_CACHE_MAX_BYTES)
@@ -0,0 +1,124 @@
+"""Read the file part of a multipart upload straight off the request body.
+
+Starlette's `UploadFile` is handed over only once the whole body has been
+spooled, so any limit checked on it trips after the full transfer. The
+upload handler parses the body itself instead: `MultipartFileReader` is a
+blocking reader, used from a worker thread, that pulls body chunks from the
+event loop only as the CSV parser asks for more. A file over the byte or row
+limit is rejected after the chunk that crosses it, and the rest of the body
+is never read.
+"""
+
+import asyncio
+import io
+from collections.abc import AsyncIterator
+
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+# Form field the frontend sends the file in
+FILE_FIELD = b"file"
+
+
+class MultipartError(ValueError):
+    """Raised when the request body is not a multipart form carrying a file."""
+
+
+class MultipartFileReader(io.RawIOBase):
+    """Raw binary reader over the first file part of a multipart/form-data body.
+
+    `chunks` is the request body (e.g. `Request.stream()`), iterated on `loop`.
+    Reads block the calling thread, so never call them from the loop itself.
+    Call `read_headers` first to learn the part's filename.
+    """
+
+    def __init__(
+        self, chunks: AsyncIterator[bytes], content_type: str, loop: asyncio.AbstractEventLoop
+    ) -> None:
+        media_type, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if media_type != b"multipart/form-data" or not boundary:
+            raise MultipartError("Expected a multipart/form-data upload")
+        self._chunks = chunks
+        self._loop = loop
+        self._parser = MultipartParser(
+            boundary,
+            callbacks={
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            },
+        )
+        self.filename: str | None = None
+        self._pending = bytearray()
+        self._in_file = False
+        self._file_done = False
+        self._body_done = False
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._disposition = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def read_headers(self) -> str:
+        """Read up to the file part's headers and return its filename."""
+        while self.filename is None:
+            if self._body_done:
+                raise MultipartError("No file in the upload")
+            self._pull()
+        return self.filename
+
+    def readinto(self, buffer) -> int:
+        while not self._pending and not self._file_done:
+            if self._body_done:
+                raise MultipartError("Upload ended before the file was complete")
+            self._pull()
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        del self._pending[:n]
+        return n
+
+    def _pull(self) -> None:
+        chunk = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop).result()
+        if chunk is None:
+            self._body_done = True
+            self._parser.finalize()
+        elif chunk:
+            self._parser.write(chunk)
+
+    async def _next_chunk(self) -> bytes | None:
+        return await anext(self._chunks, None)
+
+    def _on_part_begin(self) -> None:
+        self._disposition = b""
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        if bytes(self._header_field).lower() == b"content-disposition":
+            self._disposition = bytes(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def _on_headers_finished(self) -> None:
+        _, params = parse_options_header(self._disposition)
+        if self.filename is None and params.get(b"name") == FILE_FIELD and b"filename" in params:
+            self.filename = params[b"filename"].decode("utf-8", "replace")
+            self._in_file = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._pending += data[start:end]
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+            self._file_done = True
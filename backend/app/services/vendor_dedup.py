@@ -0,0 +1,419 @@
+"""Duplicate vendor detection with trigram blocking.
+
+Scoring every vendor pair with `SequenceMatcher` is O(n²). Instead, each
+normalized name is broken into padded trigrams and only pairs that share
+enough of them to possibly reach the similarity threshold are scored.
+
+The pruning is lossless. A `SequenceMatcher` ratio r = 2M / (|a| + |b|)
+implies an insert/delete distance of at most (|a| + |b|)(1 - r), and each
+edit destroys at most three trigrams. That gives a minimum number of shared
+trigrams for any qualifying pair. Prefix filtering turns the bound into
+candidate generation: trigrams are ordered rarest-first, and a name is only
+indexed under the prefix a qualifying partner must overlap. The rare
+trigrams keep posting lists short, so the work grows close to linearly with
+the number of vendors.
+
+With a vendor registry, names already registered are not re-indexed: their
+trigrams are stored, and new names are matched against them by counting
+shared trigrams in the registry's inverted index.
+"""
+
+import math
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+import pandas as pd
+
+from app.config import (
+    DUPLICATE_VENDOR_PARALLEL_MIN_PAIRS,
+    DUPLICATE_VENDOR_SCORING_WORKERS,
+    DUPLICATE_VENDOR_THRESHOLD,
+)
+from app.services import worker_pool
+from app.services.vendor_registry import PairScores, VendorRegistry, get_vendor_registry
+
+# Common business suffixes to strip before comparing vendor names
+_BUSINESS_SUFFIXES = re.compile(
+    r"\b(pty|ltd|limited|p/l|p-l|inc|incorporated|corp|corporation|"
+    r"llc|llp|plc|gmbh|australia|aust|nsw|vic|qld|act|sa|wa|nt|tas)\b",
+    re.IGNORECASE,
+)
+_NON_ALPHANUMERIC = re.compile(r"[^a-z0-9\s]")
+
+VendorPair = tuple[str, str, str]  # (vendor, vendor, "a / b (similarity: n%)" message)
+
+_Q = 3
+# Padding characters cannot survive normalization, so they never collide with name text
+_PAD_START = "\x02" * (_Q - 1)
+_PAD_END = "\x03" * (_Q - 1)
+
+Token = tuple[str, int]  # (trigram, occurrence number) — makes trigram multisets into sets
+
+
+def _normalize_vendor(name: str) -> str:
+    """Strip common suffixes and punctuation so comparison focuses on the real name."""
+    name = name.lower().strip()
+    name = _BUSINESS_SUFFIXES.sub("", name)
+    name = _NON_ALPHANUMERIC.sub("", name)  # remove punctuation
+    return " ".join(name.split())  # collapse whitespace
+
+
+def normalize_vendor_names(names: pd.Series) -> pd.Series:
+    """`_normalize_vendor` over a whole Series using pandas string ops.
+
+    Runs on object dtype so the regexes keep Python `re` semantics (Arrow
+    strings would switch to RE2, whose word boundaries are ASCII-only).
+    Missing names normalize to "".
+    """
+    normalized = names.astype(object).str.lower().str.strip()
+    normalized = normalized.str.replace(_BUSINESS_SUFFIXES, "", regex=True)
+    normalized = normalized.str.replace(_NON_ALPHANUMERIC, "", regex=True)
+    return normalized.str.split().str.join(" ").fillna("")
+
+
+def _trigram_tokens(name: str) -> list[Token]:
+    padded = _PAD_START + name + _PAD_END
+    occurrences: dict[str, int] = defaultdict(int)
+    tokens = []
+    for k in range(len(padded) - _Q + 1):
+        gram = padded[k : k + _Q]
+        tokens.append((gram, occurrences[gram]))
+        occurrences[gram] += 1
+    return tokens
+
+
+def _token_keys(name: str) -> list[str]:
+    """Trigram tokens as strings, for the registry's index (a trigram is always 3 characters)."""
+    return [f"{gram}{occurrence}" for gram, occurrence in _trigram_tokens(name)]
+
+
+def _required_shared_tokens(len_a: int, len_b: int, threshold: float) -> int:
+    """Fewest trigrams two names of these lengths share if they score >= threshold.
+
+    Zero or less means the pair may qualify without sharing any trigram.
+    """
+    max_edits = math.floor((len_a + len_b) * (1 - threshold) + 1e-9)  # epsilon keeps pairs
+    return max(len_a, len_b) + _Q - 1 - _Q * max_edits
+
+
+def _longest_partner(length: int, threshold: float) -> int:
+    """Longest name the length filter lets a name of `length` match."""
+    return math.floor(length * (2 - threshold) / threshold + 1e-9)
+
+
+def _could_match(len_a: int, len_b: int, threshold: float) -> bool:
+    """Length filter: the ratio can never exceed 2·min / (len_a + len_b)."""
+    return 2 * min(len_a, len_b) >= threshold * (len_a + len_b) - 1e-9
+
+
+def _loosest_required_tokens(length: int, threshold: float) -> int:
+    """Fewest shared trigrams over every partner length the length filter allows."""
+    shortest = max(1, math.ceil(length * threshold / (2 - threshold) - 1e-9))
+    longest = max(shortest, _longest_partner(length, threshold))
+    return min(
+        _required_shared_tokens(length, partner, threshold)
+        for partner in range(shortest, longest + 1)
+    )
+
+
+def _candidate_pairs(
+    names: list[str], threshold: float, probes: list[int] | None = None
+) -> set[tuple[int, int]]:
+    """Index pairs (i < j) of names that may reach `threshold`.
+
+    Without `probes`, every pair is covered. Names are visited shortest first,
+    so each pair is found when its longer name probes the index. The probe
+    prefix is sized for equal-length partners (the loosest shorter case) and
+    the indexed prefix for the loosest longer one.
+
+    With `probes`, only pairs involving a probe name are generated. All names
+    are indexed first, with prefixes sized for partners of any length.
+    """
+    if threshold <= 0:
+        involved = set(range(len(names)) if probes is None else probes)
+        return {
+            (i, j) for j in range(len(names)) for i in range(j) if i in involved or j in involved
+        }
+
+    token_lists = [_trigram_tokens(name) for name in names]
+    frequency: dict[Token, int] = defaultdict(int)
+    for tokens in token_lists:
+        for token in tokens:
+            frequency[token] += 1
+
+    def rarest_first(k: int) -> list[Token]:
+        return sorted(token_lists[k], key=lambda t: (frequency[t], t))
+
+    def prefix(ordered: list[Token], required: int) -> list[Token]:
+        return ordered[: len(ordered) - max(required, 1) + 1]
+
+    candidates: set[tuple[int, int]] = set()
+    index: dict[Token, list[int]] = defaultdict(list)
+    unbounded: list[int] = []  # indexed names that may match without a shared trigram
+
+    if probes is not None:
+        loosest = [_loosest_required_tokens(len(name), threshold) for name in names]
+        ordered_lists = [rarest_first(k) for k in range(len(names))]
+        for i, ordered in enumerate(ordered_lists):
+            if loosest[i] <= 0:
+                unbounded.append(i)
+            for token in prefix(ordered, loosest[i]):
+                index[token].append(i)
+        for j in probes:
+            partners = set(unbounded) if loosest[j] <= 0 else set()
+            for token in prefix(ordered_lists[j], loosest[j]):
+                partners.update(index[token])
+            partners.discard(j)
+            candidates.update((min(i, j), max(i, j)) for i in partners)
+        return candidates
+
+    for j in sorted(range(len(names)), key=lambda k: len(names[k])):
+        length = len(names[j])
+        ordered = rarest_first(j)
+
+        probe_required = _required_shared_tokens(length, length, threshold)
+        if probe_required <= 0:
+            candidates.update((min(i, j), max(i, j)) for i in unbounded)
+        for token in prefix(ordered, probe_required):
+            candidates.update((min(i, j), max(i, j)) for i in index.get(token, ()))
+
+        index_required = min(
+            _required_shared_tokens(length, partner, threshold)
+            for partner in range(length, max(length, _longest_partner(length, threshold)) + 1)
+        )
+        if index_required <= 0:
+            unbounded.append(j)
+        for token in prefix(ordered, index_required):
+            index[token].append(j)
+    return candidates
+
+
+def _score_shard(
+    shard: list[tuple[int, int, str, str]], threshold: float
+) -> list[tuple[int, int, float, float]]:
+    """Run SequenceMatcher over (i, j, name_i, name_j) pairs; keep those reaching threshold.
+
+    Module-level so shards can be sent to scoring processes.
+    """
+    scored = []
+    matcher = SequenceMatcher()
+    for i, j, a, b in shard:
+        matcher.set_seqs(a, b)
+        if matcher.quick_ratio() < threshold:
+            continue
+        forward = matcher.ratio()
+        backward = SequenceMatcher(None, b, a).ratio()
+        if max(forward, backward) >= threshold:
+            scored.append((i, j, forward, backward))
+    return scored
+
+
+def _score_in_pool(
+    shortlist: list[tuple[int, int, str, str]], threshold: float
+) -> list[tuple[int, int, float, float]]:
+    """Shard the shortlist across the scoring pool; results come back in shortlist order."""
+    executor = worker_pool.get_scoring_executor()
+    shard_count = DUPLICATE_VENDOR_SCORING_WORKERS * 4  # smaller shards even out stragglers
+    shard_size = -(-len(shortlist) // shard_count)
+    shards = [shortlist[k : k + shard_size] for k in range(0, len(shortlist), shard_size)]
+    scored: list[tuple[int, int, float, float]] = []
+    for result in executor.map(_score_shard, shards, [threshold] * len(shards)):
+        scored.extend(result)
+    return scored
+
+
+def _scored_pairs(
+    names: list[str], threshold: float, probes: list[int] | None = None
+) -> dict[tuple[int, int], tuple[float, float]]:
+    """Score candidate pairs (i < j) that reach `threshold` in either direction.
+
+    Returns (ratio i→j, ratio j→i): SequenceMatcher is not quite symmetric.
+    The length and trigram-count bounds run here.
+    """
+    token_sets = [set(_trigram_tokens(name)) for name in names]
+    shortlist = []
+    for i, j in sorted(_candidate_pairs(names, threshold, probes)):
+        a, b = names[i], names[j]
+        if not _could_match(len(a), len(b), threshold):
+            continue
+        if len(token_sets[i] & token_sets[j]) < _required_shared_tokens(len(a), len(b), threshold):
+            continue
+        shortlist.append((i, j, a, b))
+    return _score_shortlist(shortlist, threshold)
+
+
+def _score_shortlist(
+    shortlist: list[tuple[int, int, str, str]], threshold: float
+) -> dict[tuple[int, int], tuple[float, float]]:
+    """Score (i, j, name_i, name_j) pairs, keyed (i, j).
+
+    The SequenceMatcher work runs on the scoring process pool once the
+    shortlist is long enough, unless this is already a data worker process.
+    """
+    parallel = (
+        DUPLICATE_VENDOR_SCORING_WORKERS > 1
+        and len(shortlist) >= DUPLICATE_VENDOR_PARALLEL_MIN_PAIRS
+        and not worker_pool.in_worker_process
+    )
+    scored = (
+        _score_in_pool(shortlist, threshold) if parallel else _score_shard(shortlist, threshold)
+    )
+    return {(i, j): (forward, backward) for i, j, forward, backward in scored}
+
+
+def _named_scores(
+    vocabulary: list[str], scored: dict[tuple[int, int], tuple[float, float]]
+) -> PairScores:
+    return {(vocabulary[i], vocabulary[j]): ratios for (i, j), ratios in scored.items()}
+
+
+def _score_against_registry(
+    fresh: list[str], registry: VendorRegistry, through_id: int
+) -> PairScores:
+    """Score `fresh` names against names registered up to `through_id`.
+
+    The registry's trigram index counts the trigrams each registered name
+    shares with a fresh one, so only names that share enough for their
+    lengths are scored. Partner lengths at which a pair may qualify without
+    a shared trigram are fetched by length. Pairs are (registered, fresh).
+    """
+    threshold = registry.score_floor
+    registered: dict[str, int] = {}
+    shortlist = []
+    for position, name in enumerate(fresh):
+        length = len(name)
+        if threshold <= 0:
+            candidates = {known: 0 for _, known in registry.names_after(0)}
+        else:
+            candidates = dict(registry.shared_tokens(_token_keys(name), through_id))
+            shortest = max(1, math.ceil(length * threshold / (2 - threshold) - 1e-9))
+            for partner in range(shortest, max(shortest, _longest_partner(length, threshold)) + 1):
+                if _required_shared_tokens(length, partner, threshold) <= 0:
+                    for known in registry.names_of_length(partner, through_id):
+                        candidates.setdefault(known, 0)
+        for known, shared in candidates.items():
+            if known == name or not _could_match(len(known), length, threshold):
+                continue
+            if shared < _required_shared_tokens(len(known), length, threshold):
+                continue
+            i = registered.setdefault(known, len(registered))
+            shortlist.append((i, position, known, name))
+
+    scored = _score_shortlist(shortlist, threshold)
+    names = list(registered)
+    return {(names[i], fresh[j]): ratios for (i, j), ratios in scored.items()}
+
+
+def _register_names(fresh: list[str], registry: VendorRegistry) -> None:
+    """Score names the registry has not seen and record them.
+
+    Scoring runs outside any transaction. The write lock is only taken to
+    record; names another process registered meanwhile are scored against
+    `fresh` after releasing it, and the record is retried.
+    """
+    through_id = registry.last_id()
+    first_fresh = set(fresh)
+    scores = _named_scores(fresh, _scored_pairs(fresh, registry.score_floor))
+    scores.update(_score_against_registry(fresh, registry, through_id))
+    while fresh:
+        with registry.locked():
+            added = registry.names_after(through_id)
+            if not added:
+                registry.record(fresh, scores, {name: _token_keys(name) for name in fresh})
+                return
+        through_id = added[-1][0]
+        fresh = [name for name in fresh if not registry.is_known(name)]
+        pending = set(fresh)
+        # Pairs where both names are now registered were recorded by someone else
+        scores = {pair: r for pair, r in scores.items() if pending.intersection(pair)}
+        added_names = [name for _, name in added if name not in first_fresh]
+        vocabulary = added_names + fresh
+        scored = _scored_pairs(vocabulary, registry.score_floor, list(range(len(added_names))))
+        for (a, b), ratios in _named_scores(vocabulary, scored).items():
+            if (a in pending) != (b in pending):
+                scores[a, b] = ratios
+
+
+def _registry_scores(
+    names: list[str], registry: VendorRegistry
+) -> dict[tuple[int, int], tuple[float, float]]:
+    """Pair scores among `names`, scoring only names the registry has not seen.
+
+    New names are scored against the whole registry (at its score floor),
+    not just this upload, so stored pairs stay complete for later lookups.
+    Known names are read without a transaction.
+    """
+    registry.names()  # picks up names other processes registered
+    fresh = [name for name in names if not registry.is_known(name)]
+    if fresh:
+        _register_names(fresh, registry)
+
+    position = {name: k for k, name in enumerate(names)}
+    scores = {}
+    for (a, b), (ratio_ab, ratio_ba) in registry.scores_among(names).items():
+        i, j = position[a], position[b]
+        scores[min(i, j), max(i, j)] = (ratio_ab, ratio_ba) if i < j else (ratio_ba, ratio_ab)
+    return scores
+
+
+def find_duplicate_vendors(
+    vendors: list[str],
+    threshold: float = DUPLICATE_VENDOR_THRESHOLD,
+    registry: VendorRegistry | None = None,
+) -> list[str]:
+    """Find vendor names that look like duplicates.
+
+    Results match a full pairwise scan over `vendors`, in the same order.
+    `registry` defaults to the configured vendor registry. When there is one
+    and its score floor is at or below `threshold`, known names are looked up
+    rather than scored.
+    """
+    return [message for _, _, message in duplicate_vendor_pairs(vendors, threshold, registry)]
+
+
+def duplicate_vendor_pairs(
+    vendors: list[str],
+    threshold: float = DUPLICATE_VENDOR_THRESHOLD,
+    registry: VendorRegistry | None = None,
+) -> list[VendorPair]:
+    """`find_duplicate_vendors`, with the two vendor names of each message.
+
+    Pairs only depend on their two names, so the result for any subset of
+    `vendors` is this list filtered to pairs with both names in the subset.
+    """
+    if registry is None:
+        registry = get_vendor_registry()
+
+    # Vendors that normalize identically are scored once, as one name
+    groups: dict[str, list[int]] = defaultdict(list)
+    for position, normalized in enumerate(normalize_vendor_names(pd.Series(vendors, dtype=object))):
+        if normalized:
+            groups[normalized].append(position)
+    names = list(groups)
+
+    if registry is not None and threshold >= registry.score_floor:
+        scores = _registry_scores(names, registry)
+    else:
+        scores = _scored_pairs(names, threshold)
+
+    # Score in the order the scan would; below-threshold directions are kept
+    # too, because a repeated name pair only counts once
+    pairs = []
+    for (i, j), (forward, backward) in scores.items():
+        for p in groups[names[i]]:
+            for q in groups[names[j]]:
+                pairs.append((min(p, q), max(p, q), forward if p < q else backward))
+    pairs.sort()
+
+    duplicates = []
+    seen = set()
+    for p, q, ratio in pairs:
+        v1, v2 = vendors[p], vendors[q]
+        pair = tuple(sorted([v1, v2]))
+        if pair in seen:
+            continue
+        seen.add(pair)
+        if ratio >= threshold:
+            duplicates.append((v1, v2, f"{v1} / {v2} (similarity: {ratio:.0%})"))
+    return duplicates
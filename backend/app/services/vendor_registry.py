@@ -0,0 +1,260 @@
+"""Persistent cross-session vendor alias registry (SQLite).
+
+Uploads keep bringing the same few thousand suppliers. The registry remembers
+every normalized vendor name it has seen, the trigrams of each, and the
+similarity scores of pairs that reached its score floor. A new name is
+scored once against the whole registry when it first appears: the stored
+trigram index yields the registered names that share enough trigrams with
+it, so its cost grows with the new names, not with the registry. After
+that, its pairs are a table lookup.
+
+Lookups read committed rows without a transaction. Scoring new names also
+runs outside one; SQLite's write lock is only held to record the results.
+
+Disabled unless VENDOR_REGISTRY_PATH is set. The database runs in WAL mode,
+so process workers can share one file safely. Everything in it can be
+recomputed, so a file from an older schema is cleared rather than migrated.
+"""
+
+import logging
+import sqlite3
+import threading
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+
+from app.config import DUPLICATE_VENDOR_THRESHOLD, VENDOR_REGISTRY_PATH
+
+logger = logging.getLogger("arena.vendors")
+
+_SCHEMA_VERSION = "2"
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS vendors (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        length INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS vendors_length ON vendors (length)",
+    # Each name's trigram tokens (trigram plus occurrence number), as an inverted index
+    """CREATE TABLE IF NOT EXISTS trigrams (
+        token TEXT NOT NULL,
+        vendor_id INTEGER NOT NULL,
+        PRIMARY KEY (token, vendor_id)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS similarities (
+        a TEXT NOT NULL,
+        b TEXT NOT NULL,
+        ratio_ab REAL NOT NULL,
+        ratio_ba REAL NOT NULL,
+        PRIMARY KEY (a, b)
+    ) WITHOUT ROWID""",
+)
+
+# Keeps IN (...) lists under SQLite's bound-parameter limit
+_IN_CHUNK = 500
+
+PairScores = dict[tuple[str, str], tuple[float, float]]  # (a, b) -> (ratio a→b, ratio b→a)
+
+
+def _chunks(items: list[str]) -> Iterator[list[str]]:
+    for start in range(0, len(items), _IN_CHUNK):
+        yield items[start : start + _IN_CHUNK]
+
+
+class VendorRegistry:
+    """Normalized vendor names, their trigram index and scored pairs.
+
+    `score_floor` is fixed when the file is created. Only pairs scoring at
+    least that much are stored, so lookups are complete for any threshold at
+    or above it. Names get increasing ids, so "registered after id n" is how
+    callers find names recorded while they were scoring.
+    """
+
+    def __init__(self, path: str, score_floor: float = DUPLICATE_VENDOR_THRESHOLD) -> None:
+        # Autocommit mode: transactions are opened explicitly
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.RLock()
+        self._names: list[str] = []
+        self._name_set: set[str] = set()
+        self._last_id = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._create_schema(score_floor)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'score_floor'").fetchone()
+        self.score_floor = float(row[0])
+
+    def _create_schema(self, score_floor: float) -> None:
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        version = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'schema_version'"
+        ).fetchone()
+        if version is None or version[0] != _SCHEMA_VERSION:
+            for table in ("vendors", "trigrams", "similarities"):
+                self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                (_SCHEMA_VERSION,),
+            )
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('score_floor', ?)",
+            (repr(score_floor),),
+        )
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold SQLite's write lock while checking for and recording new names.
+
+        BEGIN IMMEDIATE takes the lock up front, so the names seen on entry
+        stay complete until `record` commits. Keep the body short: score
+        outside, then re-check here for names registered in the meantime.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._refresh_names()
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _refresh_names(self) -> None:
+        rows = self._conn.execute(
+            "SELECT id, name FROM vendors WHERE id > ? ORDER BY id", (self._last_id,)
+        ).fetchall()
+        for vendor_id, name in rows:
+            self._names.append(name)
+            self._name_set.add(name)
+            self._last_id = vendor_id
+
+    def names(self) -> list[str]:
+        """Every registered name, in registration order."""
+        with self._lock:
+            self._refresh_names()
+            return list(self._names)
+
+    def last_id(self) -> int:
+        """Id of the most recently registered name (0 when empty)."""
+        with self._lock:
+            self._refresh_names()
+            return self._last_id
+
+    def names_after(self, vendor_id: int) -> list[tuple[int, str]]:
+        """(id, name) of every name registered after `vendor_id`, in order."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, name FROM vendors WHERE id > ? ORDER BY id", (vendor_id,)
+            ).fetchall()
+
+    def is_known(self, name: str) -> bool:
+        return name in self._name_set
+
+    def shared_tokens(self, tokens: list[str], through_id: int) -> Counter[str]:
+        """How many of `tokens` each name registered up to `through_id` has (0 omitted)."""
+        shared: Counter[str] = Counter()
+        with self._lock:
+            for chunk in _chunks(sorted(set(tokens))):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT v.name, COUNT(*) FROM trigrams t JOIN vendors v ON v.id = t.vendor_id "  # noqa: S608
+                    f"WHERE t.token IN ({placeholders}) AND t.vendor_id <= ? GROUP BY v.id",
+                    [*chunk, through_id],
+                ).fetchall()
+                shared.update(dict(rows))
+        return shared
+
+    def names_of_length(self, length: int, through_id: int) -> list[str]:
+        """Names `length` characters long registered up to `through_id`."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM vendors WHERE length = ? AND id <= ?", (length, through_id)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def scores_among(self, names: Iterable[str]) -> PairScores:
+        """Stored scores for pairs whose names are both in `names`."""
+        wanted = set(names)
+        scores: PairScores = {}
+        with self._lock:
+            for chunk in _chunks(sorted(wanted)):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT a, b, ratio_ab, ratio_ba FROM similarities WHERE a IN ({placeholders})",  # noqa: S608
+                    chunk,
+                ).fetchall()
+                for a, b, ratio_ab, ratio_ba in rows:
+                    if b in wanted:
+                        scores[a, b] = (ratio_ab, ratio_ba)
+        return scores
+
+    def record(
+        self, new_names: list[str], scores: PairScores, tokens: dict[str, list[str]]
+    ) -> None:
+        """Register new names with their trigram `tokens`, and their scored pairs.
+
+        Call inside `locked()`. Each pair is scored once, when the later of
+        its two names is registered, so it is stored in a single orientation.
+        """
+        first_new = self._last_id
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO vendors (name, length) VALUES (?, ?)",
+            [(name, len(name)) for name in new_names],
+        )
+        self._refresh_names()
+        ids = self._conn.execute(
+            "SELECT id, name FROM vendors WHERE id > ?", (first_new,)
+        ).fetchall()
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO trigrams (token, vendor_id) VALUES (?, ?)",
+            [(token, vendor_id) for vendor_id, name in ids for token in tokens[name]],
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO similarities (a, b, ratio_ab, ratio_ba) VALUES (?, ?, ?, ?)",
+            [(a, b, ratio_ab, ratio_ba) for (a, b), (ratio_ab, ratio_ba) in scores.items()],
+        )
+        if new_names:
+            logger.info(
+                "Vendor registry: %d new names, %d scored pairs", len(new_names), len(scores)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_registry: VendorRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_vendor_registry() -> VendorRegistry | None:
+    """Return the shared registry, or None when VENDOR_REGISTRY_PATH is unset."""
+    global _registry
+    if not VENDOR_REGISTRY_PATH:
+        return None
+    with _registry_lock:
+        if _registry is None:
+            _registry = VendorRegistry(VENDOR_REGISTRY_PATH)
+            logger.info("Vendor registry opened at %s", VENDOR_REGISTRY_PATH)
+        return _registry
+
+
+def close_vendor_registry() -> None:
+    global _registry
+    with _registry_lock:
+        if _registry is not None:
+            _registry.close()
+            _registry = None
@@ -0,0 +1,348 @@
+"""Worker pool for blocking pandas work, keeping the event loop free for SSE streams.
+
+Two modes, selected by DATA_EXECUTOR:
+
+- ``thread`` (default): a dedicated thread pool. DataFrames are shared by
+  reference, and pandas releases the GIL for most of its heavy kernels.
+- ``process``: a spawn-based process pool whose workers import pandas and the
+  data processor once at start-up. DataFrames cross the process boundary as
+  Arrow IPC files on shared memory, instead of being pickled through the
+  result pipe. The other side maps them as Arrow-backed frames without
+  copying, so a hand-off costs one shared-memory copy and no heap copy.
+  Frames come back Arrow-backed (categoricals excepted), as with
+  PARSE_ENGINE="pyarrow".
+"""
+
+import asyncio
+import concurrent.futures
+import contextlib
+import functools
+import logging
+import multiprocessing
+import os
+import tempfile
+import uuid
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+import pandas as pd
+
+from app.config import (
+    DATA_EXECUTOR,
+    DATA_EXECUTOR_WORKERS,
+    DUPLICATE_VENDOR_SCORING_WORKERS,
+    LLM_CACHE_IO_WORKERS,
+    SESSION_IO_WORKERS,
+    SHARED_FRAME_DIR,
+    UPLOAD_WORKERS,
+)
+from app.services.arrow_frames import ARROW_ENCODE_ERRORS, map_frame_file, write_frame_file
+
+logger = logging.getLogger("arena.workers")
+
+_executor: Executor | None = None
+_io_executor: ThreadPoolExecutor | None = None
+_upload_executor: ThreadPoolExecutor | None = None
+_session_executor: ThreadPoolExecutor | None = None
+_cache_executor: ThreadPoolExecutor | None = None
+_scoring_executor: ProcessPoolExecutor | None = None
+
+# Set by the process-pool initializer so nested code can avoid forking again
+in_worker_process = False
+
+
+# ---------------------------------------------------------------------------
+# Shared-memory DataFrame hand-off (process mode only)
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class SharedFrame:
+    """Picklable handle to a DataFrame written as an Arrow IPC file."""
+
+    path: str
+
+
+def _share_frame(df: pd.DataFrame) -> SharedFrame | pd.DataFrame:
+    """Write `df` to shared memory, or return it as is (to be pickled) if Arrow cannot encode it."""
+    directory = SHARED_FRAME_DIR or tempfile.gettempdir()
+    path = os.path.join(directory, f"arena-frame-{uuid.uuid4().hex}.arrow")
+    try:
+        write_frame_file(df, path)
+    except ARROW_ENCODE_ERRORS as e:
+        _unlink(path)
+        logger.warning("Pickling a frame for the worker: Arrow cannot encode it (%s)", e)
+        return df
+    except BaseException:
+        _unlink(path)
+        raise
+    return SharedFrame(path)
+
+
+def _unlink(path: str) -> None:
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+
+
+def _open_frame(handle: SharedFrame) -> pd.DataFrame:
+    # Unlinking keeps the mapping: its memory is freed with the frame
+    try:
+        return map_frame_file(handle.path)
+    finally:
+        _unlink(handle.path)
+
+
+def _pack(value: Any, created: list[SharedFrame] | None = None) -> Any:
+    """Swap DataFrames (including inside tuples/lists/dicts) for shared handles.
+
+    Every handle written is appended to `created`, so a failure part way
+    through can still remove the files already written.
+    """
+    if isinstance(value, pd.DataFrame):
+        shared = _share_frame(value)
+        if created is not None and isinstance(shared, SharedFrame):
+            created.append(shared)
+        return shared
+    if isinstance(value, tuple):
+        return tuple(_pack(v, created) for v in value)
+    if isinstance(value, list):
+        return [_pack(v, created) for v in value]
+    if isinstance(value, dict):
+        return {k: _pack(v, created) for k, v in value.items()}
+    return value
+
+
+def _discard(value: Any) -> None:
+    """Remove the files behind every shared handle in `value` that nobody will open."""
+    if isinstance(value, SharedFrame):
+        _unlink(value.path)
+    elif isinstance(value, tuple | list):
+        for v in value:
+            _discard(v)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _discard(v)
+
+
+def _discard_result(future: concurrent.futures.Future) -> None:
+    if not future.cancelled() and future.exception() is None:
+        _discard(future.result())
+
+
+def _unpack(value: Any) -> Any:
+    if isinstance(value, SharedFrame):
+        return _open_frame(value)
+    if isinstance(value, tuple):
+        return tuple(_unpack(v) for v in value)
+    if isinstance(value, list):
+        return [_unpack(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _unpack(v) for k, v in value.items()}
+    return value
+
+
+def _call_packed(fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+    """Worker-side trampoline: open shared inputs, run, share outputs."""
+    created: list[SharedFrame] = []
+    try:
+        return _pack(fn(*_unpack(args), **_unpack(kwargs)), created)
+    except BaseException:
+        _discard(created)
+        raise
+
+
+# ---------------------------------------------------------------------------
+# Executor lifecycle
+# ---------------------------------------------------------------------------
+
+
+def _warm_worker() -> None:
+    """Process-pool initializer — pay the pandas import cost once per worker."""
+    global in_worker_process
+    in_worker_process = True
+    import app.services.data_processor  # noqa: F401
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _create_executor() -> Executor:
+    if DATA_EXECUTOR == "process":
+        return ProcessPoolExecutor(
+            max_workers=DATA_EXECUTOR_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+    if DATA_EXECUTOR != "thread":
+        logger.warning("Unknown DATA_EXECUTOR '%s' — falling back to threads", DATA_EXECUTOR)
+    return ThreadPoolExecutor(max_workers=DATA_EXECUTOR_WORKERS, thread_name_prefix="data")
+
+
+def get_executor() -> Executor:
+    """Return the shared executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = _create_executor()
+    return _executor
+
+
+def _get_io_executor() -> ThreadPoolExecutor:
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(
+            max_workers=DATA_EXECUTOR_WORKERS, thread_name_prefix="data-io"
+        )
+    return _io_executor
+
+
+def _get_upload_executor() -> ThreadPoolExecutor:
+    global _upload_executor
+    if _upload_executor is None:
+        _upload_executor = ThreadPoolExecutor(
+            max_workers=UPLOAD_WORKERS, thread_name_prefix="data-upload"
+        )
+    return _upload_executor
+
+
+def _get_session_executor() -> ThreadPoolExecutor:
+    global _session_executor
+    if _session_executor is None:
+        _session_executor = ThreadPoolExecutor(
+            max_workers=SESSION_IO_WORKERS, thread_name_prefix="session-io"
+        )
+    return _session_executor
+
+
+def _get_cache_executor() -> ThreadPoolExecutor:
+    global _cache_executor
+    if _cache_executor is None:
+        _cache_executor = ThreadPoolExecutor(
+            max_workers=LLM_CACHE_IO_WORKERS, thread_name_prefix="llm-cache"
+        )
+    return _cache_executor
+
+
+def get_scoring_executor() -> ProcessPoolExecutor:
+    """Process pool for duplicate-vendor similarity scoring, created on first use."""
+    global _scoring_executor
+    if _scoring_executor is None:
+        _scoring_executor = ProcessPoolExecutor(
+            max_workers=DUPLICATE_VENDOR_SCORING_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _scoring_executor
+
+
+def start_worker_pool() -> None:
+    """Create the executor and, in process mode, spawn every worker up front."""
+    executor = get_executor()
+    if isinstance(executor, ProcessPoolExecutor):
+        pids = set(executor.map(_ping, range(DATA_EXECUTOR_WORKERS * 2)))
+        logger.info("Data worker pool ready — %d warm processes", len(pids))
+    else:
+        logger.info("Data worker pool ready — %d threads", DATA_EXECUTOR_WORKERS)
+
+
+def shutdown_worker_pool() -> None:
+    global _executor, _io_executor, _upload_executor, _session_executor, _cache_executor
+    global _scoring_executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+    if _io_executor is not None:
+        _io_executor.shutdown(wait=True, cancel_futures=True)
+        _io_executor = None
+    if _upload_executor is not None:
+        # Upload threads wait on this loop for body chunks; waiting here would deadlock
+        _upload_executor.shutdown(wait=False, cancel_futures=True)
+        _upload_executor = None
+    if _session_executor is not None:
+        _session_executor.shutdown(wait=True, cancel_futures=True)
+        _session_executor = None
+    if _cache_executor is not None:
+        _cache_executor.shutdown(wait=True, cancel_futures=True)
+        _cache_executor = None
+    if _scoring_executor is not None:
+        _scoring_executor.shutdown(wait=True, cancel_futures=True)
+        _scoring_executor = None
+
+
+# ---------------------------------------------------------------------------
+# Async entry points
+# ---------------------------------------------------------------------------
+
+
+async def run_in_worker(fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+    """Run a CPU-bound data function on the configured pool.
+
+    `fn` must be a module-level function so it can be sent to a process worker.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    if not isinstance(executor, ProcessPoolExecutor):
+        return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+    # Shared-memory files are removed here whatever happens: the worker unlinks
+    # inputs it opens, but not if the call is cancelled or the pool breaks first
+    io_executor = _get_io_executor()
+    inputs: list[SharedFrame] = []
+    try:
+        # Arrow conversion of the inputs is itself heavy — keep it off the loop too
+        pack = io_executor.submit(_pack, (args, kwargs), inputs)
+        try:
+            packed_args, packed_kwargs = await asyncio.wrap_future(pack)
+        except asyncio.CancelledError:
+            pack.add_done_callback(lambda _: _discard(inputs))
+            raise
+        call = executor.submit(_call_packed, fn, packed_args, packed_kwargs)
+        try:
+            packed = await asyncio.wrap_future(call)
+        except asyncio.CancelledError:
+            # A call already running still writes its outputs; remove them when it ends
+            call.add_done_callback(_discard_result)
+            raise
+        try:
+            return await loop.run_in_executor(io_executor, _unpack, packed)
+        finally:
+            _discard(packed)
+    finally:
+        _discard(inputs)
+
+
+async def run_blocking(fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+    """Run other blocking work (e.g. file reads) on a thread."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_io_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def run_upload(fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+    """Run upload body reading and parsing on the upload threads.
+
+    A body read blocks its thread for as long as the client takes to send
+    it, so uploads get their own pool and cannot hold up other blocking work.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_upload_executor(), functools.partial(fn, *args, **kwargs)
+    )
+
+
+async def run_session_io(fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+    """Run a session store read or write on the session threads.
+
+    Every request reads or writes its session, so the store gets a pool of
+    its own that uploads and data hand-offs cannot exhaust.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_session_executor(), functools.partial(fn, *args, **kwargs)
+    )
+
+
+async def run_cache_io(fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+    """Run a response cache disk read or write on the cache threads."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_cache_executor(), functools.partial(fn, *args, **kwargs))
@@ -11,6 +11,8 @@ from app.main import app
 import app.agents.base as agents_base
 import app.config as config_mod
 from app.services import session_store
+from app.services.llm_cache import llm_cache
+from app.services.summary_cache import summary_cache
 
 
 @pytest.fixture
@@ -25,10 +27,9 @@ async def client():
 def _clean_sessions():
     """Reset session store, OpenAI client, and config between tests."""
     yield
-    session_store._sessions.clear()
-    session_store._session_order.clear()
-    session_store._votes.clear()
-    session_store._voted_recommendations.clear()
+    session_store.reset_store()
+    summary_cache.clear()
+    llm_cache.clear()
     # Reset OpenAI client singleton and reload config from .env
     # (Azure tests use importlib.reload with patched env, polluting module state)
     agents_base._openai_client = None
@@ -5,12 +5,15 @@ because they verify the exact shape and sequence of SSE events.
 """
 
 import json
+import threading
+import time
+from unittest.mock import patch
 
 import pytest
 from httpx import AsyncClient
 
 from app.models.schemas import AgentResult
-from app.services.session_store import get_session
+from app.services.session_store import get_session, update_session
 
 AGENT_TYPES = ("conservative", "aggressive", "balanced")
 
@@ -64,6 +67,27 @@ class TestSSEStream:
             assert "recommendations" in result
             assert "total_savings" in result
 
+    @pytest.mark.asyncio
+    async def test_agent_results_written_off_the_event_loop(
+        self, client: AsyncClient, demo_session: str
+    ):
+        """Result writes run in the thread pool, at most one per graph step."""
+        loop_thread = threading.get_ident()
+        write_threads = []
+
+        def recording_update(session_id, changes):
+            write_threads.append(threading.get_ident())
+            update_session(session_id, changes)
+
+        with patch("app.routers.analyze.update_session", recording_update):
+            async with client.stream("GET", f"/api/analyze/{demo_session}") as resp:
+                async for _ in resp.aiter_lines():
+                    pass
+
+        assert 1 <= len(write_threads) <= len(AGENT_TYPES)
+        assert loop_thread not in write_threads
+        assert set(get_session(demo_session)["agent_results"]) == set(AGENT_TYPES)
+
     @pytest.mark.asyncio
     async def test_every_sse_line_is_valid_format(self, client: AsyncClient, demo_session: str):
         """Every SSE line must be valid `data: {json}` format."""
@@ -141,3 +165,66 @@ class TestSSEStream:
 
         done_events = [e for e in events if e.get("type") == "done"]
         assert len(done_events) == 1
+
+
+async def _collect_events(client: AsyncClient, session_id: str) -> list[dict]:
+    events = []
+    async with client.stream("GET", f"/api/analyze/{session_id}") as resp:
+        async for line in resp.aiter_lines():
+            line = line.strip()
+            if line.startswith("data: "):
+                events.append(json.loads(line[6:]))
+    return events
+
+
+class TestGraphModes:
+    """Concurrent and sequential graphs emit the same event sequence per agent."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("mode", ["concurrent", "sequential"])
+    async def test_all_steps_precede_complete(
+        self, client: AsyncClient, demo_session: str, mode: str
+    ):
+        """Each agent streams its 4 thinking steps in order, then completes."""
+        with patch("app.agents.base.ARENA_GRAPH_MODE", mode):
+            events = await _collect_events(client, demo_session)
+
+        for agent in AGENT_TYPES:
+            statuses = [e["status"] for e in events if e.get("agent") == agent]
+            assert statuses == ["thinking"] * 4 + ["complete"]
+            progress = [e["progress"] for e in events if e.get("agent") == agent]
+            assert progress == sorted(progress)
+
+    @pytest.mark.asyncio
+    async def test_pacing_adds_no_latency_after_the_call(
+        self, client: AsyncClient, demo_session: str
+    ):
+        """Once the call returns, remaining steps flush instead of waiting out the estimate."""
+        slow_estimate = dict.fromkeys(AGENT_TYPES, 30.0)
+        with (
+            patch("app.agents.base.ARENA_GRAPH_MODE", "concurrent"),
+            patch.dict("app.agents.base._expected_call_seconds", slow_estimate),
+        ):
+            started = time.monotonic()
+            events = await _collect_events(client, demo_session)
+            elapsed = time.monotonic() - started
+
+        assert elapsed < 5
+        assert len([e for e in events if e.get("status") == "thinking"]) == 12
+
+
+class TestCompiledGraphCache:
+    """The arena graph is compiled once and shared by every stream."""
+
+    @pytest.mark.asyncio
+    async def test_graph_built_once_across_requests(self, client: AsyncClient, demo_session: str):
+        """Two analyses reuse one compiled graph, and its build time shows in /api/metrics."""
+        from app.agents import base
+
+        with patch("app.agents.base.build_arena_graph", wraps=base.build_arena_graph) as build:
+            await _collect_events(client, demo_session)
+            await _collect_events(client, demo_session)
+
+        assert build.call_count == 1
+        metrics = (await client.get("/api/metrics")).json()["arena_graph"]
+        assert metrics["build_ms"]["concurrent"] >= 0
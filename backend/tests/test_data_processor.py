@@ -1,16 +1,26 @@
 """Data processor module tests — column mapping, summarization, and validation."""
 
+import io
+from unittest.mock import patch
+
+import numpy as np
 import pandas as pd
 import pytest
 
 from app.config import MAX_ROWS
 from app.services.data_processor import (
+    FileTooLargeError,
+    apply_mappings_and_aggregate,
     apply_mappings_and_summarize,
+    build_summary_cube,
     compute_column_stats,
     find_duplicate_vendors,
     parse_file,
+    parse_stream,
     suggest_column_mappings,
+    summarize_cube_range,
     summarize_dataframe,
+    summarize_date_range,
 )
 
 
@@ -32,6 +42,87 @@ class TestParseFile:
         with pytest.raises(ValueError, match="exceeds maximum"):
             parse_file(csv, "test.csv")
 
+    def test_stream_rejects_oversized_body_before_end(self):
+        """Byte limit trips mid-stream, without reading the whole body."""
+        body = io.BytesIO(b"date,vendor\n" + b"2024-01-01,Acme\n" * 100_000)
+        with (
+            patch("app.services.data_processor.UPLOAD_CHUNK_SIZE_BYTES", 4096),
+            pytest.raises(FileTooLargeError),
+        ):
+            parse_stream(body, "big.csv", max_bytes=10_000)
+        assert body.tell() < len(body.getvalue())
+
+    def test_stream_row_limit_trips_on_early_chunk(self):
+        """Row limit is enforced per parsed chunk, not after the full parse."""
+        body = io.BytesIO(b"date,vendor\n" + b"2024-01-01,Acme\n" * 50_000)
+        with (
+            patch("app.services.data_processor.MAX_ROWS", 100),
+            patch("app.services.data_processor.CSV_CHUNK_ROWS", 50),
+            patch("app.services.data_processor.UPLOAD_CHUNK_SIZE_BYTES", 4096),
+            pytest.raises(ValueError, match="exceeds maximum"),
+        ):
+            parse_stream(body, "rows.csv")
+        assert body.tell() < len(body.getvalue())
+
+    @pytest.mark.parametrize("seekable", [True, False])
+    def test_type_change_across_chunk_boundary_stays_uniform(self, seekable: bool):
+        """A column numeric in early chunks and text later comes back all strings."""
+        body = b"code,amount\n" + b"".join(f"{i},{i}\n".encode() for i in range(50)) + b"A12,7\n"
+        stream = io.BytesIO(body)
+        if not seekable:
+            stream.seekable = lambda: False  # type: ignore[method-assign]
+        with patch("app.services.data_processor.CSV_CHUNK_ROWS", 50):
+            df = parse_stream(stream, "codes.csv")
+
+        assert {type(v) for v in df["code"]} == {str}
+        assert df["code"].iloc[0] == "0" and df["code"].iloc[-1] == "A12"
+        assert pd.api.types.is_integer_dtype(df["amount"])
+
+
+class TestArrowEngine:
+    """Tests for the opt-in PyArrow parse engine."""
+
+    def test_arrow_dtypes_survive_mapping(self):
+        """Arrow-backed columns stay Arrow-backed and summaries match the C engine."""
+        from .conftest import sample_csv_bytes
+
+        mappings = {f: f for f in ("date", "vendor", "category", "amount", "department")}
+        _, expected = apply_mappings_and_summarize(
+            parse_file(sample_csv_bytes(), "t.csv"), mappings
+        )
+
+        with patch("app.services.data_processor.PARSE_ENGINE", "pyarrow"):
+            raw = parse_file(sample_csv_bytes(), "t.csv")
+        assert all(isinstance(dtype, pd.ArrowDtype) for dtype in raw.dtypes)
+        dtypes = {s.name: s.dtype for s in compute_column_stats(raw)}
+        assert dtypes == {
+            "date": "date",
+            "vendor": "string",
+            "category": "string",
+            "amount": "numeric",
+            "department": "string",
+        }
+
+        mapped, summary = apply_mappings_and_summarize(raw, mappings)
+        for col in ("date", "amount"):
+            assert isinstance(mapped[col].dtype, pd.ArrowDtype), col
+        assert isinstance(mapped["vendor"].cat.categories.dtype, pd.ArrowDtype)
+        assert summary == expected
+
+    @pytest.mark.parametrize("seekable", [True, False])
+    def test_falls_back_when_later_rows_contradict_inferred_types(self, seekable: bool):
+        """A type clash past the first block re-reads with the C engine."""
+        stream = io.BytesIO(b"amount\n" + b"1\n" * 5000 + b"n/a-ish\n")
+        if not seekable:
+            stream.seekable = lambda: False  # type: ignore[method-assign]
+        with (
+            patch("app.services.data_processor.PARSE_ENGINE", "pyarrow"),
+            patch("app.services.data_processor.UPLOAD_CHUNK_SIZE_BYTES", 1024),
+        ):
+            df = parse_stream(stream, "mixed.csv")
+        assert len(df) == 5001
+        assert isinstance(df["amount"].dtype, pd.ArrowDtype)
+
 
 class TestSuggestColumnMappings:
     """Tests for column mapping suggestions."""
@@ -75,6 +166,59 @@ class TestInferDtype:
         assert stat_map["name"].dtype == "string"
 
 
+class TestColumnProfiler:
+    """Tests for the fused column profiler."""
+
+    def _frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "when": ["2024-03-01", None, "2024-01-15", "2024-03-01", "2024-12-31"],
+                "who": ["=cmd", "Acme", None, "Acme", "Globex"],
+                "amount": [5.0, None, 1.5, 5.0, 9.0],
+            }
+        )
+
+    def test_counts_samples_and_ranges(self):
+        """Missing/distinct counts, ordered samples and min/max come from one profile."""
+        stats = {s.name: s for s in compute_column_stats(self._frame())}
+
+        assert stats["when"].missing_count == 1
+        assert stats["when"].unique_count == 3
+        assert (stats["when"].min_value, stats["when"].max_value) == ("2024-01-15", "2024-12-31")
+
+        assert stats["who"].sample_values == ["'=cmd", "Acme", "Globex"]
+        assert stats["who"].unique_count == 3
+
+        assert stats["amount"].missing_pct == 20.0
+        assert (stats["amount"].min_value, stats["amount"].max_value) == ("1.5", "9.0")
+
+    def test_large_columns_use_approximate_distinct_counts(self):
+        """Above the row threshold, string columns get a flagged HLL estimate."""
+        df = pd.DataFrame(
+            {
+                "invoice": [f"INV-{i}" for i in range(5000)],
+                "when": ["2024-01-01", "2024-01-02"] * 2500,
+            }
+        )
+        with patch("app.services.data_processor.APPROX_DISTINCT_MIN_ROWS", 1000):
+            stats = {s.name: s for s in compute_column_stats(df)}
+
+        invoice = stats["invoice"]
+        assert invoice.unique_count_approximate
+        assert invoice.unique_count_error_pct is not None
+        assert abs(invoice.unique_count - 5000) <= 5000 * 4 * invoice.unique_count_error_pct / 100
+        assert invoice.sample_values == ["INV-0", "INV-1", "INV-2", "INV-3", "INV-4"]
+
+        # Date columns stay exact — their distinct days are needed for min/max anyway
+        assert not stats["when"].unique_count_approximate
+        assert stats["when"].unique_count == 2
+
+    def test_parallel_profiling_matches_serial(self):
+        """Thread-parallel profiling returns identical stats in column order."""
+        df = self._frame()
+        assert compute_column_stats(df, workers=4) == compute_column_stats(df, workers=1)
+
+
 class TestSummarizeDataframe:
     """Tests for DataFrame summarization."""
 
@@ -103,6 +247,52 @@ class TestSummarizeDataframe:
         assert vendor_spends["Acme"] == 2500.0
         assert vendor_spends["Globex"] == 2000.0
 
+    def test_kernel_matches_groupby_reference(self):
+        """Bincount breakdowns agree with a plain pandas groupby."""
+        df = pd.DataFrame(
+            {
+                "date": pd.to_datetime(["2024-01-15", "2024-03-20", "2024-03-02", "2024-01-09"]),
+                "vendor": pd.Categorical(["Acme", "Globex", "Acme", "Initech"]),
+                "category": ["IT", "IT", "Ops", "Ops"],
+                "amount": [10.0, 20.0, 5.0, 7.5],
+                "department": ["Eng", "Eng", "Eng", "Mkt"],
+                "month": pd.array([202401, 202403, 202403, 202401], dtype="Int32"),
+            }
+        )
+        summary = summarize_dataframe(df)
+
+        expected = df.groupby("category")["amount"].agg(["sum", "count"])
+        got = {c.category: (c.total_spend, c.transaction_count) for c in summary.category_breakdown}
+        assert got == {k: (row["sum"], row["count"]) for k, row in expected.iterrows()}
+        assert [v.vendor for v in summary.top_vendors] == ["Globex", "Acme", "Initech"]
+        # Gap months (2024-02) are not reported
+        assert [(m.month, m.total_spend) for m in summary.monthly_trends] == [
+            ("2024-01", 17.5),
+            ("2024-03", 25.0),
+        ]
+
+    def test_breakdown_totals_are_rounded_to_cents(self):
+        """Per-group sums carry no float noise (0.1 + 0.2 is 0.30000000000000004)."""
+        df = pd.DataFrame(
+            {
+                "date": pd.to_datetime(["2024-01-15", "2024-01-20"]),
+                "vendor": ["Acme", "Acme"],
+                "category": ["IT", "IT"],
+                "amount": [0.1, 0.2],
+                "department": ["Eng", "Eng"],
+                "month": ["2024-01", "2024-01"],
+            }
+        )
+        summary = summarize_dataframe(df)
+
+        totals = [
+            summary.top_vendors[0].total_spend,
+            summary.category_breakdown[0].total_spend,
+            summary.department_breakdown[0].total_spend,
+            summary.monthly_trends[0].total_spend,
+        ]
+        assert totals == [0.3] * 4
+
 
 class TestDuplicateVendors:
     """Tests for duplicate vendor detection."""
@@ -119,6 +309,78 @@ class TestDuplicateVendors:
 class TestApplyMappingsAndSummarize:
     """Tests for the full mapping + summarization pipeline."""
 
+    def test_labels_are_categorical_and_month_is_integer_key(self):
+        """Labels are dictionary-encoded and months become YYYYMM integers."""
+        df = pd.DataFrame(
+            {
+                "date": ["2024-01-15", "2024-02-01", "not a date"],
+                "vendor": ["Acme", None, "Acme"],
+                "category": ["IT", "IT", "IT"],
+                "amount": [1.0, 2.0, 4.0],
+                "department": ["Eng", "Eng", "Ops"],
+            }
+        )
+        mappings = {f: f for f in ("date", "vendor", "category", "amount", "department")}
+        mapped, summary = apply_mappings_and_summarize(df, mappings)
+
+        assert isinstance(mapped["vendor"].dtype, pd.CategoricalDtype)
+        assert list(mapped["vendor"].cat.categories) == ["Acme", "Unknown"]
+        assert mapped["month"].tolist()[:2] == [202401, 202402]
+        assert pd.isna(mapped["month"].iloc[2])
+        assert [(m.month, m.total_spend) for m in summary.monthly_trends] == [
+            ("2024-01", 1.0),
+            ("2024-02", 2.0),
+        ]
+
+    def test_filtered_slice_omits_unobserved_categories(self):
+        """Categories absent from a date slice do not appear as empty groups."""
+        df = pd.DataFrame(
+            {
+                "date": ["2024-01-15", "2024-06-01"],
+                "vendor": ["Acme", "Globex"],
+                "category": ["IT", "Marketing"],
+                "amount": [1.0, 2.0],
+                "department": ["Eng", "Mkt"],
+            }
+        )
+        mappings = {f: f for f in ("date", "vendor", "category", "amount", "department")}
+        mapped, _ = apply_mappings_and_summarize(df, mappings)
+
+        summary = summarize_date_range(mapped, end=pd.Timestamp("2024-03-01"))
+        assert [v.vendor for v in summary.top_vendors] == ["Acme"]
+        assert [c.category for c in summary.category_breakdown] == ["IT"]
+
+    def test_vendor_canonical_groups_spelling_variants(self):
+        """Variants share the highest-spend spelling; canonical grouping totals them."""
+        df = pd.DataFrame(
+            {
+                "date": ["2024-01-01"] * 5,
+                "vendor": ["Staples", "Staples Pty Ltd", "STAPLES", "Acme", "Pty Ltd"],
+                "category": "Office",
+                "amount": [1.0, 5.0, 2.0, 3.0, 4.0],
+                "department": "Ops",
+            }
+        )
+        mappings = {f: f for f in ("date", "vendor", "category", "amount", "department")}
+        mapped, summary = apply_mappings_and_summarize(df, mappings)
+
+        assert mapped["vendor_canonical"].tolist() == [
+            "Staples Pty Ltd",
+            "Staples Pty Ltd",
+            "Staples Pty Ltd",
+            "Acme",
+            "Pty Ltd",
+        ]
+        # Raw grouping stays the default
+        assert len(summary.top_vendors) == 5
+        canonical = summarize_dataframe(mapped, canonical_vendors=True)
+        assert [(v.vendor, v.total_spend) for v in canonical.top_vendors] == [
+            ("Staples Pty Ltd", 8.0),
+            ("Pty Ltd", 4.0),
+            ("Acme", 3.0),
+        ]
+        assert canonical.total_spend == summary.total_spend
+
     def test_renames_correctly(self):
         """Columns should be renamed per mapping before summarization."""
         df = pd.DataFrame(
@@ -145,3 +407,87 @@ class TestApplyMappingsAndSummarize:
         assert "vendor" in result_df.columns
         assert summary.total_spend == 3000.0
         assert summary.row_count == 2
+
+
+class TestSummaryCube:
+    """Date-filtered summaries answered from the pre-aggregated cube."""
+
+    @staticmethod
+    def _mapped(rows: int = 2_000) -> pd.DataFrame:
+        rng = np.random.default_rng(3)
+        dates = pd.Timestamp("2023-11-01") + pd.to_timedelta(rng.integers(0, 200, rows), "D")
+        df = pd.DataFrame(
+            {
+                "date": dates.strftime("%Y-%m-%d"),
+                "vendor": rng.choice(["Acme", "Globex", "Initech", "Umbrella"], rows),
+                "category": rng.choice(["IT", "Travel", None], rows),
+                "amount": rng.integers(1, 5_000, rows).astype(float),
+                "department": rng.choice(["Eng", "Ops"], rows),
+            }
+        )
+        df.loc[::97, "date"] = None
+        mappings = {f: f for f in ("date", "vendor", "category", "amount", "department")}
+        mapped, _ = apply_mappings_and_summarize(df, mappings)
+        return mapped
+
+    @pytest.mark.parametrize(
+        ("start", "end"),
+        [
+            (None, None),
+            ("2024-01-01", None),
+            (None, "2024-02-15"),
+            ("2023-12-10", "2024-03-31"),
+            ("2024-02-29", "2024-02-29"),
+        ],
+    )
+    def test_matches_row_level_filter(self, start, end):
+        """Every window gives the same summary as filtering the rows."""
+        mapped = self._mapped()
+        cube = build_summary_cube(mapped)
+        start_ts = pd.Timestamp(start) if start else None
+        end_ts = pd.Timestamp(end) if end else None
+
+        expected = summarize_date_range(mapped, start_ts, end_ts)
+        actual = summarize_cube_range(cube, start_ts, end_ts)
+
+        assert cube.cell_count < len(mapped)
+        if start is None and end is None:
+            # Rows without a date can never fall inside a window, so the cube omits them
+            expected = summarize_date_range(mapped[mapped["date"].notna()], None, None)
+        assert actual.model_dump() == pytest.approx(expected.model_dump())
+
+    @pytest.mark.parametrize(
+        ("start", "end", "pairs"),
+        [(None, "2024-01-31", 0), ("2024-02-01", None, 0), ("2024-01-01", "2024-02-28", 1)],
+    )
+    def test_windows_filter_duplicates_found_at_confirm(self, start, end, pairs):
+        """Windows reuse the duplicate pairs found once for every vendor."""
+        df = pd.DataFrame(
+            {
+                "date": ["2024-01-05", "2024-01-20", "2024-02-03", "2024-02-10"],
+                "vendor": ["Globex", "Initech", "Globexx", "Initech"],
+                "category": "IT",
+                "amount": [100.0, 200.0, 300.0, 400.0],
+                "department": "Eng",
+            }
+        )
+        mappings = {f: f for f in ("date", "vendor", "category", "amount", "department")}
+        mapped, summary, cube = apply_mappings_and_aggregate(df, mappings)
+        assert summary == apply_mappings_and_summarize(df, mappings)[1]
+        assert summary.duplicate_vendors == ["Globex / Globexx (similarity: 92%)"]
+
+        start_ts = pd.Timestamp(start) if start else None
+        end_ts = pd.Timestamp(end) if end else None
+        expected = summarize_date_range(mapped, start_ts, end_ts)
+        with patch(
+            "app.services.data_processor.find_duplicate_vendors", side_effect=AssertionError
+        ):
+            actual = summarize_cube_range(cube, start_ts, end_ts)
+        assert actual == expected
+        assert len(actual.duplicate_vendors) == pairs
+
+    def test_empty_window_raises(self):
+        """A window with no cells is reported like the row-level filter."""
+        cube = build_summary_cube(self._mapped())
+        with pytest.raises(ValueError, match="No data in selected date range"):
+            summarize_cube_range(cube, pd.Timestamp("2030-01-01"), None)
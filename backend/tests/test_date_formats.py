@@ -0,0 +1,78 @@
+"""Date format inference tests — format choice, fallback accounting, reuse in mapping."""
+
+from unittest.mock import patch
+
+import pandas as pd
+
+from app.services.data_processor import apply_mappings_and_summarize, compute_column_stats
+from app.services.date_formats import infer_date_format, parse_dates
+
+
+class TestInferDateFormat:
+    """Choosing one explicit format per column."""
+
+    def test_iso_dates(self):
+        """ISO dates infer the ISO format."""
+        assert infer_date_format(pd.Series(["2024-01-15", "2024-02-20"])) == "%Y-%m-%d"
+
+    def test_day_first_wins_when_days_exceed_twelve(self):
+        """Ambiguous slashes resolve to the format that reads the most values."""
+        sample = pd.Series(["03/04/2024", "25/12/2024", "13/01/2024"])
+        assert infer_date_format(sample) == "%d/%m/%Y"
+
+    def test_non_dates_infer_nothing(self):
+        """Free text yields no format."""
+        assert infer_date_format(pd.Series(["Acme", "Globex", "Initech"])) is None
+
+    def test_text_without_date_digits_skips_candidate_parses(self):
+        """Columns that no candidate could read are rejected before parsing."""
+        sample = pd.Series(["3M Australia", "Acme", "Globex 2", "Initech"])
+        with patch("app.services.date_formats.pd.to_datetime") as to_datetime:
+            assert infer_date_format(sample) is None
+        to_datetime.assert_not_called()
+
+    def test_two_digit_years_pass_the_digit_check(self):
+        """The shortest candidate dates still reach every candidate format."""
+        assert infer_date_format(pd.Series(["1/2/24", "25/12/24"])) == "%d/%m/%y"
+
+
+class TestParseDates:
+    """Fixed-format parsing with a measured fallback."""
+
+    def test_counts_values_needing_fallback(self):
+        """Off-format values are still parsed, and counted as fallbacks."""
+        series = pd.Series(["2024-01-15", "2024-02-20", "March 3, 2024", None])
+        parsed, fallback = parse_dates(series, "%Y-%m-%d")
+        assert fallback == 1
+        assert parsed.iloc[2] == pd.Timestamp("2024-03-03")
+        assert pd.isna(parsed.iloc[3])
+
+    def test_profile_reports_format_and_fallback_rate(self):
+        """Column stats carry the inferred format and fallback percentage."""
+        df = pd.DataFrame({"when": ["15/01/2024", "20/02/2024", "03/13/2024", "25/12/2024"]})
+        (stats,) = compute_column_stats(df)
+        assert stats.dtype == "date"
+        assert stats.date_format == "%d/%m/%Y"
+        assert stats.date_fallback_pct == 25.0
+
+    def test_mapping_uses_stored_format(self):
+        """A stored day-first format is honoured when mapping ambiguous dates."""
+        df = pd.DataFrame(
+            {
+                "when": ["01/02/2024", "03/02/2024"],
+                "vendor": ["Acme", "Globex"],
+                "category": ["IT", "IT"],
+                "amount": [1.0, 2.0],
+                "department": ["Eng", "Eng"],
+            }
+        )
+        mappings = {
+            "date": "when",
+            "vendor": "vendor",
+            "category": "category",
+            "amount": "amount",
+            "department": "department",
+        }
+        mapped, summary = apply_mappings_and_summarize(df, mappings, {"when": "%d/%m/%Y"})
+        assert mapped["date"].tolist() == [pd.Timestamp("2024-02-01"), pd.Timestamp("2024-02-03")]
+        assert summary.date_range == "2024-02-01 to 2024-02-03"
@@ -0,0 +1,41 @@
+"""HyperLogLog sketch tests — accuracy bounds and edge cases."""
+
+import pandas as pd
+import pytest
+
+from app.services.hyperloglog import HyperLogLog, approximate_distinct
+
+
+class TestHyperLogLog:
+    """Distinct-count estimation."""
+
+    def test_empty_sketch_counts_zero(self):
+        """No values means a zero estimate."""
+        assert HyperLogLog().count() == 0
+
+    def test_small_cardinality_is_near_exact(self):
+        """Linear counting keeps small cardinalities essentially exact."""
+        values = pd.Series(["Acme", "Globex", "Initech"] * 1000)
+        count, _ = approximate_distinct(values)
+        assert count == 3
+
+    def test_large_cardinality_within_error_bound(self):
+        """Estimate stays within 4 standard errors on a high-cardinality column."""
+        values = pd.Series([f"INV-{i:07d}" for i in range(200_000)])
+        count, relative_error = approximate_distinct(values)
+        assert relative_error == pytest.approx(0.0081, abs=1e-4)
+        assert abs(count - 200_000) / 200_000 < 4 * relative_error
+
+    def test_duplicates_do_not_inflate_count(self):
+        """Adding the same values again leaves the estimate unchanged."""
+        values = pd.Series(range(50_000))
+        sketch = HyperLogLog()
+        sketch.add(values)
+        first = sketch.count()
+        sketch.add(values)
+        assert sketch.count() == first
+
+    def test_rejects_out_of_range_precision(self):
+        """Precision outside 4–18 is a configuration error."""
+        with pytest.raises(ValueError):
+            HyperLogLog(precision=2)
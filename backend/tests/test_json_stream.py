@@ -0,0 +1,108 @@
+"""Incremental JSON parsing and streamed recommendation events."""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+from app.agents.json_stream import ArrayItemParser
+
+RESPONSE = json.dumps(
+    {
+        "summary": 'Tricky text: [ ] { } \\" "recommendations"',
+        "recommendations": [
+            {
+                "id": "r1",
+                "title": "Consolidate {vendors}",
+                "description": 'Merge "A" and B',
+                "estimated_savings": 1000,
+                "confidence": 0.8,
+                "risk_level": "medium-high",
+                "pros": ["fewer invoices]"],
+                "cons": [],
+            },
+            {
+                "id": "r2",
+                "title": "Renegotiate",
+                "description": "Annual terms",
+                "estimated_savings": 500,
+                "confidence": 0.6,
+                "risk_level": "low",
+                "pros": [],
+                "cons": ["effort"],
+            },
+        ],
+        "total_savings": 1500,
+    }
+)
+
+
+def _feed_in_pieces(parser: ArrayItemParser, text: str, size: int) -> list[list[dict]]:
+    return [parser.feed(text[i : i + size]) for i in range(0, len(text), size)]
+
+
+class TestArrayItemParser:
+    """Items come out as soon as they close, however the text is split."""
+
+    @pytest.mark.parametrize("size", [1, 3, 7, 1000])
+    def test_yields_each_item_once(self, size: int):
+        """Every recommendation is returned whole, in order, whatever the chunk size."""
+        batches = _feed_in_pieces(ArrayItemParser("recommendations"), RESPONSE, size)
+        items = [item for batch in batches for item in batch]
+        assert items == json.loads(RESPONSE)["recommendations"]
+
+    def test_item_available_before_document_ends(self):
+        """The first item is returned by the chunk that closes it, not at the end."""
+        cut = RESPONSE.index('{"id": "r2"')
+        parser = ArrayItemParser("recommendations")
+        assert [item["id"] for item in parser.feed(RESPONSE[:cut])] == ["r1"]
+        assert [item["id"] for item in parser.feed(RESPONSE[cut:])] == ["r2"]
+
+    def test_ignores_other_arrays(self):
+        """Objects in arrays under other keys are not reported."""
+        parser = ArrayItemParser("recommendations")
+        assert parser.feed('{"other": [{"id": "x"}], "recommendations": []}') == []
+
+
+def _chunk(text: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+async def _stream(text: str):
+    for i in range(0, len(text), 16):
+        yield _chunk(text[i : i + 16])
+
+
+class TestStreamedAnalysis:
+    """OPENAI_STREAM emits a recommendation event per parsed recommendation."""
+
+    @pytest.mark.asyncio
+    async def test_recommendation_events_precede_complete(
+        self, client: AsyncClient, demo_session: str
+    ):
+        """Each agent streams its recommendations, then the full validated result."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=lambda **_: _stream(RESPONSE))
+
+        with (
+            patch("app.agents.base.MOCK_AGENTS", False),
+            patch("app.agents.base.OPENAI_API_KEY", "sk-test"),
+            patch("app.agents.base.OPENAI_STREAM", True),
+            patch("app.agents.base._get_openai_client", return_value=mock_client),
+        ):
+            events = []
+            async with client.stream("GET", f"/api/analyze/{demo_session}") as resp:
+                async for line in resp.aiter_lines():
+                    if line.startswith("data: "):
+                        events.append(json.loads(line[6:]))
+
+        assert mock_client.chat.completions.create.call_args.kwargs["stream"] is True
+        for agent in ("conservative", "aggressive", "balanced"):
+            agent_events = [e for e in events if e.get("agent") == agent]
+            streamed = [e for e in agent_events if e["status"] == "recommendation"]
+            assert [e["recommendation"]["id"] for e in streamed] == ["r1", "r2"]
+            assert streamed[0]["recommendation"]["risk_level"] == "high"
+            assert agent_events[-1]["status"] == "complete"
+            assert agent_events[-1]["result"]["total_savings"] == 1500
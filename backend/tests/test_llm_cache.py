@@ -0,0 +1,123 @@
+"""LLM response cache tests."""
+
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.models.schemas import DataSummary
+from app.services.llm_cache import LLMCache, llm_cache_key
+
+RESPONSE = '{"recommendations":[],"total_savings":0,"summary":"cached"}'
+
+
+def _summary() -> DataSummary:
+    return DataSummary(
+        total_spend=100000,
+        row_count=100,
+        unique_vendor_count=10,
+        date_range="2024-01-01 to 2024-12-31",
+        top_vendors=[],
+        category_breakdown=[],
+        department_breakdown=[],
+        monthly_trends=[],
+        duplicate_vendors=[],
+    )
+
+
+class TestLLMCache:
+    """Keys, memory LRU and the disk tier."""
+
+    def test_key_covers_every_request_input(self):
+        """Changing any input gives a different key."""
+        base = ("balanced", "prompt", "data", "gpt-4o-mini", 0.7)
+        keys = {llm_cache_key(*base)}
+        for i, changed in enumerate(("aggressive", "prompt2", "data2", "gpt-4o", 0.2)):
+            args = list(base)
+            args[i] = changed
+            keys.add(llm_cache_key(*args))
+        assert len(keys) == 6
+
+    def test_evicts_least_recently_used_within_budget(self):
+        """Once over budget the coldest entry goes, not the one just read."""
+        cache = LLMCache(max_bytes=len(RESPONSE) * 2)
+        cache.put("a", RESPONSE)
+        cache.put("b", RESPONSE)
+        cache.get("a")
+        cache.put("c", RESPONSE)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == RESPONSE
+        assert cache.stats()["evictions"] == 1
+
+    def test_disk_tier_survives_a_new_process(self, tmp_path):
+        """A fresh cache over the same directory serves earlier responses and promotes them."""
+        LLMCache(max_bytes=1_000_000, directory=str(tmp_path)).put("k1", RESPONSE)
+
+        cache = LLMCache(max_bytes=1_000_000, directory=str(tmp_path))
+        assert cache.get("k1") == RESPONSE
+        assert cache.get("k1") == RESPONSE
+        stats = cache.stats()
+        assert (stats["disk_hits"], stats["hits"], stats["misses"]) == (1, 1, 0)
+
+    def test_disk_tier_prunes_least_recently_used_files(self, tmp_path):
+        """Past the disk cap the oldest files go; a disk hit counts as a use."""
+        size = len(RESPONSE.encode())
+        LLMCache(max_bytes=1_000_000, directory=str(tmp_path)).put("k0", RESPONSE)
+        cache = LLMCache(max_bytes=1, directory=str(tmp_path), disk_max_bytes=size * 3)
+        for n, key in enumerate(("k0", "k1", "k2")):
+            if key != "k0":
+                cache.put(key, RESPONSE)
+            os.utime(cache._path(key), (1_000 + n, 1_000 + n))
+        assert cache.get("k0") == RESPONSE  # touched: now the most recent
+
+        cache.put("k3", RESPONSE)
+        remaining = {p.stem for p in tmp_path.rglob("*.json")}
+        assert remaining == {"k0", "k3"}  # pruned to 90% of the cap
+        stats = cache.stats()
+        assert (stats["disk_evictions"], stats["disk_bytes"]) == (2, size * 2)
+
+    @pytest.mark.asyncio
+    async def test_only_the_disk_tier_leaves_the_event_loop(self, tmp_path):
+        """Memory hits are answered inline; disk reads and writes go to the cache threads."""
+        cache = LLMCache(max_bytes=1_000_000, directory=str(tmp_path))
+        with patch(
+            "app.services.llm_cache.run_cache_io", AsyncMock(side_effect=lambda fn, *a: fn(*a))
+        ) as cache_io:
+            await cache.put_async("k1", RESPONSE)
+            assert await cache.get_async("k1") == RESPONSE
+            assert cache_io.await_count == 1  # the file write only
+
+            fresh = LLMCache(max_bytes=1_000_000, directory=str(tmp_path))
+            assert await fresh.get_async("k1") == RESPONSE
+            assert await fresh.get_async("k1") == RESPONSE
+            assert cache_io.await_count == 2  # one disk read, then served from memory
+        assert (fresh.stats()["disk_hits"], fresh.stats()["hits"]) == (1, 1)
+
+
+class TestCachedAgentCalls:
+    """_call_openai replays cached responses unless told not to."""
+
+    @pytest.mark.asyncio
+    async def test_identical_analysis_costs_no_second_call(self):
+        """The second identical request is served from cache; bypass calls the model again."""
+        import app.agents.base as base_mod
+
+        mock_msg = MagicMock()
+        mock_msg.content = RESPONSE
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock(message=mock_msg)]
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+
+        with patch.object(base_mod, "_get_openai_client", return_value=mock_client):
+            first = await base_mod._call_openai("balanced", _summary())
+            second = await base_mod._call_openai("balanced", _summary())
+            assert mock_client.chat.completions.create.await_count == 1
+            assert second == first
+
+            await base_mod._call_openai("balanced", _summary(), use_cache=False)
+            assert mock_client.chat.completions.create.await_count == 2
+
+            await base_mod._call_openai("balanced", _summary(), preferences="prefers low risk")
+            assert mock_client.chat.completions.create.await_count == 3
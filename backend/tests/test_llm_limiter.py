@@ -0,0 +1,182 @@
+"""Process-wide LLM rate limiter tests."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+from app.services.llm_limiter import LLMLimiter
+
+
+def _drained(requests_per_minute: int = 6000) -> LLMLimiter:
+    """A limiter with an empty request bucket that refills one request per 10 ms."""
+    limiter = LLMLimiter(requests_per_minute, 0)
+    limiter.buckets["requests"].level = 0
+    return limiter
+
+
+class TestLLMLimiter:
+    """Token buckets, round-robin fairness and queue positions."""
+
+    @pytest.mark.asyncio
+    async def test_grants_immediately_under_the_limit(self):
+        """With capacity left, acquire returns without queuing."""
+        limiter = LLMLimiter(60, 10_000)
+        await limiter.acquire("s1", 500)
+        stats = limiter.stats()
+        assert (stats["granted"], stats["queued"]) == (1, 0)
+        assert stats["buckets"]["tokens"]["level"] == pytest.approx(9500, abs=1)
+
+    @pytest.mark.asyncio
+    async def test_sessions_take_turns(self):
+        """A session with a backlog cannot starve one that arrives later."""
+        limiter = _drained()
+        order: list[str] = []
+
+        async def call(session_id: str, name: str) -> None:
+            await limiter.acquire(session_id, 100)
+            order.append(name)
+
+        tasks = [asyncio.create_task(call("a", f"a{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("b", "b0")))
+        await asyncio.gather(*tasks)
+
+        assert order == ["a0", "b0", "a1", "a2"]
+
+    @pytest.mark.asyncio
+    async def test_reports_queue_positions_then_zero(self):
+        """Waiters hear their place in the interleaved order and 0 when let through."""
+        limiter = _drained()
+        positions: dict[str, list[int]] = {"a0": [], "a1": [], "b0": []}
+
+        def acquire(session_id: str, name: str):
+            return limiter.acquire(session_id, 100, positions[name].append)
+
+        await asyncio.gather(acquire("a", "a0"), acquire("a", "a1"), acquire("b", "b0"))
+
+        assert positions["a0"] == [1, 0]
+        assert positions["b0"] == [2, 1, 0]
+        assert positions["a1"][0] == 2 and positions["a1"][-2:] == [1, 0]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        """A client that disconnects while queued frees its place."""
+        limiter = _drained(requests_per_minute=60)
+        task = asyncio.create_task(limiter.acquire("s1", 100))
+        await asyncio.sleep(0)
+        assert limiter.stats()["waiting"] == 1
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert limiter.stats()["waiting"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_is_not_granted(self):
+        """Capacity freed before a cancelled task leaves the queue goes to the next waiter."""
+        limiter = _drained(requests_per_minute=60)
+        cancelled = asyncio.create_task(limiter.acquire("a", 100))
+        waiting = asyncio.create_task(limiter.acquire("b", 100))
+        await asyncio.sleep(0)
+
+        cancelled.cancel()  # its future is done now; the task has not run yet
+        limiter.buckets["requests"].level = 1
+        limiter._dispatch()
+        await waiting
+        assert limiter.stats()["granted"] == 1
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+
+    @pytest.mark.asyncio
+    async def test_settle_returns_unused_estimate(self):
+        """Real usage replaces the estimate in the token bucket, and frees waiters."""
+        limiter = LLMLimiter(0, 6000)
+        await limiter.acquire("s1", 5000)
+        waiting = asyncio.create_task(limiter.acquire("s2", 5000))
+        await asyncio.sleep(0)
+        assert limiter.stats()["waiting"] == 1
+
+        limiter.settle(5000, 800)
+        await waiting
+        stats = limiter.stats()
+        assert stats["settled_tokens"] == 4200
+        assert stats["buckets"]["tokens"]["level"] == pytest.approx(200, abs=5)
+
+        limiter.settle(100, 400)
+        assert limiter.stats()["buckets"]["tokens"]["level"] == pytest.approx(-100, abs=5)
+
+
+class TestQueuedEvents:
+    """Agents waiting for capacity tell the client where they stand."""
+
+    @pytest.mark.asyncio
+    async def test_sse_reports_queue_position(self, client: AsyncClient, demo_session: str):
+        """Queued agents stream their position, then 0 once the call is sent."""
+        mock_msg = MagicMock()
+        mock_msg.content = '{"recommendations":[],"total_savings":0,"summary":"ok"}'
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock(message=mock_msg)]
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        # Refills one request every 20 s, so nothing is granted until released below
+        limiter = _drained(requests_per_minute=3)
+
+        async def release_when_all_queued() -> None:
+            while limiter.stats()["waiting"] < 3:
+                await asyncio.sleep(0.01)
+            limiter.buckets["requests"].level = 3
+            limiter._dispatch()
+
+        with (
+            patch("app.agents.base.MOCK_AGENTS", False),
+            patch("app.agents.base.OPENAI_API_KEY", "sk-test"),
+            patch("app.agents.base._get_openai_client", return_value=mock_client),
+            patch("app.agents.base.llm_limiter", limiter),
+        ):
+            releaser = asyncio.create_task(asyncio.wait_for(release_when_all_queued(), 10))
+            events = []
+            async with client.stream("GET", f"/api/analyze/{demo_session}") as resp:
+                async for line in resp.aiter_lines():
+                    if line.startswith("data: "):
+                        events.append(json.loads(line[6:]))
+            await releaser
+
+        queued = [e for e in events if e.get("status") == "queued"]
+        assert {e["agent"] for e in queued} == {"conservative", "aggressive", "balanced"}
+        assert sorted(e["position"] for e in queued if e["position"] > 0)[0] == 1
+        for agent in ("conservative", "aggressive", "balanced"):
+            agent_queued = [e["position"] for e in queued if e["agent"] == agent]
+            assert agent_queued[-1] == 0
+        assert len([e for e in events if e.get("status") == "complete"]) == 3
+
+    @pytest.mark.asyncio
+    async def test_reported_usage_settles_the_estimate(
+        self, client: AsyncClient, demo_session: str
+    ):
+        """Each call hands the limiter the token count the provider reports."""
+        mock_msg = MagicMock()
+        mock_msg.content = '{"recommendations":[],"total_savings":0,"summary":"ok"}'
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock(message=mock_msg)]
+        mock_response.usage = SimpleNamespace(total_tokens=700)
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        limiter = LLMLimiter(0, 1_000_000)
+
+        with (
+            patch("app.agents.base.MOCK_AGENTS", False),
+            patch("app.agents.base.OPENAI_API_KEY", "sk-test"),
+            patch("app.agents.base._get_openai_client", return_value=mock_client),
+            patch("app.agents.base.llm_limiter", limiter),
+            patch.object(limiter, "settle", wraps=limiter.settle) as settle,
+        ):
+            async with client.stream("GET", f"/api/analyze/{demo_session}") as resp:
+                async for _ in resp.aiter_lines():
+                    pass
+
+        assert settle.call_count == 3
+        assert {call.args[1] for call in settle.call_args_list} == {700}
@@ -1,8 +1,12 @@
 """Report generation endpoint tests."""
 
+from unittest.mock import patch
+
 import pytest
 from httpx import AsyncClient
 
+from .conftest import sample_csv_bytes
+
 
 class TestReportEndpoint:
     """GET /api/report tests."""
@@ -59,3 +63,82 @@ class TestReportEndpoint:
         resp = await client.get(f"/api/report/{demo_with_analysis}")
         assert resp.status_code == 200
         assert resp.content[:4] == b"%PDF"
+
+
+class TestCsvExport:
+    """GET /api/export tests."""
+
+    @pytest.mark.asyncio
+    async def test_exports_only_mapped_columns(self, client: AsyncClient):
+        """The CSV holds the mapped fields only, with formula-like labels defused."""
+        content = (
+            b"date,vendor,category,amount,department,notes\n"
+            b"2024-01-15,Acme Corp,IT,1500.00,Engineering,first\n"
+            b'2024-02-20,"=HYPERLINK(1)",Marketing,2300.50,Marketing,second\n'
+        )
+        upload = await client.post(
+            "/api/upload", files={"file": ("spend.csv", content, "text/csv")}
+        )
+        session_id = upload.json()["session_id"]
+        fields = ("date", "vendor", "category", "amount", "department")
+        await client.post(
+            "/api/confirm-mappings",
+            json={"session_id": session_id, "mappings": {f: f for f in fields}},
+        )
+
+        resp = await client.get(f"/api/export/{session_id}")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/csv")
+        assert 'filename="spend_mapped.csv"' in resp.headers["content-disposition"]
+
+        lines = resp.text.splitlines()
+        assert lines[0] == ",".join(fields)
+        assert len(lines) == 3
+        assert "'=HYPERLINK(1)" in lines[2]
+        assert "second" not in resp.text
+
+    @pytest.mark.asyncio
+    async def test_skips_mappings_whose_source_column_is_missing(self, client: AsyncClient):
+        """A mapping to a column the file lacks is left out instead of failing the stream."""
+        upload = await client.post(
+            "/api/upload", files={"file": ("spend.csv", sample_csv_bytes(), "text/csv")}
+        )
+        session_id = upload.json()["session_id"]
+        mappings = {f: f for f in ("date", "vendor", "category", "amount", "department")}
+        confirm = await client.post(
+            "/api/confirm-mappings",
+            json={"session_id": session_id, "mappings": {**mappings, "notes": "no_such_column"}},
+        )
+        assert confirm.status_code == 200
+
+        resp = await client.get(f"/api/export/{session_id}")
+        assert resp.status_code == 200
+        lines = resp.text.splitlines()
+        assert lines[0] == ",".join(mappings)
+        assert len(lines) == 11
+
+    @pytest.mark.asyncio
+    async def test_arrow_backed_dates_export_without_time(self, client: AsyncClient):
+        """Dates parsed by the pyarrow engine are timestamps, but export as plain dates."""
+        with patch("app.services.data_processor.PARSE_ENGINE", "pyarrow"):
+            upload = await client.post(
+                "/api/upload", files={"file": ("spend.csv", sample_csv_bytes(), "text/csv")}
+            )
+        session_id = upload.json()["session_id"]
+        fields = ("date", "vendor", "category", "amount", "department")
+        await client.post(
+            "/api/confirm-mappings",
+            json={"session_id": session_id, "mappings": {f: f for f in fields}},
+        )
+
+        resp = await client.get(f"/api/export/{session_id}")
+        assert resp.status_code == 200
+        dates = [line.split(",")[0] for line in resp.text.splitlines()[1:]]
+        assert dates[0] == "2024-01-15"
+        assert all(len(d) == 10 for d in dates)
+
+    @pytest.mark.asyncio
+    async def test_400_before_mappings_confirmed(self, client: AsyncClient, demo_session: str):
+        """Sessions without mapped data have nothing to export."""
+        resp = await client.get(f"/api/export/{demo_session}")
+        assert resp.status_code == 400
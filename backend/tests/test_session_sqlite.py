@@ -0,0 +1,156 @@
+"""SQLite session backend tests — durability, cross-worker visibility and votes."""
+
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from app.services.data_processor import apply_mappings_and_summarize
+from app.services.session_sqlite import SqliteSessionBackend
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    return str(tmp_path / "sessions.db")
+
+
+def _mapped_session() -> dict:
+    df = pd.DataFrame(
+        {
+            "date": ["2024-01-15", "2024-02-20"],
+            "vendor": ["Acme", "Globex"],
+            "category": ["IT", "Marketing"],
+            "amount": [1500.0, 2300.5],
+            "department": ["Eng", "Mkt"],
+        }
+    )
+    mappings = {f: f for f in ("date", "vendor", "category", "amount", "department")}
+    mapped, summary = apply_mappings_and_summarize(df, mappings)
+    return {
+        "filename": "spend.csv",
+        "created_at": "2024-03-01",
+        "mapped_df": mapped,
+        "summary": summary,
+    }
+
+
+class TestSqliteSessionBackend:
+    """One backend per simulated worker, all sharing a file."""
+
+    def test_frames_and_models_survive_restart(self, db_path):
+        """A new process (backend instance) reads back frames and summaries."""
+        data = _mapped_session()
+        SqliteSessionBackend(db_path).save("s1", data)
+
+        restarted = SqliteSessionBackend(db_path)
+        session = restarted.get("s1")
+        assert session is not None
+        assert session["summary"] == data["summary"]
+        assert "mapped_df" not in session  # frames are fetched on demand
+        restored = restarted.get_frame("s1", "mapped_df")
+        assert isinstance(restored["vendor"].dtype, pd.CategoricalDtype)
+        pd.testing.assert_frame_equal(restored, data["mapped_df"])
+
+    def test_frame_arrow_cannot_encode_is_pickled(self, db_path):
+        """A mixed-type object column is stored pickled instead of failing the write."""
+        mixed = pd.DataFrame({"code": pd.Series([1, "A12"], dtype=object)})
+        SqliteSessionBackend(db_path).save("s1", {"filename": "m.csv", "raw_df": mixed})
+
+        restarted = SqliteSessionBackend(db_path)
+        assert "raw_df" not in restarted.get("s1")
+        assert list(restarted.get_frame("s1", "raw_df")["code"]) == [1, "A12"]
+
+    def test_updates_are_visible_to_other_workers(self, db_path):
+        """Writes by one worker invalidate the other worker's cached fields."""
+        worker_a, worker_b = SqliteSessionBackend(db_path), SqliteSessionBackend(db_path)
+        worker_a.save("s1", {"filename": "a.csv", "created_at": "", "column_mappings": {"x": "y"}})
+        assert worker_b.get("s1")["column_mappings"] == {"x": "y"}
+
+        worker_a.update("s1", {"column_mappings": {"x": "z"}, "agent_results": {"a": {}}})
+        worker_a.update("s1", {"agent_results": None})
+        session = worker_b.get("s1")
+        assert session["column_mappings"] == {"x": "z"}
+        assert "agent_results" not in session
+
+        assert worker_b.delete("s1") is True
+        assert worker_a.get("s1") is None
+
+    def test_votes_are_shared_and_deduplicated(self, db_path):
+        """Tallies accumulate across workers; a recommendation is recorded once."""
+        worker_a, worker_b = SqliteSessionBackend(db_path), SqliteSessionBackend(db_path)
+        worker_a.save("s1", {"filename": "a.csv", "created_at": ""})
+        rec = {"recommendation_id": "r1", "title": "Consolidate", "description": "Fewer vendors"}
+
+        _, first = worker_a.add_vote("s1", "balanced", rec)
+        tallies, second = worker_b.add_vote("s1", "balanced", rec)
+
+        assert (first, second) == (True, False)
+        assert tallies == {"conservative": 0, "aggressive": 0, "balanced": 2}
+        assert worker_a.voted_recommendations("s1") == [rec]
+
+    def test_listing_reads_denormalized_columns(self, db_path):
+        """List metadata comes from the sessions row, most recent first."""
+        backend = SqliteSessionBackend(db_path)
+        backend.save("old", {"filename": "old.csv", "created_at": "1"})
+        backend.save("new", _mapped_session())
+        backend.update("new", {"agent_results": {"balanced": {}}})
+        backend.add_vote(
+            "new", "balanced", {"recommendation_id": "r", "title": "t", "description": "d"}
+        )
+
+        listing, _ = backend.list_sessions(limit=10)
+        assert [s["session_id"] for s in listing] == ["new", "old"]
+        assert listing[0]["row_count"] == 2
+        assert listing[0]["total_spend"] == pytest.approx(3800.5)
+        assert (listing[0]["vote_count"], listing[0]["has_report"]) == (1, True)
+        assert (listing[1]["vote_count"], listing[1]["has_report"]) == (0, False)
+
+    def test_evicts_oldest_beyond_max_sessions(self, db_path):
+        """The session cap applies to the shared store as a whole."""
+        backend = SqliteSessionBackend(db_path)
+        with patch("app.services.session_sqlite.MAX_SESSIONS", 2):
+            for sid in ("old", "mid", "new"):
+                backend.save(sid, {"filename": f"{sid}.csv", "created_at": ""})
+        assert backend.get("old") is None
+        assert backend.get("mid") is not None
+
+    def test_decoded_cache_stays_within_budget(self, db_path):
+        """Least recently read sessions drop out of the worker cache, not the store."""
+        backend = SqliteSessionBackend(db_path)
+        with patch("app.services.session_sqlite.SESSION_MAX_BYTES", 500):
+            backend.save("a", {"filename": "a.csv", "created_at": "", "csv_text": "a" * 300})
+            backend.save("b", {"filename": "b.csv", "created_at": "", "csv_text": "b" * 300})
+            assert backend.stats()["bytes"] == 305  # "b.csv" and its text
+
+            assert backend.get("a")["csv_text"] == "a" * 300
+            assert backend.stats()["bytes"] == 305
+
+    def test_expires_by_idle_and_absolute_ttl(self, db_path):
+        """Expiry uses stored wall-clock times, so every worker sees the same sessions."""
+        backend = SqliteSessionBackend(db_path)
+        with patch("app.services.session_sqlite.time.time", return_value=1000.0):
+            backend.save("old", {"filename": "old.csv", "created_at": "", "csv_text": "x" * 50})
+            backend.add_vote(
+                "old", "balanced", {"recommendation_id": "r", "title": "t", "description": "d"}
+            )
+        with patch("app.services.session_sqlite.time.time", return_value=2000.0):
+            backend.save("new", {"filename": "new.csv", "created_at": ""})
+        with patch("app.services.session_sqlite.time.time", return_value=2500.0):
+            assert backend.expire(idle_ttl=0, max_age=0) == ([], 0)
+            expired, freed = backend.expire(idle_ttl=1200, max_age=0)
+
+        assert expired == ["old"]
+        assert freed > 50
+        assert backend.get_votes("old") is None
+        assert [s["session_id"] for s in backend.list_sessions(limit=10)[0]] == ["new"]
+
+    def test_listing_pages_by_cursor(self, db_path):
+        """Each page resumes strictly after the previous page's last session."""
+        backend = SqliteSessionBackend(db_path)
+        for sid in ("a", "b", "c"):
+            backend.save(sid, {"filename": f"{sid}.csv", "created_at": ""})
+
+        first, cursor = backend.list_sessions(limit=2)
+        second, last = backend.list_sessions(limit=2, before=cursor)
+        assert [s["session_id"] for s in first + second] == ["c", "b", "a"]
+        assert last is None
@@ -1,15 +1,38 @@
 """Session store tests — CRUD, eviction, voting, and preference learning."""
 
+import os
+import subprocess
+import sys
+from pathlib import Path
 from unittest.mock import patch
 
+import pandas as pd
+import pytest
+
+from app.services.session_fields import field_nbytes
 from app.services.session_store import (
     add_vote,
     build_preference_context,
+    clear_stale_spill_files,
     delete_session,
     get_session,
+    get_session_frame,
     get_votes,
+    list_sessions,
+    release_session_frame,
+    remove_spill_dir,
     save_session,
+    store_stats,
+    sweep_sessions,
+    update_session,
 )
+from app.services.session_sweeper import sweep_once
+
+
+def _spilled(root: Path) -> list[Path]:
+    """Spill files this process has written under `root`."""
+    own = root / str(os.getpid())
+    return sorted(own.iterdir()) if own.exists() else []
 
 
 class TestSessionCRUD:
@@ -50,6 +73,256 @@ class TestSessionCRUD:
         assert get_votes("del-1") == {"conservative": 0, "aggressive": 0, "balanced": 0}
 
 
+class TestMemoryBudget:
+    """Byte-budgeted eviction in least-recently-accessed order."""
+
+    def test_sizes_come_from_frames_and_csv_text(self):
+        """DataFrames and CSV text are measured; other fields count as zero."""
+        df = pd.DataFrame({"amount": [1.0, 2.0, 3.0]})
+        data = {"filename": "a.csv", "csv_text": "x" * 100, "raw_df": df, "summary": object()}
+        save_session("sized", data)
+        expected = len("a.csv") + 100 + field_nbytes(df)
+        assert store_stats()["bytes"] == expected
+
+        update_session("sized", {"csv_text": None})
+        assert store_stats()["bytes"] == expected - 100
+        delete_session("sized")
+        assert store_stats()["bytes"] == 0
+
+    def test_large_upload_evicts_least_recently_used(self):
+        """A big upload pushes out idle sessions, not recently used ones."""
+        with patch("app.services.session_store.SESSION_MAX_BYTES", 1000):
+            save_session("idle", {"filename": "idle.csv", "csv_text": "x" * 300})
+            save_session("active", {"filename": "active.csv", "csv_text": "x" * 300})
+            get_session("idle")  # touch: "active" is now the least recently used
+            save_session("big", {"filename": "big.csv", "csv_text": "x" * 600})
+
+            assert get_session("active") is None
+            assert get_session("idle") is not None
+            assert get_session("big") is not None
+            assert store_stats()["evictions"] == 1
+
+    def test_oversized_session_evicts_nothing(self):
+        """A session larger than the whole budget survives without pushing out the rest."""
+        with patch("app.services.session_store.SESSION_MAX_BYTES", 100):
+            save_session("small", {"filename": "s.csv", "csv_text": "x" * 50})
+            save_session("huge", {"filename": "h.csv", "csv_text": "x" * 500})
+
+            assert get_session("small") is not None
+            assert get_session("huge") is not None
+            assert store_stats()["evictions"] == 0
+
+    @pytest.mark.parametrize("spill", [False, True])
+    def test_oversized_upload_keeps_small_sessions(self, tmp_path, spill):
+        """Small sessions outlive an upload bigger than the budget, spilled or not."""
+        spill_dir = str(tmp_path) if spill else ""
+        with (
+            patch("app.services.session_store.SESSION_SPILL_DIR", spill_dir),
+            patch("app.services.session_store.SESSION_MAX_BYTES", 100_000),
+        ):
+            for i in range(5):
+                save_session(f"small-{i}", {"filename": "s.csv", "csv_text": "x" * 8_000})
+            save_session("big", {"filename": "b.csv", "csv_text": "x" * 160_000})
+            assert all(get_session(f"small-{i}") is not None for i in range(5))
+            assert store_stats()["evictions"] == 0
+
+            # Once it is no longer being written, the big session alone makes room
+            save_session("next", {"filename": "n.csv", "csv_text": "x" * 8_000})
+            assert get_session("big") is None
+            assert all(get_session(f"small-{i}") is not None for i in range(5))
+            assert store_stats()["evictions"] == 1
+
+    def test_evicts_only_what_covers_the_excess(self):
+        """An older small session is spared when a larger one alone fits the store."""
+        with patch("app.services.session_store.SESSION_MAX_BYTES", 1000):
+            save_session("small", {"filename": "s.csv", "csv_text": "x" * 100})
+            save_session("large", {"filename": "l.csv", "csv_text": "x" * 700})
+            save_session("new", {"filename": "n.csv", "csv_text": "x" * 400})
+
+            assert get_session("small") is not None
+            assert get_session("large") is None
+            assert store_stats()["evictions"] == 1
+
+    def test_listing_keeps_creation_order(self):
+        """Access order drives eviction only; the listing stays newest first."""
+        save_session("first", {"filename": "1.csv"})
+        save_session("second", {"filename": "2.csv"})
+        get_session("first")
+        assert [s["session_id"] for s in list_sessions()[0]] == ["second", "first"]
+
+
+def _frame(rows: int) -> pd.DataFrame:
+    return pd.DataFrame({"amount": [float(i) for i in range(rows)], "vendor": ["Acme"] * rows})
+
+
+class TestSpilling:
+    """Idle and over-budget sessions spill frames to Arrow files instead of being evicted."""
+
+    def test_over_budget_spills_instead_of_evicting(self, tmp_path):
+        """The least recently used session keeps its data on disk, memory-mapped on read."""
+        old, new = _frame(1000), _frame(1000)
+        with (
+            patch("app.services.session_store.SESSION_SPILL_DIR", str(tmp_path)),
+            patch("app.services.session_store.SESSION_MAX_BYTES", field_nbytes(old) + 100),
+        ):
+            save_session("old", {"filename": "old.csv", "raw_df": old})
+            save_session("new", {"filename": "new.csv", "raw_df": new})
+
+            stats = store_stats()
+            assert (stats["sessions"], stats["resident_sessions"], stats["spills"]) == (2, 1, 1)
+            assert stats["bytes"] == field_nbytes(new) + len("old.csv") + len("new.csv")
+            assert len(_spilled(tmp_path)) == 1
+
+            pd.testing.assert_frame_equal(get_session_frame("old", "raw_df"), old)
+            assert "raw_df" not in get_session("old")  # frames are fetched on demand
+
+            delete_session("old")
+            delete_session("new")
+            assert _spilled(tmp_path) == []
+
+    def test_read_readmits_frame_within_budget(self, tmp_path):
+        """A decoded spilled frame counts against the budget; re-spilling reuses its file."""
+        old, new = _frame(1000), _frame(1000)
+        with (
+            patch("app.services.session_store.SESSION_SPILL_DIR", str(tmp_path)),
+            patch("app.services.session_store.SESSION_MAX_BYTES", field_nbytes(old) + 100),
+        ):
+            save_session("old", {"filename": "old.csv", "raw_df": old})
+            save_session("new", {"filename": "new.csv", "raw_df": new})
+            (old_file,) = _spilled(tmp_path)
+
+            get_session_frame("old", "raw_df")
+            stats = store_stats()
+            assert stats["bytes"] == field_nbytes(old) + len("old.csv") + len("new.csv")
+            assert stats["resident_sessions"] == 1  # "new" was spilled to make room
+
+            get_session_frame("new", "raw_df")  # spills "old" again, from its clean copy
+            assert old_file.exists()
+            assert len(_spilled(tmp_path)) == 2
+
+    def test_unencodable_frame_stays_resident(self, tmp_path):
+        """A frame Arrow cannot encode (mixed-type object column) is kept in memory."""
+        mixed = pd.DataFrame({"code": pd.Series([1, "A12"], dtype=object)})
+        with patch("app.services.session_store.SESSION_SPILL_DIR", str(tmp_path)):
+            save_session("mixed", {"filename": "m.csv", "raw_df": mixed})
+            save_session("other", {"filename": "o.csv", "raw_df": _frame(10)})
+            release_session_frame("mixed", "raw_df")
+            release_session_frame("other", "raw_df")
+
+            assert store_stats()["resident_sessions"] == 1
+            assert list(get_session_frame("mixed", "raw_df")["code"]) == [1, "A12"]
+            assert len(_spilled(tmp_path)) == 1
+
+    def test_idle_sessions_spill_on_next_upload(self, tmp_path):
+        """Frames untouched past the idle timeout are released by the next frame write."""
+        with (
+            patch("app.services.session_store.SESSION_SPILL_DIR", str(tmp_path)),
+            patch("app.services.session_store.SESSION_SPILL_IDLE_SECONDS", 60),
+            patch("app.services.session_store.time.monotonic", return_value=1000.0),
+        ):
+            save_session("idle", {"filename": "idle.csv", "raw_df": _frame(10)})
+            save_session("busy", {"filename": "busy.csv", "raw_df": _frame(10)})
+        with (
+            patch("app.services.session_store.SESSION_SPILL_DIR", str(tmp_path)),
+            patch("app.services.session_store.SESSION_SPILL_IDLE_SECONDS", 60),
+            patch("app.services.session_store.time.monotonic", return_value=1100.0),
+        ):
+            get_session("busy")
+            update_session("busy", {"mapped_df": _frame(5)})
+
+            assert store_stats()["resident_sessions"] == 1
+            assert len(get_session_frame("idle", "raw_df")) == 10
+
+
+class TestSpillDirectory:
+    """Each process spills into its own directory, cleared at startup and shutdown."""
+
+    def test_startup_clears_only_dead_processes_files(self, tmp_path):
+        """Files of exited processes and of the old flat layout go; a live worker's stay."""
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        for owner in (exited.pid, os.getpid(), os.getppid()):
+            (tmp_path / str(owner)).mkdir()
+            (tmp_path / str(owner) / "frame.arrow").write_bytes(b"x")
+        (tmp_path / "legacy.arrow").write_bytes(b"x")
+        with patch("app.services.session_store.SESSION_SPILL_DIR", str(tmp_path)):
+            clear_stale_spill_files()
+        assert [p.name for p in tmp_path.iterdir()] == [str(os.getppid())]
+
+    def test_shutdown_removes_own_directory(self, tmp_path):
+        with patch("app.services.session_store.SESSION_SPILL_DIR", str(tmp_path)):
+            save_session("s", {"filename": "s.csv", "raw_df": _frame(10)})
+            release_session_frame("s", "raw_df")
+            assert len(_spilled(tmp_path)) == 1
+            remove_spill_dir()
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestExpiry:
+    """Idle and absolute TTLs, applied by the background sweeper."""
+
+    def test_idle_and_absolute_ttls(self):
+        """Idle sessions and sessions past their maximum age expire with their votes."""
+        clock = "app.services.session_store.time.monotonic"
+        with patch(clock, return_value=0.0):
+            save_session("old", {"filename": "old.csv", "raw_df": _frame(10)})
+            add_vote("old", "balanced", "r1", "Title", "Desc")
+        with patch(clock, return_value=50.0):
+            save_session("idle", {"filename": "idle.csv"})
+            save_session("busy", {"filename": "busy.csv"})
+        with patch(clock, return_value=90.0):
+            get_session("old")
+            get_session("busy")
+        with patch(clock, return_value=100.0):
+            expired, freed = sweep_sessions(idle_ttl=30, max_age=80)
+
+        assert sorted(expired) == ["idle", "old"]
+        assert freed == field_nbytes(_frame(10)) + len("old.csv") + len("idle.csv")
+        assert get_votes("old") == {"conservative": 0, "aggressive": 0, "balanced": 0}
+        assert [s["session_id"] for s in list_sessions()[0]] == ["busy"]
+        assert store_stats()["bytes"] == len("busy.csv")
+
+    @pytest.mark.asyncio
+    async def test_sweep_once_reports_expired_sessions(self):
+        """One sweeper pass expires sessions per the configured TTLs."""
+        save_session("stale", {"filename": "stale.csv", "csv_text": "x" * 10})
+        with patch("app.services.session_sweeper.SESSION_IDLE_TTL_SECONDS", -1):
+            assert await sweep_once() == (0, 0)
+        with patch("app.services.session_store.time.monotonic", return_value=1e12):
+            assert await sweep_once() == (1, len("stale.csv") + 10)
+        assert get_session("stale") is None
+
+
+class TestListingPages:
+    """Listing records and cursor pages."""
+
+    def test_pages_stay_correct_across_deletes_and_compaction(self):
+        """Cursor pages skip deleted sessions, before and after the list is compacted."""
+        with patch("app.services.session_store.MAX_SESSIONS", 1000):
+            for i in range(200):
+                save_session(f"s{i:03d}", {"filename": f"{i}.csv"})
+        for i in range(200):
+            if i % 4 != 3:
+                delete_session(f"s{i:03d}")
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = list_sessions(limit=30, cursor=cursor)
+            seen.extend(s["session_id"] for s in page)
+            if cursor is None:
+                break
+        assert seen == [f"s{i:03d}" for i in range(199, 0, -4)]
+
+    def test_records_follow_summary_results_and_votes(self):
+        """The listing record changes with the fields it summarizes."""
+        save_session("meta", {"filename": "meta.csv"})
+        update_session("meta", {"agent_results": {"balanced": {}}})
+        add_vote("meta", "balanced", "r1", "Title", "Desc")
+
+        (record,), _ = list_sessions(limit=1)
+        assert (record["vote_count"], record["has_report"]) == (1, True)
+
+
 class TestVoting:
     """Vote tracking and preference context."""
 
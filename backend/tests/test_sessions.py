@@ -1,8 +1,13 @@
 """Session management endpoint tests."""
 
+import threading
+from unittest.mock import patch
+
 import pytest
 from httpx import AsyncClient
 
+from app.routers import dependencies, upload
+
 
 class TestSessionsEndpoint:
     """GET /api/sessions, DELETE /api/sessions/:id, GET /api/summary/:id tests."""
@@ -81,3 +86,66 @@ class TestSessionsEndpoint:
         filtered_count = filtered_resp.json()["row_count"]
 
         assert filtered_count < full_count
+
+    @pytest.mark.asyncio
+    async def test_store_reads_run_off_the_event_loop(self, client: AsyncClient, demo_session: str):
+        """Session lookups, listing and deletes run on the session threads."""
+        threads: list[str] = []
+
+        def recording(fn):
+            def call(*args, **kwargs):
+                threads.append(threading.current_thread().name)
+                return fn(*args, **kwargs)
+
+            return call
+
+        with (
+            patch.object(dependencies, "get_session", recording(dependencies.get_session)),
+            patch.object(upload, "list_sessions", recording(upload.list_sessions)),
+            patch.object(upload, "delete_session", recording(upload.delete_session)),
+        ):
+            assert (await client.get(f"/api/summary/{demo_session}")).status_code == 200
+            assert (await client.get("/api/sessions")).status_code == 200
+            assert (await client.delete(f"/api/sessions/{demo_session}")).status_code == 200
+        assert len(threads) == 3
+        assert all(name.startswith("session-io") for name in threads)
+
+
+class TestSessionPagination:
+    """GET /api/sessions pages through sessions with a cursor."""
+
+    @pytest.mark.asyncio
+    async def test_cursor_walks_every_session_newest_first(self, client: AsyncClient):
+        """Pages follow one another without gaps or repeats, skipping deleted sessions."""
+        created = [(await client.post("/api/demo/start")).json()["session_id"] for _ in range(5)]
+        await client.delete(f"/api/sessions/{created[2]}")
+        await client.post(
+            "/api/vote",
+            json={
+                "session_id": created[4],
+                "agent_type": "balanced",
+                "recommendation_id": "b1",
+                "recommendation_title": "Title",
+                "recommendation_description": "Desc",
+            },
+        )
+
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+            page = (await client.get("/api/sessions", params=params)).json()
+            assert len(page["sessions"]) <= 2
+            seen.extend(page["sessions"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert [s["session_id"] for s in seen] == [created[4], created[3], created[1], created[0]]
+        assert seen[0]["vote_count"] == 1
+        assert seen[0]["row_count"] > 0
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor_and_limit_rejected(self, client: AsyncClient):
+        """Malformed cursors are a 400; limits outside the page bounds a 422."""
+        assert (await client.get("/api/sessions", params={"cursor": "abc"})).status_code == 400
+        assert (await client.get("/api/sessions", params={"limit": 0})).status_code == 422
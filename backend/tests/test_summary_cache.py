@@ -0,0 +1,73 @@
+"""Filtered-summary cache tests."""
+
+import pandas as pd
+
+from app.models.schemas import DataSummary
+from app.services.summary_cache import SummaryCache
+
+
+def _summary(total: float) -> DataSummary:
+    return DataSummary(
+        total_spend=total,
+        row_count=1,
+        date_range="2024-01-01 to 2024-01-01",
+        top_vendors=[],
+        category_breakdown=[],
+        department_breakdown=[],
+        monthly_trends=[],
+        unique_vendor_count=0,
+        duplicate_vendors=[],
+    )
+
+
+class TestSummaryCache:
+    """LRU behaviour, byte budget and counters."""
+
+    def test_counts_hits_and_misses(self):
+        """Lookups are tallied and reflected in the hit rate."""
+        cache = SummaryCache(max_bytes=1_000_000)
+        key = ("s1", "v1", None, None)
+        assert cache.get(key) is None
+        cache.put(key, _summary(1.0))
+        assert cache.get(key).total_spend == 1.0
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+    def test_evicts_least_recently_used_within_budget(self):
+        """Once over budget the coldest entry goes, not the one just read."""
+        entry_size = len(_summary(1.0).model_dump_json())
+        cache = SummaryCache(max_bytes=entry_size * 2)
+        cache.put(("s1", "v1", None, None), _summary(1.0))
+        cache.put(("s2", "v1", None, None), _summary(2.0))
+        cache.get(("s1", "v1", None, None))
+        cache.put(("s3", "v1", None, None), _summary(3.0))
+
+        assert cache.get(("s2", "v1", None, None)) is None
+        assert cache.get(("s1", "v1", None, None)) is not None
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["bytes"] <= cache.max_bytes
+
+    def test_invalidate_session_drops_only_that_session(self):
+        """Re-confirming one session leaves other sessions' windows cached."""
+        cache = SummaryCache(max_bytes=1_000_000)
+        cache.put(("s1", "v1", None, None), _summary(1.0))
+        cache.put(("s1", "v1", pd.Timestamp("2024-01-01"), None), _summary(1.5))
+        cache.put(("s2", "v1", None, None), _summary(2.0))
+
+        assert cache.invalidate_session("s1") == 2
+        assert cache.get(("s1", "v1", None, None)) is None
+        assert cache.get(("s2", "v1", None, None)) is not None
+
+    def test_put_after_invalidation_is_skipped(self):
+        """A window computed before its session was invalidated is not stored."""
+        cache = SummaryCache(max_bytes=1_000_000)
+        before = cache.generation()
+        cache.invalidate_session("s1")
+        cache.put(("s1", "v1", None, None), _summary(1.0), before)
+        cache.put(("s2", "v1", None, None), _summary(2.0), before)
+
+        assert cache.get(("s1", "v1", None, None)) is None
+        assert cache.get(("s2", "v1", None, None)) is not None
+        cache.put(("s1", "v2", None, None), _summary(1.5), cache.generation())
+        assert cache.get(("s1", "v2", None, None)) is not None
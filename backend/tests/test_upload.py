@@ -1,9 +1,19 @@
 """Upload and confirm-mappings endpoint tests."""
 
+import asyncio
+import io
+import os
+from collections.abc import Awaitable, Callable
+from unittest.mock import patch
+
+import pandas as pd
 import pytest
 from httpx import AsyncClient
 
+from app.main import app
 from app.models.schemas import DataSummary, UploadResponse
+from app.services import worker_pool
+from app.services.session_store import get_session, get_session_frame
 
 from .conftest import sample_csv_bytes
 
@@ -49,6 +59,82 @@ class TestUploadEndpoint:
             )
             assert resp.status_code == 413
 
+    @pytest.mark.asyncio
+    async def test_declared_oversized_body_is_rejected_unread(self):
+        """A Content-Length over the limit is refused before any of the body is read."""
+        with patch("app.routers.upload.MAX_UPLOAD_SIZE_BYTES", 1000):
+            status, consumed = await _post_chunks([b"x" * 1000] * 100, content_length=100_000 + 1)
+        assert (status, consumed) == (413, 0)
+
+    @pytest.mark.asyncio
+    async def test_oversized_stream_is_rejected_while_arriving(self):
+        """Without a Content-Length, the upload stops at the chunk that crosses the limit."""
+        rows = b"".join(b"2024-01-01,Acme,IT,%d,Eng\n" % i for i in range(200_000))
+        body = _multipart(b"date,vendor,category,amount,department\n" + rows)
+        chunks = [body[i : i + 64 * 1024] for i in range(0, len(body), 64 * 1024)]
+        with (
+            patch("app.routers.upload.MAX_UPLOAD_SIZE_BYTES", 256 * 1024),
+            patch("app.services.data_processor.UPLOAD_CHUNK_SIZE_BYTES", 64 * 1024),
+        ):
+            status, consumed = await _post_chunks(chunks)
+        assert status == 413
+        assert consumed < len(chunks) // 2
+
+    @pytest.mark.asyncio
+    async def test_stalled_upload_does_not_hold_up_other_requests(self, client: AsyncClient):
+        """A client that stops sending mid-upload ties up an upload thread, nothing else."""
+        session_id = await TestFilteredSummaryCache._confirmed_session(client)
+        body = _multipart(sample_csv_bytes())
+        resume = asyncio.Event()
+        sent = 0
+
+        async def receive() -> dict:
+            nonlocal sent
+            sent += 1
+            if sent == 1:
+                return {"type": "http.request", "body": body[:100], "more_body": True}
+            await resume.wait()
+            return {"type": "http.request", "body": body[100:], "more_body": False}
+
+        worker_pool.shutdown_worker_pool()
+        try:
+            with (
+                patch.object(worker_pool, "DATA_EXECUTOR_WORKERS", 1),
+                patch.object(worker_pool, "UPLOAD_WORKERS", 1),
+            ):
+                upload = asyncio.create_task(_asgi_upload(receive, len(body)))
+                await asyncio.sleep(0.2)  # the upload thread now waits for the rest
+                window = f"/api/summary/{session_id}?start_date=2024-03-01&end_date=2024-06-30"
+                resp = await asyncio.wait_for(client.get(window), 5)
+                assert resp.status_code == 200
+                resume.set()
+                assert await upload == 200
+        finally:
+            resume.set()
+            worker_pool.shutdown_worker_pool()
+
+    @pytest.mark.asyncio
+    async def test_upload_xlsx(self, client: AsyncClient):
+        """XLSX needs random access, so its streamed body is spooled before parsing."""
+        buffer = io.BytesIO()
+        pd.DataFrame({"Vendor": ["Acme", "Globex"], "Amount": [10.5, 20.0]}).to_excel(
+            buffer, index=False
+        )
+        resp = await client.post(
+            "/api/upload",
+            files={"file": ("t.xlsx", buffer.getvalue(), "application/octet-stream")},
+        )
+        assert resp.status_code == 200
+        assert (resp.json()["row_count"], resp.json()["columns"]) == (2, ["vendor", "amount"])
+
+    @pytest.mark.asyncio
+    async def test_rejects_body_without_file(self, client: AsyncClient):
+        """A form with no file part, or no form at all, is a 400."""
+        resp = await client.post("/api/upload", data={"note": "hello"}, files={"x": ("", b"")})
+        assert resp.status_code == 400
+        resp = await client.post("/api/upload", content=b"date,amount\n")
+        assert resp.status_code == 400
+
     @pytest.mark.asyncio
     async def test_column_suggestions_for_nonstandard_names(self, client: AsyncClient):
         """Non-standard column names get reasonable suggestions."""
@@ -76,6 +162,66 @@ class TestUploadEndpoint:
         assert ".." not in data["filename"]
 
 
+_BOUNDARY = b"test-boundary"
+
+
+def _multipart(content: bytes, filename: bytes = b"big.csv") -> bytes:
+    return (
+        b"--" + _BOUNDARY + b"\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="' + filename + b'"\r\n'
+        b"Content-Type: text/csv\r\n\r\n" + content + b"\r\n--" + _BOUNDARY + b"--\r\n"
+    )
+
+
+async def _post_chunks(chunks: list[bytes], content_length: int | None = None) -> tuple[int, int]:
+    """POST a body to /api/upload chunk by chunk over ASGI; return (status, chunks read)."""
+    consumed = 0
+
+    async def receive() -> dict:
+        nonlocal consumed
+        if consumed == len(chunks):
+            return {"type": "http.disconnect"}
+        consumed += 1
+        return {
+            "type": "http.request",
+            "body": chunks[consumed - 1],
+            "more_body": consumed < len(chunks),
+        }
+
+    status = await _asgi_upload(receive, content_length)
+    return status, consumed
+
+
+async def _asgi_upload(receive: Callable[[], Awaitable[dict]], content_length: int | None) -> int:
+    """POST to /api/upload over ASGI with body messages from `receive`; return the status."""
+    headers = [(b"content-type", b"multipart/form-data; boundary=" + _BOUNDARY)]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/upload",
+        "raw_path": b"/api/upload",
+        "query_string": b"",
+        "root_path": "",
+        "headers": headers,
+        "server": ("test", 80),
+        "client": ("test", 1234),
+    }
+    status = 0
+
+    async def send(message: dict) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
 class TestConfirmMappings:
     """POST /api/confirm-mappings tests."""
 
@@ -129,3 +275,88 @@ class TestConfirmMappings:
             },
         )
         assert resp.status_code == 400
+
+
+class TestConfirmReleasesRawFrame:
+    """After confirm, only the mapped columns stay in memory."""
+
+    @pytest.mark.asyncio
+    async def test_raw_frame_spills_and_remapping_still_works(self, client: AsyncClient, tmp_path):
+        """raw_df moves to disk on confirm and is read back when columns are re-mapped."""
+        upload_resp = await client.post(
+            "/api/upload",
+            files={"file": ("test.csv", sample_csv_bytes(), "text/csv")},
+        )
+        session_id = upload_resp.json()["session_id"]
+        fields = ("date", "vendor", "category", "amount", "department")
+        with patch("app.services.session_store.SESSION_SPILL_DIR", str(tmp_path)):
+            for _ in range(2):
+                resp = await client.post(
+                    "/api/confirm-mappings",
+                    json={"session_id": session_id, "mappings": {f: f for f in fields}},
+                )
+                assert resp.status_code == 200
+                assert len(list((tmp_path / str(os.getpid())).iterdir())) == 1
+
+        session = get_session(session_id)
+        assert "csv_text" not in session
+        mapped = get_session_frame(session_id, "mapped_df")
+        assert set(fields) <= set(mapped.columns)
+
+
+class TestFilteredSummaryCache:
+    """GET /api/summary date windows are served from the summary cache."""
+
+    @staticmethod
+    async def _confirmed_session(client: AsyncClient) -> str:
+        upload_resp = await client.post(
+            "/api/upload",
+            files={"file": ("test.csv", sample_csv_bytes(), "text/csv")},
+        )
+        session_id = upload_resp.json()["session_id"]
+        fields = ("date", "vendor", "category", "amount", "department")
+        await client.post(
+            "/api/confirm-mappings",
+            json={"session_id": session_id, "mappings": {f: f for f in fields}},
+        )
+        return session_id
+
+    @pytest.mark.asyncio
+    async def test_repeat_window_hits_and_reconfirm_invalidates(self, client: AsyncClient):
+        """A repeated window is a hit; re-confirming mappings forces a recompute."""
+        session_id = await self._confirmed_session(client)
+        window = f"/api/summary/{session_id}?start_date=2024-03-01&end_date=2024-06-30"
+
+        first = await client.get(window)
+        second = await client.get(window)
+        assert first.json() == second.json()
+        assert first.json()["row_count"] == 4
+        stats = (await client.get("/api/metrics")).json()["summary_cache"]
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+        fields = ("date", "vendor", "category", "amount", "department")
+        await client.post(
+            "/api/confirm-mappings",
+            json={"session_id": session_id, "mappings": {f: f for f in fields}},
+        )
+        assert (await client.get("/api/metrics")).json()["summary_cache"]["entries"] == 0
+        await client.get(window)
+        assert (await client.get("/api/metrics")).json()["summary_cache"]["misses"] == 2
+
+    @pytest.mark.asyncio
+    async def test_reconfirm_in_another_worker_is_not_served_stale(self, client: AsyncClient):
+        """Entries are keyed on the session's summary version, not just local invalidation."""
+        session_id = await self._confirmed_session(client)
+        window = f"/api/summary/{session_id}?start_date=2024-03-01&end_date=2024-06-30"
+        await client.get(window)
+
+        # Another worker re-confirms: this process's cache is never told
+        fields = ("date", "vendor", "category", "amount", "department")
+        with patch("app.routers.upload.summary_cache.invalidate_session"):
+            await client.post(
+                "/api/confirm-mappings",
+                json={"session_id": session_id, "mappings": {f: f for f in fields}},
+            )
+        await client.get(window)
+        stats = (await client.get("/api/metrics")).json()["summary_cache"]
+        assert (stats["hits"], stats["misses"]) == (0, 2)
@@ -0,0 +1,156 @@
+"""Trigram-blocked duplicate vendor detection tests."""
+
+from difflib import SequenceMatcher
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import worker_pool
+from app.services.data_processor import summarize_dataframe
+from app.services.vendor_dedup import (
+    _normalize_vendor,
+    find_duplicate_vendors,
+    normalize_vendor_names,
+)
+
+
+def _pairwise_reference(vendors: list[str], threshold: float) -> list[str]:
+    """The original all-pairs scan, kept as the oracle for the blocked engine."""
+    normalized = {v: _normalize_vendor(v) for v in vendors}
+    duplicates = []
+    seen = set()
+    for i, v1 in enumerate(vendors):
+        for v2 in vendors[i + 1 :]:
+            pair = tuple(sorted([v1, v2]))
+            if pair in seen:
+                continue
+            seen.add(pair)
+            n1, n2 = normalized[v1], normalized[v2]
+            if not n1 or not n2:
+                continue
+            ratio = SequenceMatcher(None, n1, n2).ratio()
+            if ratio >= threshold and n1 != n2:
+                duplicates.append(f"{v1} / {v2} (similarity: {ratio:.0%})")
+    return duplicates
+
+
+def _random_name(rng: np.random.Generator, alphabet: str, length: int) -> str:
+    return "".join(rng.choice(list(alphabet), length))
+
+
+def _mutate(rng: np.random.Generator, name: str) -> str:
+    chars = list(name)
+    k = int(rng.integers(len(chars)))
+    op = rng.choice(["insert", "delete", "substitute"])
+    if op == "insert":
+        chars.insert(k, _random_name(rng, "abcde ", 1))
+    elif op == "delete" and len(chars) > 1:
+        del chars[k]
+    else:
+        chars[k] = _random_name(rng, "abcde", 1)
+    return "".join(chars)
+
+
+class TestNormalizeVendorNames:
+    """Vectorized normalization agrees with the per-name function."""
+
+    def test_matches_scalar_normalization(self):
+        """Suffixes, punctuation, case and whitespace are handled identically."""
+        names = [
+            "Staples Pty. Ltd.",
+            "  ACME  Corp, Inc ",
+            "Café Ltd",
+            "O'Brien & Sons P/L",
+            "Pty Ltd",
+            "Tab\tSeparated\nName",
+        ]
+        expected = [_normalize_vendor(n) for n in names]
+        for dtype in (object, "string[pyarrow]"):
+            assert normalize_vendor_names(pd.Series(names, dtype=dtype)).tolist() == expected
+
+    def test_missing_names_normalize_to_empty(self):
+        """Missing values come back as empty strings."""
+        assert normalize_vendor_names(pd.Series(["Acme", None])).tolist() == ["acme", ""]
+
+
+class TestFindDuplicateVendors:
+    """Candidate pruning never changes the answer."""
+
+    @pytest.mark.parametrize("threshold", [0.0, 0.5, 0.7, 0.88, 0.95])
+    def test_matches_pairwise_scan(self, threshold):
+        """Same pairs, ratios and order as scoring every pair."""
+        rng = np.random.default_rng(7)
+        for _ in range(60):
+            base = [
+                _random_name(rng, "abcde ", int(rng.integers(1, 15)))
+                for _ in range(rng.integers(2, 21))
+            ]
+            suffixes = ["", " Pty Ltd", " Inc"]
+            vendors = base + [
+                _mutate(rng, str(rng.choice(base))) + str(rng.choice(suffixes))
+                for _ in range(rng.integers(0, 16))
+            ]
+            assert find_duplicate_vendors(vendors, threshold) == _pairwise_reference(
+                vendors, threshold
+            )
+
+    def test_real_world_variants(self):
+        """Suffix and typo variants are paired; unrelated names are not."""
+        vendors = ["Staples Pty Ltd", "Stapels", "Officeworks", "Office Works Inc", "Qantas"]
+        duplicates = find_duplicate_vendors(vendors, threshold=0.85)
+        assert duplicates == _pairwise_reference(vendors, 0.85)
+        assert any(d.startswith("Officeworks / Office Works Inc") for d in duplicates)
+        assert not any("Qantas" in d for d in duplicates)
+
+
+class TestParallelScoring:
+    """Sharded multiprocess scoring agrees with in-process scoring."""
+
+    def test_pool_results_match_serial_in_order(self):
+        """Shards are merged back in candidate order, so output is identical."""
+        rng = np.random.default_rng(5)
+        base = [_random_name(rng, "abcdef ", 10) for _ in range(300)]
+        vendors = base + [_mutate(rng, name) for name in base[:150]]
+        serial = find_duplicate_vendors(vendors, threshold=0.8)
+
+        with (
+            patch("app.services.vendor_dedup.DUPLICATE_VENDOR_SCORING_WORKERS", 2),
+            patch("app.services.vendor_dedup.DUPLICATE_VENDOR_PARALLEL_MIN_PAIRS", 1),
+            patch("app.services.worker_pool.DUPLICATE_VENDOR_SCORING_WORKERS", 2),
+            patch.object(
+                worker_pool, "get_scoring_executor", wraps=worker_pool.get_scoring_executor
+            ) as get_pool,
+        ):
+            try:
+                parallel = find_duplicate_vendors(vendors, threshold=0.8)
+            finally:
+                worker_pool.shutdown_worker_pool()
+
+        get_pool.assert_called_once()
+        assert parallel == serial
+        assert serial
+
+
+class TestUncappedSummary:
+    """summarize_dataframe checks every vendor, not just the first few hundred."""
+
+    def test_duplicate_beyond_former_cap_is_reported(self):
+        """A near-duplicate pair ranked below the 500th vendor is still found."""
+        rng = np.random.default_rng(11)
+        letters = "abcdefghijklmnopqrstuvwxyz"
+        vendors = sorted({_random_name(rng, letters, 12) for _ in range(2_000)})
+        vendors += ["Zephyr Logistics", "Zephyr Logistic Pty Ltd"]
+        df = pd.DataFrame(
+            {
+                "date": pd.Timestamp("2024-01-01"),
+                "vendor": vendors,
+                "category": "Freight",
+                "department": "Ops",
+                "amount": [1000.0] * (len(vendors) - 2) + [1.0, 1.0],
+                "month": 202401,
+            }
+        )
+        summary = summarize_dataframe(df)
+        assert any("Zephyr" in d for d in summary.duplicate_vendors)
@@ -0,0 +1,140 @@
+"""Persistent vendor alias registry tests."""
+
+import sqlite3
+from unittest.mock import patch
+
+import app.services.vendor_dedup as vendor_dedup
+from app.services.vendor_dedup import find_duplicate_vendors
+from app.services.vendor_registry import VendorRegistry
+
+JANUARY = ["Staples Pty Ltd", "Stapels", "Officeworks", "Office Works Inc", "Qantas", "Qantaz"]
+FEBRUARY = ["Staples", "Officeworks", "Qantas Airways", "Qantas Airway", "Telstra"]
+
+
+class TestVendorRegistry:
+    """Registry-backed detection matches the stateless engine (VENDOR_REGISTRY_PATH unset)."""
+
+    def test_results_match_stateless_engine(self, tmp_path):
+        """Every upload gets the same duplicates with or without the registry."""
+        registry = VendorRegistry(str(tmp_path / "vendors.db"), score_floor=0.8)
+        for vendors in (JANUARY, FEBRUARY, JANUARY + FEBRUARY):
+            for threshold in (0.8, 0.9):
+                expected = find_duplicate_vendors(vendors, threshold)
+                assert find_duplicate_vendors(vendors, threshold, registry=registry) == expected
+
+    def test_known_names_are_not_rescored(self, tmp_path):
+        """A repeat upload is answered from stored scores alone."""
+        registry = VendorRegistry(str(tmp_path / "vendors.db"), score_floor=0.8)
+        first = find_duplicate_vendors(JANUARY, 0.8, registry=registry)
+
+        with patch.object(vendor_dedup, "_scored_pairs", side_effect=AssertionError):
+            assert find_duplicate_vendors(JANUARY, 0.8, registry=registry) == first
+
+    def test_new_names_are_scored_against_the_whole_registry(self, tmp_path):
+        """A later upload pairs a new name with one seen only in an earlier upload."""
+        registry = VendorRegistry(str(tmp_path / "vendors.db"), score_floor=0.8)
+        find_duplicate_vendors(["Qantas Airways", "Telstra"], 0.8, registry=registry)
+        find_duplicate_vendors(["Qantas Airway"], 0.8, registry=registry)
+
+        duplicates = find_duplicate_vendors(
+            ["Qantas Airways", "Qantas Airway"], 0.8, registry=registry
+        )
+        assert duplicates == ["Qantas Airways / Qantas Airway (similarity: 96%)"]
+
+    def test_new_names_are_matched_through_the_stored_index(self, tmp_path):
+        """Registered names are not re-tokenized; short names are found by length."""
+        registry = VendorRegistry(str(tmp_path / "vendors.db"), score_floor=0.5)
+        earlier = JANUARY + ["HP", "IBM", "3M"]
+        find_duplicate_vendors(earlier, 0.5, registry=registry)
+
+        later = ["Stapless", "H P", "IBN", "3"]
+        tokenized = []
+        real_trigram_tokens = vendor_dedup._trigram_tokens
+
+        def recording_trigram_tokens(name):
+            tokenized.append(name)
+            return real_trigram_tokens(name)
+
+        with patch.object(vendor_dedup, "_trigram_tokens", recording_trigram_tokens):
+            find_duplicate_vendors(later, 0.5, registry=registry)
+        assert set(tokenized) == {"stapless", "h p", "ibn", "3"}
+
+        combined = earlier + later
+        assert find_duplicate_vendors(combined, 0.5, registry=registry) == (
+            find_duplicate_vendors(combined, 0.5)
+        )
+
+    def test_older_schema_is_cleared(self, tmp_path):
+        """A file from before the trigram index is rebuilt rather than misread."""
+        path = tmp_path / "vendors.db"
+        conn = sqlite3.connect(path)
+        conn.executescript(
+            "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+            "INSERT INTO meta VALUES ('score_floor', '0.8');"
+            "CREATE TABLE vendors (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE,"
+            " cluster_id INTEGER NOT NULL);"
+            "INSERT INTO vendors VALUES (1, 'stapels', 1);"
+        )
+        conn.close()
+
+        registry = VendorRegistry(str(path), score_floor=0.5)
+        assert (registry.score_floor, registry.names()) == (0.8, [])
+        expected = find_duplicate_vendors(JANUARY, 0.8)
+        assert find_duplicate_vendors(JANUARY, 0.8, registry=registry) == expected
+
+    def test_survives_reopen(self, tmp_path):
+        """Names, scores and the score floor persist across connections."""
+        path = str(tmp_path / "vendors.db")
+        registry = VendorRegistry(path, score_floor=0.8)
+        first = find_duplicate_vendors(JANUARY, 0.85, registry=registry)
+        registry.close()
+
+        reopened = VendorRegistry(path, score_floor=0.5)
+        assert reopened.score_floor == 0.8
+        assert "stapels" in reopened.names()
+        with patch.object(vendor_dedup, "_scored_pairs", side_effect=AssertionError):
+            assert find_duplicate_vendors(JANUARY, 0.85, registry=reopened) == first
+
+    def test_threshold_below_floor_bypasses_registry(self, tmp_path):
+        """Stored scores cannot answer thresholds under the floor; score directly."""
+        registry = VendorRegistry(str(tmp_path / "vendors.db"), score_floor=0.9)
+        duplicates = find_duplicate_vendors(JANUARY, 0.7, registry=registry)
+        assert duplicates == find_duplicate_vendors(JANUARY, 0.7)
+        assert registry.names() == []
+
+    def test_lookups_and_scoring_run_outside_the_write_lock(self, tmp_path):
+        """Only recording new names takes SQLite's write lock."""
+        registry = VendorRegistry(str(tmp_path / "vendors.db"), score_floor=0.8)
+        real_scored_pairs = vendor_dedup._scored_pairs
+
+        def scored_outside_transaction(*args, **kwargs):
+            assert not registry._conn.in_transaction
+            return real_scored_pairs(*args, **kwargs)
+
+        with patch.object(vendor_dedup, "_scored_pairs", scored_outside_transaction):
+            first = find_duplicate_vendors(JANUARY, 0.8, registry=registry)
+        with patch.object(registry, "locked", side_effect=AssertionError):
+            assert find_duplicate_vendors(JANUARY, 0.8, registry=registry) == first
+
+    def test_names_registered_while_scoring_are_paired(self, tmp_path):
+        """A name another process records mid-scoring is scored before recording."""
+        path = str(tmp_path / "vendors.db")
+        registry = VendorRegistry(path, score_floor=0.8)
+        other = VendorRegistry(path, score_floor=0.8)
+        real_scored_pairs = vendor_dedup._scored_pairs
+        calls = []
+
+        def racing_scored_pairs(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                find_duplicate_vendors(["Qantas Airway"], 0.8, registry=other)
+            return real_scored_pairs(*args, **kwargs)
+
+        with patch.object(vendor_dedup, "_scored_pairs", racing_scored_pairs):
+            find_duplicate_vendors(["Qantas Airways", "Telstra"], 0.8, registry=registry)
+        assert len(calls) == 3  # first pass, the other process, names it added
+
+        duplicates = find_duplicate_vendors(
+            ["Qantas Airways", "Qantas Airway"], 0.8, registry=registry
+        )
+        assert duplicates == ["Qantas Airways / Qantas Airway (similarity: 96%)"]
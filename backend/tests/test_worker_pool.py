@@ -0,0 +1,128 @@
+"""Worker pool tests — off-loop execution and shared-memory DataFrame hand-off."""
+
+import asyncio
+import os
+import threading
+import time
+from unittest.mock import patch
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from app.services import worker_pool
+from app.services.data_processor import summarize_dataframe
+
+
+def _thread_name() -> str:
+    return threading.current_thread().name
+
+
+def _slow_copy(df: pd.DataFrame) -> pd.DataFrame:
+    time.sleep(0.5)
+    return df.copy()
+
+
+def _sample_mapped_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-01-15", "2024-02-10"]),
+            "vendor": ["Acme", "Globex"],
+            "category": ["IT", "Marketing"],
+            "amount": [1000.0, 2000.0],
+            "department": ["Eng", "Mkt"],
+            "month": ["2024-01", "2024-02"],
+        }
+    )
+
+
+@pytest.fixture(autouse=True)
+def _fresh_pool():
+    worker_pool.shutdown_worker_pool()
+    yield
+    worker_pool.shutdown_worker_pool()
+
+
+class TestThreadMode:
+    @pytest.mark.asyncio
+    async def test_runs_off_the_event_loop_thread(self):
+        """Data work runs on a pool thread, not the loop's thread."""
+        name = await worker_pool.run_in_worker(_thread_name)
+        assert name.startswith("data")
+        assert name != threading.current_thread().name
+
+    @pytest.mark.asyncio
+    async def test_session_io_is_not_starved_by_busy_blocking_pool(self):
+        """Session reads still run while every data-io thread is held."""
+        release = threading.Event()
+        with patch.object(worker_pool, "DATA_EXECUTOR_WORKERS", 1):
+            held = asyncio.ensure_future(worker_pool.run_blocking(release.wait, 10))
+            try:
+                await asyncio.sleep(0.05)
+                name = await asyncio.wait_for(worker_pool.run_session_io(_thread_name), 2)
+                assert name.startswith("session-io")
+            finally:
+                release.set()
+                await held
+
+    @pytest.mark.asyncio
+    async def test_exceptions_propagate(self):
+        """Validation errors raised in a worker reach the caller unchanged."""
+        with pytest.raises(ValueError):
+            await worker_pool.run_in_worker(int, "not a number")
+
+
+class TestProcessMode:
+    def test_shared_frame_roundtrip(self):
+        """DataFrames come back Arrow-backed and uncopied, with files cleaned up."""
+        df = _sample_mapped_df()
+        df["vendor"] = df["vendor"].astype("category")
+        handle = worker_pool._pack(df)
+        assert isinstance(handle, worker_pool.SharedFrame)
+
+        allocated = pa.total_allocated_bytes()
+        restored = worker_pool._unpack(handle)
+        assert pa.total_allocated_bytes() - allocated < 1024  # columns point into the mapping
+        assert not os.path.exists(handle.path)
+
+        assert isinstance(restored["vendor"].dtype, pd.CategoricalDtype)
+        for col in ("date", "amount", "category"):
+            assert isinstance(restored[col].dtype, pd.ArrowDtype), col
+        pd.testing.assert_frame_equal(restored, df, check_dtype=False)
+
+    @pytest.mark.asyncio
+    async def test_summarize_in_process_worker(self):
+        """A process worker summarizes a shared DataFrame just like the thread path."""
+        with (
+            patch.object(worker_pool, "DATA_EXECUTOR", "process"),
+            patch.object(worker_pool, "DATA_EXECUTOR_WORKERS", 1),
+        ):
+            summary = await worker_pool.run_in_worker(summarize_dataframe, _sample_mapped_df())
+        assert summary.total_spend == 3000.0
+        assert summary.row_count == 2
+
+    def test_unencodable_frame_is_pickled_instead(self):
+        """A mixed-type object column is passed by pickle rather than failing the hand-off."""
+        mixed = pd.DataFrame({"code": pd.Series([1, "A12"], dtype=object)})
+        packed = worker_pool._pack((mixed,))
+        assert packed[0] is mixed
+
+    @pytest.mark.asyncio
+    async def test_cancelled_call_leaves_no_shared_files(self, tmp_path):
+        """Input and output files are removed when the awaiting request goes away."""
+        with (
+            patch.object(worker_pool, "DATA_EXECUTOR", "process"),
+            patch.object(worker_pool, "DATA_EXECUTOR_WORKERS", 1),
+            patch.object(worker_pool, "SHARED_FRAME_DIR", str(tmp_path)),
+            # Spawned workers read their output directory from the environment
+            patch.dict(os.environ, {"SHARED_FRAME_DIR": str(tmp_path)}),
+        ):
+            await worker_pool.run_in_worker(len, [])  # spawn the worker up front
+            task = asyncio.create_task(worker_pool.run_in_worker(_slow_copy, _sample_mapped_df()))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            worker_pool.shutdown_worker_pool()  # waits for the running call to finish
+
+        assert list(tmp_path.iterdir()) == []
@@ -54,6 +54,20 @@ function ArenaContent() {
               : [...prev.steps, event.step]
             : prev.steps,
         }));
+      } else if (event.status === "queued") {
+        setter((prev) => ({
+          ...prev,
+          status: prev.status === "idle" ? "thinking" : prev.status,
+          queue_position: event.position || 0,
+        }));
+      } else if (event.status === "recommendation" && event.recommendation) {
+        const rec = event.recommendation;
+        setter((prev) => ({
+          ...prev,
+          recommendations: prev.recommendations.some((r) => r.id === rec.id)
+            ? prev.recommendations
+            : [...prev.recommendations, rec],
+        }));
       } else if (event.status === "complete" && event.result) {
         setter((prev) => ({
           ...prev,
@@ -44,7 +44,7 @@ export default function AgentCard({ agentType }: AgentCardProps) {
                 className="inline-block w-1.5 h-1.5 rounded-full mr-1.5 animate-pulse"
                 style={{ backgroundColor: config.color }}
               />
-              Analyzing
+              {state.queue_position ? `Queued #${state.queue_position}` : "Analyzing"}
             </span>
           )}
           {state.status === "complete" && (
@@ -105,6 +105,11 @@ export default function AgentCard({ agentType }: AgentCardProps) {
         </div>
       )}
 
+      {/* Recommendations streamed in before the result is complete */}
+      {state.status === "thinking" && state.recommendations.length > 0 && (
+        <RecommendationList recommendations={state.recommendations} agentType={agentType} />
+      )}
+
       {/* Results */}
       {state.status === "complete" && (
         <motion.div
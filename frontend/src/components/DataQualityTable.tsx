@@ -74,7 +74,15 @@ export default function DataQualityTable({ stats, rowCount }: Props) {
                 <td className="px-3 py-2 text-right">
                   <MissingPct pct={s.missing_pct} />
                 </td>
-                <td className="px-3 py-2 text-right text-zinc-600">
+                <td
+                  className="px-3 py-2 text-right text-zinc-600"
+                  title={
+                    s.unique_count_approximate && s.unique_count_error_pct != null
+                      ? `Estimated (±${s.unique_count_error_pct}%)`
+                      : undefined
+                  }
+                >
+                  {s.unique_count_approximate ? "~" : ""}
                   {s.unique_count.toLocaleString()}
                 </td>
                 <td className="px-3 py-2 text-zinc-500 max-w-[250px] truncate">
@@ -19,16 +19,31 @@ interface Session {
 
 export default function SessionList() {
   const [sessions, setSessions] = useState<Session[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [, setSessionId] = useAtom(sessionIdAtom);
   const [, setArenaStarted] = useAtom(arenaStartedAtom);
   const router = useRouter();
 
   useEffect(() => {
     getSessions()
-      .then((data) => setSessions(data.sessions))
+      .then((data) => {
+        setSessions(data.sessions);
+        setNextCursor(data.next_cursor);
+      })
       .catch((err) => console.warn("[SessionList] Failed to load sessions:", err));
   }, []);
 
+  const handleLoadMore = useCallback(async () => {
+    if (!nextCursor) return;
+    try {
+      const data = await getSessions(nextCursor);
+      setSessions((prev) => [...prev, ...data.sessions]);
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      console.warn("[SessionList] Failed to load more sessions:", err);
+    }
+  }, [nextCursor]);
+
   const handleRerun = (session: Session) => {
     setArenaStarted(false);
     setSessionId(session.session_id);
@@ -76,7 +91,7 @@ export default function SessionList() {
             className="relative w-full bg-white border border-zinc-200 rounded-lg px-4 py-3 transition-all duration-150 group shadow-[0_1px_2px_0_rgb(0_0_0/0.03)] hover:shadow-[0_2px_8px_-2px_rgb(0_0_0/0.08)] hover:border-zinc-300"
             initial={{ opacity: 0, x: -8 }}
             animate={{ opacity: 1, x: 0 }}
-            transition={{ duration: 0.3, delay: i * 0.06 }}
+            transition={{ duration: 0.3, delay: Math.min(i, 8) * 0.06 }}
           >
             <button onClick={() => handleRerun(s)} className="w-full text-left">
               <div className="flex items-center justify-between pr-8">
@@ -156,6 +171,14 @@ export default function SessionList() {
           </motion.div>
         ))}
       </div>
+      {nextCursor && (
+        <button
+          onClick={handleLoadMore}
+          className="w-full text-sm text-zinc-500 hover:text-zinc-700 transition-colors py-1"
+        >
+          Show more
+        </button>
+      )}
     </div>
   );
 }
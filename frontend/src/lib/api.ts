@@ -84,7 +84,9 @@ export async function getVotes(sessionId: string) {
   return fetchJson<{ votes: Votes }>(`/api/votes/${sessionId}`, undefined, "Failed to get votes");
 }
 
-export async function getSessions() {
+/** One page of sessions, most recent first; pass `next_cursor` back to get the next page. */
+export async function getSessions(cursor?: string | null) {
+  const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
   return fetchJson<{
     sessions: {
       session_id: string;
@@ -95,7 +97,8 @@ export async function getSessions() {
       vote_count: number;
       has_report: boolean;
     }[];
-  }>(`/api/sessions`, undefined, "Failed to get sessions");
+    next_cursor: string | null;
+  }>(`/api/sessions${query}`, undefined, "Failed to get sessions");
 }
 
 export async function deleteSession(sessionId: string) {
@@ -20,6 +20,8 @@ export interface AgentState {
   recommendations: Recommendation[];
   total_savings: number;
   summary: string;
+  /** Place in the model rate-limit queue while waiting; 0 or absent once sent. */
+  queue_position?: number;
 }
 
 export interface ColumnStats {
@@ -29,9 +31,13 @@ export interface ColumnStats {
   missing_count: number;
   missing_pct: number;
   unique_count: number;
+  unique_count_approximate?: boolean;
+  unique_count_error_pct?: number | null;
   sample_values: string[];
   min_value: string | null;
   max_value: string | null;
+  date_format?: string | null;
+  date_fallback_pct?: number | null;
 }
 
 export interface SuggestedMapping {
@@ -59,9 +65,11 @@ export interface AgentResult {
 export interface SSEEvent {
   type?: string;
   agent?: AgentType;
-  status?: "thinking" | "complete";
+  status?: "thinking" | "queued" | "recommendation" | "complete";
   step?: string;
   progress?: number;
+  recommendation?: Recommendation;
+  position?: number;
   result?: {
     agent_type: string;
     recommendations: Recommendation[];